@@ -0,0 +1,3 @@
+"""
+SkCode performance benchmarks (run with ``python -m benchmarks.<name>`` from the project root).
+"""
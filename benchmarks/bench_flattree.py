@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Flat document tree micro-benchmarks for the SkCode project.
+"""
+
+import gc
+import pickle
+import tracemalloc
+
+from skcode import parse_skcode, render_to_html
+from skcode.flattree import FlatDocumentTree
+from skcode.tags import BoldTextTreeNode
+
+from .bench_tokenizer import run_benchmark
+
+
+# Large manual sample (about 100k nodes)
+MANUAL_TEXT = ('[h2]Chapter[/h2]\n'
+               'Some [b]bold[/b] and [i]italic[/i] text, see [url=http://example.com/]this page[/url].\n'
+               '[list][*]first item\n[*]second [b]item[/b]\n[*]third item[/list]\n'
+               '[quote author="John Doe"]A quote with a [u]nested[/u] tag.[/quote]\n\n') * 2500
+
+
+def measure_retained_memory(build_fnct):
+    """
+    Measure the memory retained by the object returned by the given function.
+    :param build_fnct: The build function (no arguments).
+    :return: The built object and the retained memory (in bytes).
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build_fnct()
+    gc.collect()
+    memory_usage = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, memory_usage
+
+
+# Benchmark code
+if __name__ == '__main__':
+    print('-- SkCode flat document tree benchmark (large manual) --')
+    document_tree, tree_memory_usage = measure_retained_memory(lambda: parse_skcode(MANUAL_TEXT, source_spans=True))
+    flat_document, flat_memory_usage = measure_retained_memory(lambda: FlatDocumentTree(
+        parse_skcode(MANUAL_TEXT, source_spans=True)))
+    print('Nodes count: {}'.format(len(flat_document)))
+    print('{:<40} {:10.1f} MiB'.format('document tree', tree_memory_usage / 2 ** 20))
+    print('{:<40} {:10.1f} MiB'.format('flat document tree', flat_memory_usage / 2 ** 20))
+    run_benchmark('FlatDocumentTree (flatten)', lambda: FlatDocumentTree(document_tree), number=2)
+    run_benchmark('pickle.dumps (document tree)', lambda: pickle.dumps(document_tree), number=2)
+    run_benchmark('pickle.dumps (flat document tree)', lambda: pickle.dumps(flat_document), number=2)
+    tree_data = pickle.dumps(document_tree)
+    flat_data = pickle.dumps(flat_document)
+    print('{:<40} {:10.1f} MiB'.format('pickle size (document tree)', len(tree_data) / 2 ** 20))
+    print('{:<40} {:10.1f} MiB'.format('pickle size (flat document tree)', len(flat_data) / 2 ** 20))
+    run_benchmark('pickle.loads (document tree)', lambda: pickle.loads(tree_data), number=2)
+    run_benchmark('pickle.loads (flat document tree)', lambda: pickle.loads(flat_data), number=2)
+    run_benchmark('search_in_tree (document tree)',
+                  lambda: list(document_tree.search_in_tree(BoldTextTreeNode)), number=2)
+    run_benchmark('search_in_tree (flat document tree)',
+                  lambda: list(flat_document.search_in_tree(BoldTextTreeNode)), number=2)
+    run_benchmark('render_to_html (document tree)', lambda: render_to_html(document_tree), number=2)
+    run_benchmark('render_to_html (flat document tree)', lambda: flat_document.render_to_html(), number=2)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Garbage collector pauses micro-benchmarks for the SkCode project.
+"""
+
+import gc
+import time
+
+from skcode import parse_skcode, render_to_html
+from skcode.utility.paragraphs import make_paragraphs
+
+
+# Forum thread sample (one document per post)
+FORUM_POST_TEXT = ('[quote author="John Doe"]Hello [b]world[/b], see [url=http://example.com/]this[/url].[/quote]\n'
+                   'Some [i]italic[/i] text and a [u]under[/u] block.\n'
+                   '[list][*]first\n[*]second [b]bold[/b]\n[*]third[/list]\n\n') * 20
+
+# Long-lived objects of the render worker (caches, sessions, etc), scanned by each gen-2 collection
+LONG_LIVED_OBJECTS_COUNT = 200000
+
+
+def render_post(text, cycle_free=False, dispose=False):
+    """
+    Parse and render the given post, like a render worker request.
+    :param text: The post text.
+    :param cycle_free: Set to ``True`` to parse a cycle-free document tree.
+    :param dispose: Set to ``True`` to dispose the document tree after rendering.
+    :return: The rendered HTML.
+    """
+    document_tree = parse_skcode(text, cycle_free=cycle_free)
+    make_paragraphs(document_tree)
+    output_html = render_to_html(document_tree)
+    if dispose:
+        document_tree.dispose()
+    return output_html
+
+
+def run_gc_benchmark(name, requests_count=300, **kwargs):
+    """
+    Render the forum post sample the given number of times and print the garbage collector pauses.
+    :param name: The benchmark name.
+    :param requests_count: The number of rendered posts.
+    :param kwargs: Extra keyword arguments for ``render_post``.
+    """
+    pauses = {0: [], 1: [], 2: []}
+    start_times = []
+
+    def gc_callback(phase, info):
+        """ Record the duration of each garbage collection. """
+        if phase == 'start':
+            start_times.append(time.perf_counter())
+        else:
+            pauses[info['generation']].append(time.perf_counter() - start_times.pop())
+
+    gc.collect()
+    gc.callbacks.append(gc_callback)
+    try:
+        start_time = time.perf_counter()
+        for _ in range(requests_count):
+            render_post(FORUM_POST_TEXT, **kwargs)
+        total_time = time.perf_counter() - start_time
+    finally:
+        gc.callbacks.remove(gc_callback)
+    print('{:<32} {:8.1f} ms total, gen-2: {:4d} pauses ({:7.1f} ms, max {:5.1f} ms), '
+          'gen-0/1: {:5d} pauses ({:7.1f} ms)'.format(name, total_time * 1000,
+                                                      len(pauses[2]), sum(pauses[2]) * 1000,
+                                                      max(pauses[2], default=0) * 1000,
+                                                      len(pauses[0]) + len(pauses[1]),
+                                                      (sum(pauses[0]) + sum(pauses[1])) * 1000))
+
+
+# Benchmark code
+if __name__ == '__main__':
+    print('-- SkCode garbage collector pauses benchmark (render worker) --')
+    long_lived_objects = [{'id': i} for i in range(LONG_LIVED_OBJECTS_COUNT)]
+    run_gc_benchmark('default document trees')
+    run_gc_benchmark('disposed document trees', dispose=True)
+    run_gc_benchmark('cycle-free document trees', cycle_free=True)
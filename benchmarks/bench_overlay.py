@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Frozen document tree and document overlay micro-benchmarks for the SkCode project.
+"""
+
+import copy
+
+from skcode import parse_skcode, render_to_html, DocumentOverlay
+from skcode.utility.cosmetics import setup_cosmetics_replacement
+from skcode.utility.paragraphs import make_paragraphs
+from skcode.utility.relative_urls import setup_relative_urls_conversion
+from skcode.utility.smileys import setup_smileys_replacement
+
+from .bench_tokenizer import run_benchmark
+
+
+# Forum post sample (cached document)
+POST_TEXT = ('[quote author="John Doe"]Hello [b]world[/b] :) see [url=/page/]this page[/url]...[/quote]\n'
+             'Some [i]italic[/i] text -- and a [u]underlined[/u] word.\n'
+             '[list][*]first item\n[*]second [b]item[/b]\n[*]third item[/list]\n\n') * 20
+
+
+def setup_request(document_tree):
+    """
+    Setup the given document (or overlay) with the per-request settings.
+    :param document_tree: The document tree (or overlay) to be setup.
+    """
+    setup_smileys_replacement(document_tree, '/static/smileys/')
+    setup_cosmetics_replacement(document_tree)
+    setup_relative_urls_conversion(document_tree, 'http://example.com/')
+
+
+def render_parsed_document():
+    """
+    Parse, make paragraphs, setup and render the sample document (no cache).
+    """
+    document_tree = parse_skcode(POST_TEXT)
+    make_paragraphs(document_tree)
+    setup_request(document_tree)
+    return render_to_html(document_tree)
+
+
+def render_copied_document(cached_document_tree):
+    """
+    Deep-copy, setup and render the given cached document.
+    :param cached_document_tree: The cached document tree (paragraphs made).
+    """
+    document_tree = copy.deepcopy(cached_document_tree)
+    setup_request(document_tree)
+    return render_to_html(document_tree)
+
+
+def render_frozen_document(frozen_document_tree):
+    """
+    Setup an overlay and render the given frozen document.
+    :param frozen_document_tree: The frozen document tree (paragraphs made).
+    """
+    overlay = DocumentOverlay(frozen_document_tree)
+    setup_request(overlay)
+    return overlay.render_to_html()
+
+
+# Benchmark code
+if __name__ == '__main__':
+    print('-- SkCode cached document benchmark (per-request settings) --')
+    cached_document_tree = parse_skcode(POST_TEXT)
+    make_paragraphs(cached_document_tree)
+    frozen_document_tree = parse_skcode(POST_TEXT)
+    make_paragraphs(frozen_document_tree)
+    frozen_document_tree.freeze()
+    assert render_parsed_document() == render_frozen_document(frozen_document_tree)
+    reference = run_benchmark('parse + setup + render', render_parsed_document)
+    run_benchmark('deepcopy + setup + render', lambda: render_copied_document(cached_document_tree))
+    result = run_benchmark('overlay + setup + render', lambda: render_frozen_document(frozen_document_tree))
+    print('Speedup: x{:.2f}'.format(reference / result))
+    run_benchmark('render (not frozen)', lambda: render_to_html(cached_document_tree))
+    run_benchmark('render (frozen, no overlay)', lambda: render_to_html(frozen_document_tree))
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Binary serialization micro-benchmarks for the SkCode project.
+"""
+
+import pickle
+
+from skcode import parse_skcode, render_to_html
+from skcode.serializer import dumps, loads
+from skcode.utility.paragraphs import make_paragraphs
+
+from .bench_tokenizer import run_benchmark
+
+
+# Forum post sample (cached document)
+POST_TEXT = ('[quote author="John Doe"]Hello [b]world[/b] :) see [url=/page/]this page[/url]...[/quote]\n'
+             'Some [i]italic[/i] text -- and a [u]underlined[/u] word.\n'
+             '[list][*]first item\n[*]second [b]item[/b]\n[*]third item[/list]\n\n') * 20
+
+
+def parse_document():
+    """
+    Parse and make paragraphs of the sample document (no cache).
+    """
+    document_tree = parse_skcode(POST_TEXT)
+    make_paragraphs(document_tree)
+    return document_tree
+
+
+# Benchmark code
+if __name__ == '__main__':
+    print('-- SkCode binary serialization benchmark --')
+    document_tree = parse_document()
+    serialized_document = dumps(document_tree)
+    pickled_document = pickle.dumps(document_tree, pickle.HIGHEST_PROTOCOL)
+    assert render_to_html(document_tree) == render_to_html(loads(serialized_document))
+    print('Source text: {} bytes, binary format: {} bytes, pickle: {} bytes'.format(
+        len(POST_TEXT.encode('utf-8')), len(serialized_document), len(pickled_document)))
+    reference = run_benchmark('parse + paragraphs', parse_document)
+    run_benchmark('pickle.loads', lambda: pickle.loads(pickled_document))
+    result = run_benchmark('loads', lambda: loads(serialized_document))
+    print('Speedup: x{:.2f}'.format(reference / result))
+    run_benchmark('pickle.dumps', lambda: pickle.dumps(document_tree, pickle.HIGHEST_PROTOCOL))
+    run_benchmark('dumps', lambda: dumps(document_tree))
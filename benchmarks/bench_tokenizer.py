@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tokenizer micro-benchmarks for the SkCode project.
+"""
+
+import timeit
+import tracemalloc
+
+from skcode.parser import parse_tag, scan_tag
+from skcode.tags import DEFAULT_RECOGNIZED_TAGS_LIST, build_recognized_tags_dict
+from skcode.tokenizer import normalize_newlines, tokenize_tag, tokenize_tag_spans, tokenize_tag_stream
+
+
+# Bracket-heavy sample (array snippets, footnote-like refs, broken tags)
+BRACKET_HEAVY_TEXT = 'x = arr[i + 1] * m[0:3] - d["key"] + v[-1] [] [:] [i]ndex [1] [b]bold[/b] ' \
+                     '[url=http://example.com/]link[/url] [quote author="John \\"J\\" Doe"] [a=" [x\n' * 200
+
+
+def run_benchmark(name, stmt, number=20):
+    """
+    Run the given statement and print the best time per loop.
+    :param name: The benchmark name.
+    :param stmt: The callable to be timed.
+    :param number: The number of loops per run.
+    :return: The best time per loop (in seconds).
+    """
+    best = min(timeit.repeat(stmt, number=number, repeat=5)) / number
+    print('{:<40} {:10.3f} ms'.format(name, best * 1000))
+    return best
+
+
+def scan_all_tags(scan_fnct, text):
+    """
+    Call the given scanner at each opening tag char of the text (like the tokenizer does).
+    :param scan_fnct: The scanner function (``scan_tag`` or an exception-driven wrapper of ``parse_tag``).
+    :param text: The input text.
+    """
+    start = text.find('[')
+    while start >= 0:
+        tag = scan_fnct(text, start)
+        start = text.find('[', tag[4] if tag is not None else start + 1)
+
+
+def parse_tag_or_none(text, start):
+    """
+    Exception-driven reference scanner (``parse_tag`` wrapped like the legacy tokenizer).
+    """
+    try:
+        return parse_tag(text, start)
+    except (IndexError, ValueError):
+        return None
+
+
+def tokenize_raw_block(text):
+    """
+    Tokenize the given text, starting a raw block at the first opening tag (see the tokenizer raw blocks protocol).
+    :param text: The input text, starting with the opening tag of the raw block.
+    :return: The list of tokens.
+    """
+    tokens = tokenize_tag(text)
+    first_token = next(tokens)
+    tokens.send(first_token[1])
+    return [first_token] + list(tokens)
+
+
+# Benchmark code
+if __name__ == '__main__':
+    print('-- SkCode tag scanner benchmark ({} chars) --'.format(len(BRACKET_HEAVY_TEXT)))
+    reference = run_benchmark('parse_tag (exceptions)', lambda: scan_all_tags(parse_tag_or_none, BRACKET_HEAVY_TEXT))
+    result = run_benchmark('scan_tag (compiled patterns)', lambda: scan_all_tags(scan_tag, BRACKET_HEAVY_TEXT))
+    print('Speedup: x{:.2f}'.format(reference / result))
+
+    print('-- SkCode tokenizer adversarial input benchmark (time must scale linearly) --')
+    for size in (1000, 4000, 16000):
+        adversarial_text = '[a="' + '[b x=y [a b c d ' * size
+        run_benchmark('tokenize_tag ({} chars)'.format(len(adversarial_text)),
+                      lambda: list(tokenize_tag(adversarial_text)), number=2)
+    for adversarial_text in ('[a="', "[a='x ", '[a b c d ', '[a=b c=d e', '[/a', '[ ' + ' ' * 20):
+        small_time = run_benchmark('tokenize_tag ({!r} x 1000)'.format(adversarial_text),
+                                   lambda: list(tokenize_tag(adversarial_text * 1000, max_tag_length=256)), number=2)
+        large_time = run_benchmark('tokenize_tag ({!r} x 8000)'.format(adversarial_text),
+                                   lambda: list(tokenize_tag(adversarial_text * 8000, max_tag_length=256)), number=2)
+        print('Ratio: x{:.1f} (linear: x8)'.format(large_time / small_time))
+    small_time = run_benchmark('tokenize_tag (unterminated tag, 1000)',
+                               lambda: list(tokenize_tag('[a="' + '[b x=y ' * 1000, max_tag_length=256)), number=2)
+    large_time = run_benchmark('tokenize_tag (unterminated tag, 8000)',
+                               lambda: list(tokenize_tag('[a="' + '[b x=y ' * 8000, max_tag_length=256)), number=2)
+    print('Ratio: x{:.1f} (linear: x8)'.format(large_time / small_time))
+
+    print('-- SkCode raw block tokenizer benchmark (time must scale linearly) --')
+    code_line = 'int v = arr[i] * m[j][k]; // [b]text[/b]\n'
+    small_time = run_benchmark('raw block (1000 lines)',
+                               lambda: tokenize_raw_block('[code]' + code_line * 1000 + '[/code]'), number=5)
+    large_time = run_benchmark('raw block (8000 lines)',
+                               lambda: tokenize_raw_block('[code]' + code_line * 8000 + '[/code]'), number=5)
+    print('Ratio: x{:.1f} (linear: x8)'.format(large_time / small_time))
+
+    print('-- SkCode stream tokenizer long line benchmark (time must scale linearly) --')
+    for size in (1, 4, 16):
+        long_line_bytes = b'x' * (size * 2 ** 20)
+        run_benchmark('tokenize_tag_stream ({} MiB line)'.format(size),
+                      lambda: list(tokenize_tag_stream(long_line_bytes)), number=2)
+
+    print('-- SkCode tokenizer tag name prefilter benchmark --')
+    recognized_tags = build_recognized_tags_dict(DEFAULT_RECOGNIZED_TAGS_LIST)
+    reference = run_benchmark('tokenize_tag (any tag name)', lambda: list(tokenize_tag(BRACKET_HEAVY_TEXT)))
+    result = run_benchmark('tokenize_tag (recognized names only)',
+                           lambda: list(tokenize_tag(BRACKET_HEAVY_TEXT, recognized_tag_names=recognized_tags)))
+    print('Speedup: x{:.2f}'.format(reference / result))
+
+    print('-- SkCode span tokens benchmark --')
+    normalized_text = normalize_newlines(BRACKET_HEAVY_TEXT)
+    reference = run_benchmark('tokenize_tag (string tokens)', lambda: list(tokenize_tag(BRACKET_HEAVY_TEXT)))
+    result = run_benchmark('tokenize_tag_spans (span tokens)', lambda: list(tokenize_tag_spans(normalized_text)))
+    print('Speedup: x{:.2f}'.format(reference / result))
+    for name, tokenize_fnct in (('string tokens', lambda: list(tokenize_tag(BRACKET_HEAVY_TEXT))),
+                                ('span tokens', lambda: list(tokenize_tag_spans(normalized_text)))):
+        tracemalloc.start()
+        tokens = tokenize_fnct()
+        memory_usage = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('{:<40} {:10.1f} KiB ({} tokens)'.format(name, memory_usage / 1024, len(tokens)))
+        del tokens
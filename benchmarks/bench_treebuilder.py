@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tree builder micro-benchmarks for the SkCode project.
+"""
+
+import tracemalloc
+
+from skcode import parse_skcode, parse_skcode_tokens, render_to_html, render_to_text, SkCodeDialect
+from skcode.etree import (
+    TreeNode,
+    RootTreeNode,
+    compute_structural_hashes,
+    debug_print_ast,
+    iter_tree_preorder,
+    iter_tree_postorder,
+    iter_tree_events
+)
+from skcode.tags import (
+    DEFAULT_RECOGNIZED_TAGS_LIST,
+    build_recognized_tags_dict,
+    build_tag_dispatch_table,
+    AcronymTreeNode,
+    BoldTextTreeNode,
+    FigureDeclarationTreeNode,
+    FootnoteDeclarationTreeNode,
+    ItalicTextTreeNode,
+    QuoteTreeNode,
+    TextRunTreeNode,
+    TextTreeNode,
+    UrlLinkTreeNode
+)
+from skcode.tokenizer import tokenize_tag, tokenize_tag_cached
+from skcode.treebuilder import build_tree, pre_process_tree, sanitize_tree, post_process_tree, process_tree
+from skcode.tags.titles import TitleBaseTreeNode
+from skcode.utility.acronyms import extract_acronyms
+from skcode.utility.cosmetics import setup_cosmetics_replacement
+from skcode.utility.figures import extract_figures
+from skcode.utility.footnotes import extract_footnotes
+from skcode.utility.paragraphs import make_paragraphs
+from skcode.utility.smileys import setup_smileys_replacement
+from skcode.utility.titles import extract_titles
+from skcode.utility.words_counter import count_words
+
+from .bench_tokenizer import run_benchmark
+
+
+# Pasted source file sample (bracket-heavy code inside a raw block)
+CPP_SOURCE_LINE = '    int v{0} = arr[i + {0}] * m[j][k]; // [b]not bold[/b] [/cod] <tag>\n'
+
+
+def get_code_block_text(lines_count):
+    """
+    Return a code block document with the given number of source lines.
+    :param lines_count: The number of source lines.
+    """
+    return '[code=cpp]\n' + ''.join(CPP_SOURCE_LINE.format(i) for i in range(lines_count)) + '[/code]'
+
+
+# Forum post sample
+FORUM_POST_TEXT = '[quote author="John Doe"]Hello [b]world[/b], see [url=http://example.com/]this[/url].[/quote]\n' \
+                  'Some [i]italic[/i] text with an array[i] and a [code=cpp]int a = b[0];[/code] block.\n\n' * 50
+
+# Restricted tag set (signatures)
+SIGNATURE_RECOGNIZED_TAGS = (BoldTextTreeNode, ItalicTextTreeNode, UrlLinkTreeNode)
+
+# Tag-free forum post sample
+TAG_FREE_POST_TEXT = 'Hello world :) this is a tag-free post -- with some text... and a smiley ;)\n' \
+                     'Second line of the paragraph, nothing fancy here.\n\n' * 30
+
+# Short forum post sample (comments, chat messages)
+SHORT_POST_TEXT = 'Hello [b]world[/b], see [url=http://example.com/]this[/url] :)'
+
+# Options overload sample
+QUOTE_OPTIONS_OVERLOAD = {QuoteTreeNode: {'inline': True, 'close_inlines': False}}
+
+# Well-formed document sample (tree builder benchmark)
+WELL_FORMED_TEXT = ('[quote author="John Doe"]Hello [b]world[/b], see [url=http://example.com/]this[/url].[/quote]\n'
+                    'Some [i]italic[/i] text and a [code=cpp]int a = b[0];[/code] block.\n'
+                    '[list][*]first\n[*]second [b]bold[/b]\n[*]third[/list]\n\n') * 100
+
+# Long mostly plain text post sample (text runs benchmark, 300 lines)
+PLAIN_LINES_POST_TEXT = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit :)\n'
+                         'Nulla eget erat sed nisi tincidunt [b]pellentesque[/b] vel iaculis eros.\n'
+                         'In dui sapien, auctor et dui eget, elementum sodales justo.\n\n') * 100
+
+# Article sample (page data extraction benchmark)
+ARTICLE_TEXT = ('[h2]Chapter[/h2]\n'
+                'Some [b]bold[/b] and [i]italic[/i] text, see [url=http://example.com/]this page[/url].\n'
+                '[list][*]first item\n[*]second [b]item[/b]\n[*]third item[/list]\n'
+                '[quote author="John Doe"]A quote with a [u]nested[/u] tag[footnote]A footnote.[/footnote].[/quote]\n'
+                'The [abbr=Central Processing Unit]CPU[/abbr] is here.\n\n') * 50
+
+
+def build_document_tree_from_tokens(tokens, recognized_tags, dispatch_table):
+    """
+    Build the document tree of the given (lazy attributes) tokens.
+    :param tokens: The tokens sequence.
+    :param recognized_tags: The dictionary of all valid tag classes.
+    :param dispatch_table: The dispatch table of all valid tag classes, or ``None``.
+    """
+    root_tree_node = RootTreeNode()
+    for _step in build_tree(root_tree_node, tokens, recognized_tags,
+                            lazy_attrs=True, dispatch_table=dispatch_table):
+        pass
+    return root_tree_node
+
+
+def count_tree_nodes(tree_node):
+    """
+    Count the nodes of the given document tree (root node excluded).
+    :param tree_node: The document tree to be analyzed.
+    """
+    return sum(1 for _ in iter_tree_preorder(tree_node)) - 1
+
+
+def parse_and_render_plain_lines_post(coalesce_text_runs):
+    """
+    Parse the long plain text post sample, make paragraphs and render it as HTML.
+    :param coalesce_text_runs: Set to ``True`` to merge adjacent text and newlines into text runs.
+    """
+    document_tree = parse_skcode(PLAIN_LINES_POST_TEXT, coalesce_text_runs=coalesce_text_runs)
+    make_paragraphs(document_tree)
+    return render_to_html(document_tree)
+
+
+def measure_tree_memory(parse_fnct):
+    """
+    Measure the memory used by the document tree returned by the given parse function.
+    :param parse_fnct: The parse function (no arguments).
+    :return: The number of nodes (root node excluded) and the number of bytes per node.
+    """
+    tracemalloc.start()
+    document_tree = parse_fnct()
+    memory_usage = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes_count = count_tree_nodes(document_tree)
+    return nodes_count, memory_usage / nodes_count
+
+
+def get_deeply_nested_tree(depth, content=''):
+    """
+    Build a document tree made of the given number of nested bold tags.
+    :param depth: The nesting depth of the document tree.
+    :param content: The raw content of each bold tag (default to an empty string).
+    """
+    root_tree_node = RootTreeNode()
+    tree_node = root_tree_node
+    for _ in range(depth):
+        tree_node = tree_node.new_child('b', BoldTextTreeNode, content=content)
+    return root_tree_node
+
+
+def get_wide_tree(width):
+    """
+    Build a document tree made of the given number of sibling bold tags, each with a text child.
+    :param width: The number of children of the root tree node.
+    """
+    root_tree_node = RootTreeNode()
+    for _ in range(width):
+        root_tree_node.new_child('b', BoldTextTreeNode).new_child(None, TextTreeNode, content='x')
+    return root_tree_node
+
+
+def process_tree_three_passes(tree_node):
+    """
+    Pre-process, sanitize and post-process the given document tree, one full pass each.
+    :param tree_node: The document tree to be processed.
+    """
+    pre_process_tree(tree_node)
+    sanitize_tree(tree_node)
+    post_process_tree(tree_node)
+
+
+def extract_page_data(document_tree):
+    """
+    Extract the titles, footnotes, figures, acronyms and words count of the given document (page rendering data).
+    :param document_tree: The document tree.
+    """
+    extract_titles(document_tree)
+    extract_footnotes(document_tree)
+    extract_figures(document_tree)
+    extract_acronyms(document_tree)
+    count_words(document_tree)
+
+
+def walk_page_data(document_tree):
+    """
+    Same lookups as ``extract_page_data``, with a full tree walk for each lookup.
+    :param document_tree: The document tree.
+    """
+    for node_cls in (TitleBaseTreeNode, FootnoteDeclarationTreeNode, FigureDeclarationTreeNode, AcronymTreeNode,
+                     TextTreeNode, TextRunTreeNode):
+        list(TreeNode.search_in_tree(document_tree, node_cls))
+
+def parse_tag_free_post(general_path):
+    """
+    Parse the tag-free forum post sample and make paragraphs.
+    :param general_path: Set to ``True`` to build the document tree from the tokens (no fast path).
+    """
+    if general_path:
+        document_tree = parse_skcode_tokens(tokenize_tag(TAG_FREE_POST_TEXT.strip(), lazy_attrs=True))
+    else:
+        document_tree = parse_skcode(TAG_FREE_POST_TEXT)
+    make_paragraphs(document_tree)
+    return document_tree
+
+
+def parse_three_ways(use_tokens_cache):
+    """
+    Parse the forum post sample for display, for signatures and for the editor preview.
+    :param use_tokens_cache: Set to ``True`` to tokenize the text only once.
+    """
+    if use_tokens_cache:
+        tokenize_tag_cached.cache_clear()
+        tokens = tokenize_tag_cached(FORUM_POST_TEXT.strip())
+        parse_skcode_tokens(tokens)
+        parse_skcode_tokens(tokens, recognized_tags=SIGNATURE_RECOGNIZED_TAGS)
+        parse_skcode_tokens(tokens, mark_unclosed_tags_as_erroneous=True)
+    else:
+        parse_skcode(FORUM_POST_TEXT)
+        parse_skcode(FORUM_POST_TEXT, recognized_tags=SIGNATURE_RECOGNIZED_TAGS)
+        parse_skcode(FORUM_POST_TEXT, mark_unclosed_tags_as_erroneous=True)
+
+
+# Benchmark code
+if __name__ == '__main__':
+    print('-- SkCode raw block benchmark (time must scale linearly) --')
+    for lines_count in (1250, 5000, 20000):
+        code_block_text = get_code_block_text(lines_count)
+        run_benchmark('parse_skcode ({} lines of code)'.format(lines_count),
+                      lambda: parse_skcode(code_block_text), number=2)
+
+    print('-- SkCode bytes input memory benchmark --')
+    code_block_bytes = (get_code_block_text(20000) + '\r\n').encode('utf-8') * 10
+    print('Input size: {:.1f} MiB'.format(len(code_block_bytes) / 2 ** 20))
+    for name, parse_fnct in (('parse_skcode (decoded string)', lambda: parse_skcode(code_block_bytes.decode('utf-8'))),
+                             ('parse_skcode (UTF-8 bytes)', lambda: parse_skcode(code_block_bytes))):
+        tracemalloc.start()
+        document_tree = parse_fnct()
+        peak_memory_usage = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{:<40} {:10.1f} MiB (peak)'.format(name, peak_memory_usage / 2 ** 20))
+        del document_tree
+
+    print('-- SkCode tokens cache benchmark (same text parsed three ways) --')
+    reference = run_benchmark('parse_skcode x3', lambda: parse_three_ways(False))
+    result = run_benchmark('parse_skcode_tokens x3 (cached tokens)', lambda: parse_three_ways(True))
+    print('Speedup: x{:.2f}'.format(reference / result))
+
+    print('-- SkCode tag-free post benchmark --')
+    reference = run_benchmark('tokenize_tag + parse_skcode_tokens', lambda: parse_tag_free_post(True))
+    result = run_benchmark('parse_skcode (tag-free fast path)', lambda: parse_tag_free_post(False))
+    print('Speedup: x{:.2f}'.format(reference / result))
+    tag_free_document_tree = parse_tag_free_post(False)
+    setup_smileys_replacement(tag_free_document_tree, '/static/smileys/')
+    setup_cosmetics_replacement(tag_free_document_tree)
+    run_benchmark('render_to_html (tag-free post)', lambda: render_to_html(tag_free_document_tree))
+    run_benchmark('render_to_text (tag-free post)', lambda: render_to_text(tag_free_document_tree))
+
+    print('-- SkCode dialect benchmark (short post, with options overload) --')
+    dialect = SkCodeDialect(cls_options_overload=QUOTE_OPTIONS_OVERLOAD)
+    reference = run_benchmark('parse_skcode', lambda: parse_skcode(SHORT_POST_TEXT,
+                                                                   cls_options_overload=QUOTE_OPTIONS_OVERLOAD),
+                              number=1000)
+    result = run_benchmark('SkCodeDialect.parse', lambda: dialect.parse(SHORT_POST_TEXT), number=1000)
+    print('Speedup: x{:.2f}'.format(reference / result))
+
+    print('-- SkCode tree builder benchmark (pre-tokenized well-formed document) --')
+    well_formed_tokens = tuple(tokenize_tag(WELL_FORMED_TEXT, lazy_attrs=True))
+    recognized_tags_dict = build_recognized_tags_dict(DEFAULT_RECOGNIZED_TAGS_LIST)
+    tag_dispatch_table = build_tag_dispatch_table(recognized_tags_dict)
+    run_benchmark('build_tree (on the fly dispatch table)',
+                  lambda: build_document_tree_from_tokens(well_formed_tokens, recognized_tags_dict, None))
+    run_benchmark('build_tree (prebuilt dispatch table)',
+                  lambda: build_document_tree_from_tokens(well_formed_tokens, recognized_tags_dict,
+                                                          tag_dispatch_table))
+    run_benchmark('build_tree + make_paragraphs',
+                  lambda: make_paragraphs(build_document_tree_from_tokens(well_formed_tokens, recognized_tags_dict,
+                                                                          tag_dispatch_table)))
+
+    print('-- SkCode text runs benchmark (long mostly plain text post) --')
+    for coalesce_text_runs in (False, True):
+        print('{:<40} {:10d} nodes'.format('parse_skcode (coalesce_text_runs={})'.format(coalesce_text_runs),
+                                           count_tree_nodes(parse_skcode(PLAIN_LINES_POST_TEXT,
+                                                                         coalesce_text_runs=coalesce_text_runs))))
+    reference = run_benchmark('parse + paragraphs + render', lambda: parse_and_render_plain_lines_post(False))
+    result = run_benchmark('parse + paragraphs + render (text runs)', lambda: parse_and_render_plain_lines_post(True))
+    print('Speedup: x{:.2f}'.format(reference / result))
+
+    print('-- SkCode processing pass benchmark --')
+    for name, document_tree in (('long post', parse_skcode(PLAIN_LINES_POST_TEXT)),
+                                 ('well-formed document', parse_skcode(WELL_FORMED_TEXT)),
+                                 ('5000 nested tags', get_deeply_nested_tree(5000))):
+        run_benchmark('three passes ({})'.format(name), lambda: process_tree_three_passes(document_tree))
+        run_benchmark('process_tree ({})'.format(name), lambda: process_tree(document_tree))
+
+    print('-- SkCode raw content benchmark (time must scale linearly) --')
+    for depth in (500, 1000, 2000, 4000):
+        document_tree = get_deeply_nested_tree(depth, content='x' * 100)
+        run_benchmark('get_raw_content ({} nested tags)'.format(depth), lambda: document_tree.get_raw_content())
+
+    print('-- SkCode tree walking benchmark (deep and wide trees) --')
+    for name, document_tree in (('5000 nested tags', get_deeply_nested_tree(5000, content='x')),
+                                 ('10000 sibling tags', get_wide_tree(10000))):
+        run_benchmark('iter_tree_preorder ({})'.format(name), lambda: list(iter_tree_preorder(document_tree)))
+        run_benchmark('iter_tree_postorder ({})'.format(name), lambda: list(iter_tree_postorder(document_tree)))
+        run_benchmark('iter_tree_events ({})'.format(name), lambda: list(iter_tree_events(document_tree)))
+        run_benchmark('has_errors ({})'.format(name), lambda: document_tree.has_errors())
+        run_benchmark('render_to_html ({})'.format(name), lambda: render_to_html(document_tree))
+        run_benchmark('render_to_text ({})'.format(name), lambda: render_to_text(document_tree))
+        run_benchmark('make_paragraphs ({})'.format(name), lambda: make_paragraphs(document_tree))
+        run_benchmark('debug_print_ast ({})'.format(name),
+                      lambda: debug_print_ast(document_tree, print_fnct=lambda *args: None))
+
+    print('-- SkCode structural hashes benchmark (well-formed document) --')
+    reference = run_benchmark('parse_skcode', lambda: parse_skcode(WELL_FORMED_TEXT))
+    result = run_benchmark('parse_skcode (structural hashes)',
+                           lambda: parse_skcode(WELL_FORMED_TEXT, structural_hashes=True))
+    print('Overhead: {:.1f}%'.format((result / reference - 1) * 100))
+    document_tree = parse_skcode(WELL_FORMED_TEXT)
+    run_benchmark('compute_structural_hashes', lambda: compute_structural_hashes(document_tree))
+
+    print('-- SkCode tree memory benchmark (well-formed document) --')
+    for name, parse_fnct in (('parse_skcode', lambda: parse_skcode(WELL_FORMED_TEXT)),
+                             ('parse_skcode (source spans)', lambda: parse_skcode(WELL_FORMED_TEXT,
+                                                                                  source_spans=True)),
+                             ('parse_skcode (text runs)', lambda: parse_skcode(WELL_FORMED_TEXT,
+                                                                               coalesce_text_runs=True))):
+        nodes_count, bytes_per_node = measure_tree_memory(parse_fnct)
+        print('{:<40} {:10.1f} bytes/node ({} nodes)'.format(name, bytes_per_node, nodes_count))
+
+    print('-- SkCode nodes index benchmark (page data extraction) --')
+    document_tree = parse_skcode(ARTICLE_TEXT)
+    make_paragraphs(document_tree)
+    document_tree.freeze()
+    reference = run_benchmark('five lookups (tree walk)', lambda: walk_page_data(document_tree))
+    result = run_benchmark('five lookups (nodes index)', lambda: extract_page_data(document_tree))
+    print('Speedup: x{:.2f}'.format(reference / result))
+    run_benchmark('rebuild_nodes_index', lambda: document_tree.rebuild_nodes_index())
@@ -14,5 +14,8 @@ __status__ = "Production"
 
 
 # User friendly imports
-from .treebuilder import parse_skcode
+from .treebuilder import parse_skcode, parse_skcode_stream, parse_skcode_tokens
 from .render import render_to_html, render_to_text
+from .dialect import SkCodeDialect
+from .flattree import FlatDocumentTree
+from .overlay import DocumentOverlay
@@ -0,0 +1,238 @@
+"""
+SkCode reusable parser configuration (dialect) code.
+"""
+
+import copyreg
+from functools import partial
+from types import MappingProxyType
+
+from .etree import RootTreeNode, register_generated_node_cls
+from .render import (
+    render_to_html,
+    render_to_text,
+    DEFAULT_ERROR_HTML_TEMPLATE
+)
+from .tags import (
+    DEFAULT_RECOGNIZED_TAGS_LIST,
+    build_recognized_tags_dict,
+    build_tag_dispatch_table,
+    NewlineTreeNode,
+    TextTreeNode,
+    TextRunTreeNode
+)
+from .serializer import build_classes_registry, dumps, loads
+from .treebuilder import build_document_tree
+
+
+class OverloadedTagClassType(type):
+    """
+    Metaclass of the derived tag classes built by ``build_overloaded_tag_classes``.
+    Derived tag classes are pickled by recipe (the overloaded tag class and the options, see
+    ``reduce_overloaded_tag_class``), so any process can unpickle them, even without the dialect which built them.
+    """
+
+
+def build_overloaded_tag_classes(tag_class_list, cls_options_overload):
+    """
+    Turn the given per class options overload dictionary into derived tag classes.
+    Each tag class with options to overload is replaced by a subclass with the given options set as class
+    attributes, so the options are set once, instead of once per tree node instance.
+    Derived classes are registered like generated tag classes (see ``register_generated_node_cls``), keyed on the
+    tag class and the options, so dialects created with the same options share the same derived classes.
+    :param tag_class_list: The list of tag node classes for all supported tags.
+    :param cls_options_overload: Dictionary of dictionaries mapped by node class type ``{class: {key : value}}``.
+    :return: The list of tag node classes, with derived classes in place of overloaded classes.
+    """
+    overloaded_tag_class_list = []
+    for tag_class in tag_class_list:
+        options = cls_options_overload.get(tag_class) if cls_options_overload else None
+        if options:
+            derived_tag_class = OverloadedTagClassType(tag_class.__name__, (tag_class, ),
+                                                       dict(options, __doc__=tag_class.__doc__))
+            derived_tag_class.base_tag_class = tag_class
+            derived_tag_class.overloaded_options = tuple(sorted(options.items(), key=lambda item: item[0]))
+            tag_class = register_generated_node_cls(derived_tag_class, tag_class, options)
+        overloaded_tag_class_list.append(tag_class)
+    return overloaded_tag_class_list
+
+
+def rebuild_overloaded_tag_class(tag_class, overloaded_options):
+    """
+    Rebuild the derived tag class of the given tag class with the given options (to unpickle derived tag classes).
+    :param tag_class: The overloaded tag class.
+    :param overloaded_options: The overloaded options, as a tuple of ``(key, value)`` pairs.
+    :return: The derived tag class.
+    """
+    return build_overloaded_tag_classes((tag_class, ), {tag_class: dict(overloaded_options)})[0]
+
+
+def reduce_overloaded_tag_class(derived_tag_class):
+    """
+    Pickle the given derived tag class by recipe (see ``rebuild_overloaded_tag_class``).
+    Subclasses of derived tag classes are pickled by name, as usual.
+    :param derived_tag_class: The derived tag class.
+    :return: The reduced class, see ``object.__reduce__``.
+    """
+    if 'overloaded_options' not in vars(derived_tag_class):
+        return derived_tag_class.__qualname__
+    return rebuild_overloaded_tag_class, (derived_tag_class.base_tag_class, derived_tag_class.overloaded_options)
+
+
+copyreg.pickle(OverloadedTagClassType, reduce_overloaded_tag_class)
+
+
+class SkCodeDialect(object):
+    """
+    Reusable parser and renderer configuration (aka dialect).
+
+    The recognized tags list is checked and the per class options overloads are turned into derived tag classes
+    only once, at creation. The dialect is never modified after creation, so the same instance can be used to
+    parse and render any number of documents, concurrently from several threads.
+    """
+
+    def __init__(self,
+                 recognized_tags=DEFAULT_RECOGNIZED_TAGS_LIST,
+                 opening_tag_ch='[', closing_tag_ch=']',
+                 allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                 root_node_cls=RootTreeNode,
+                 text_node_cls=TextTreeNode,
+                 newline_node_cls=NewlineTreeNode,
+                 mark_unclosed_tags_as_erroneous=False,
+                 max_nesting_depth=16,
+                 cls_options_overload=None,
+                 unknown_tags_as_data=False,
+                 max_tag_length=4096,
+                 max_attrs_count=32,
+                 coalesce_text_runs=False,
+                 text_run_node_cls=TextRunTreeNode,
+                 force_rel_nofollow=True,
+                 html_error_template=DEFAULT_ERROR_HTML_TEMPLATE):
+        """
+        Create a new dialect. See ``parse_skcode`` for the parsing parameters and ``render_to_html`` for
+        the rendering parameters.
+        N.B. Tree nodes of overloaded tag classes are instances of derived classes of the given tag classes.
+        """
+        assert opening_tag_ch, "The opening tag character is mandatory."
+        assert len(opening_tag_ch) == 1, "Opening tag character must be one char long exactly."
+        assert closing_tag_ch, "The closing tag character is mandatory."
+        assert len(closing_tag_ch) == 1, "Closing tag character must be one char long exactly."
+        assert root_node_cls, "Root tree node class is mandatory."
+        assert text_node_cls, "Text tree node class is mandatory."
+        assert newline_node_cls, "Newline tree node class is mandatory."
+        assert max_nesting_depth >= 0, "Maximum nesting depth must be greater or equal than zero."
+        assert max_tag_length >= 0, "Maximum tag length must be greater or equal than zero."
+        assert max_attrs_count >= 0, "Maximum attributes count must be greater or equal than zero."
+
+        # Store the creation arguments (for pickling)
+        self.creation_kwargs = {
+            'recognized_tags': tuple(recognized_tags),
+            'opening_tag_ch': opening_tag_ch,
+            'closing_tag_ch': closing_tag_ch,
+            'allow_tagvalue_attr': allow_tagvalue_attr,
+            'allow_self_closing_tags': allow_self_closing_tags,
+            'root_node_cls': root_node_cls,
+            'text_node_cls': text_node_cls,
+            'newline_node_cls': newline_node_cls,
+            'mark_unclosed_tags_as_erroneous': mark_unclosed_tags_as_erroneous,
+            'max_nesting_depth': max_nesting_depth,
+            'cls_options_overload': cls_options_overload,
+            'unknown_tags_as_data': unknown_tags_as_data,
+            'max_tag_length': max_tag_length,
+            'max_attrs_count': max_attrs_count,
+            'coalesce_text_runs': coalesce_text_runs,
+            'text_run_node_cls': text_run_node_cls,
+            'force_rel_nofollow': force_rel_nofollow,
+            'html_error_template': html_error_template,
+        }
+
+        # Build the (read-only) known tag names dictionary and dispatch table, with overloaded classes
+        recognized_tags = build_overloaded_tag_classes(recognized_tags, cls_options_overload)
+        self.recognized_tags = MappingProxyType(build_recognized_tags_dict(recognized_tags))
+        self.dispatch_table = MappingProxyType(build_tag_dispatch_table(self.recognized_tags))
+
+        # Store parsing options
+        self.opening_tag_ch = opening_tag_ch
+        self.closing_tag_ch = closing_tag_ch
+        self.allow_tagvalue_attr = allow_tagvalue_attr
+        self.allow_self_closing_tags = allow_self_closing_tags
+        self.root_node_cls = root_node_cls
+        self.text_node_cls = text_node_cls
+        self.newline_node_cls = newline_node_cls
+        self.mark_unclosed_tags_as_erroneous = mark_unclosed_tags_as_erroneous
+        self.max_nesting_depth = max_nesting_depth
+        self.unknown_tags_as_data = unknown_tags_as_data
+        self.max_tag_length = max_tag_length
+        self.max_attrs_count = max_attrs_count
+        self.text_run_node_cls = text_run_node_cls if coalesce_text_runs else None
+
+        # Build the classes registry of the binary format (see ``dumps``)
+        self.classes_registry = build_classes_registry(self.recognized_tags.values(),
+                                                       (root_node_cls, text_node_cls, newline_node_cls,
+                                                        text_run_node_cls))
+
+        # Store rendering options
+        self.force_rel_nofollow = force_rel_nofollow
+        self.html_error_template = html_error_template
+
+    def __reduce__(self):
+        """
+        Pickle the dialect as its creation arguments, the dialect is built again when unpickled.
+        N.B. The tag classes (including generated tag classes, see ``register_generated_node_cls``) are pickled by
+        reference, the overloaded tag classes are built again from the per class options overload dictionary.
+        :return: The reduced dialect, see ``object.__reduce__``.
+        """
+        return partial(self.__class__, **self.creation_kwargs), ()
+
+    def parse(self, text, source_spans=False, lazy_attrs=True, use_tokens_cache=False, cycle_free=False,
+              structural_hashes=False):
+        """
+        Parse the given text as a BBCode formatted document.
+        See ``parse_skcode`` for the parameters.
+        :param text: The input text to be parsed.
+        :return The resulting document tree at the end of the parsing stage.
+        """
+        return build_document_tree(text, self.recognized_tags, None,
+                                   self.opening_tag_ch, self.closing_tag_ch,
+                                   self.allow_tagvalue_attr, self.allow_self_closing_tags,
+                                   self.root_node_cls, self.text_node_cls, self.newline_node_cls,
+                                   self.mark_unclosed_tags_as_erroneous,
+                                   self.max_nesting_depth,
+                                   self.unknown_tags_as_data,
+                                   self.max_tag_length, self.max_attrs_count,
+                                   source_spans, lazy_attrs, use_tokens_cache,
+                                   self.dispatch_table, self.text_run_node_cls, cycle_free, structural_hashes)
+
+    def dumps(self, document_tree):
+        """
+        Serialize the given document tree into the compact binary format, with the classes registry of this dialect.
+        See ``skcode.serializer.dumps``.
+        :param document_tree: The document tree to be serialized.
+        :return The serialized document tree, as bytes.
+        """
+        return dumps(document_tree, self.classes_registry)
+
+    def loads(self, data, cycle_free=False):
+        """
+        Load a document tree serialized by ``dumps``, with the classes registry of this dialect.
+        See ``skcode.serializer.loads``.
+        :param data: The serialized document tree.
+        :param cycle_free: If set to ``True``, the document tree is cycle-free (default is ``False``).
+        :return The document tree.
+        """
+        return loads(data, self.classes_registry, cycle_free)
+
+    def render(self, document_tree, as_text=False, **kwargs):
+        """
+        Render the given document tree as HTML (or as text).
+        :param document_tree: The document tree to be rendered, or a text to be parsed first.
+        :param as_text: Set to ``True`` to render the document tree as text (default is ``False``, HTML).
+        :param kwargs: Extra keywords arguments for the ``render_html`` or ``render_text`` callback methods.
+        :return The rendered document tree as HTML (or as text).
+        """
+        if isinstance(document_tree, str):
+            document_tree = self.parse(document_tree)
+        if as_text:
+            return render_to_text(document_tree, **kwargs)
+        return render_to_html(document_tree,
+                              force_rel_nofollow=self.force_rel_nofollow,
+                              html_error_template=self.html_error_template, **kwargs)
@@ -2,7 +2,227 @@
 SkCode elements tree code.
 """
 
+import re
+import sys
+
+from array import array
+from hashlib import blake2b
+from heapq import merge
 from html import escape as escape_html
+from marshal import dumps as marshal_dumps
+from threading import local
+from weakref import ref, ReferenceType
+
+from .parser import parse_tag_attributes
+
+
+# Node options flags (packed in a single integer, see ``get_node_flags``)
+NODE_FLAG_NEWLINE_CLOSES = 0x01
+NODE_FLAG_SAME_TAG_CLOSES = 0x02
+NODE_FLAG_WEAK_PARENT_CLOSE = 0x04
+NODE_FLAG_STANDALONE = 0x08
+NODE_FLAG_PARSE_EMBEDDED = 0x10
+NODE_FLAG_INLINE = 0x20
+NODE_FLAG_CLOSE_INLINES = 0x40
+NODE_FLAG_MAKE_PARAGRAPHS_HERE = 0x80
+
+# Node options flags and related option names
+NODE_FLAGS_OPTIONS = (
+    (NODE_FLAG_NEWLINE_CLOSES, 'newline_closes'),
+    (NODE_FLAG_SAME_TAG_CLOSES, 'same_tag_closes'),
+    (NODE_FLAG_WEAK_PARENT_CLOSE, 'weak_parent_close'),
+    (NODE_FLAG_STANDALONE, 'standalone'),
+    (NODE_FLAG_PARSE_EMBEDDED, 'parse_embedded'),
+    (NODE_FLAG_INLINE, 'inline'),
+    (NODE_FLAG_CLOSE_INLINES, 'close_inlines'),
+    (NODE_FLAG_MAKE_PARAGRAPHS_HERE, 'make_paragraphs_here'),
+)
+
+
+def get_node_flags(node, options=None):
+    """
+    Pack the boolean options of the given tree node (class or instance) into a single flags integer.
+    :param node: The tree node class or instance.
+    :param options: Dictionary of options overload ``{key : value}`` (default to ``None``).
+    :return: The options flags, see the ``NODE_FLAG_*`` constants.
+    """
+    flags = 0
+    for flag, option_name in NODE_FLAGS_OPTIONS:
+        if options and option_name in options:
+            value = options[option_name]
+        else:
+            value = getattr(node, option_name)
+        if value:
+            flags |= flag
+    return flags
+
+
+class EmptyAttributesDict(dict):
+    """
+    Immutable empty attributes dictionary, shared by the internal text and newline nodes (see ``EMPTY_ATTRS`` and
+    ``TreeNode.shared_empty_attrs``) and by the nodes without attributes of frozen document trees.
+    Use ``TreeNode.set_attribute_value`` to set an attribute of such a node, the shared empty dictionary is then
+    replaced by a new dictionary for this node only.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        """
+        Refuse any modification of the shared empty attributes dictionary.
+        """
+        raise TypeError('The shared empty attributes dictionary is immutable, use set_attribute_value().')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        """
+        Pickle (and copy) the shared empty attributes dictionary as itself.
+        """
+        return 'EMPTY_ATTRS'
+
+
+# Shared empty attributes dictionary
+EMPTY_ATTRS = EmptyAttributesDict()
+
+
+class FrozenAttributesDict(dict):
+    """
+    Immutable attributes dictionary of the nodes of a frozen document tree (see ``RootTreeNode.freeze``).
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        """
+        Refuse any modification of the attributes dictionary of a frozen document tree.
+        """
+        raise TypeError('Frozen document trees are immutable, use a document overlay for per-request settings.')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        """
+        Pickle (and copy) the frozen attributes dictionary from a plain dictionary copy.
+        """
+        return FrozenAttributesDict, (dict(self), )
+
+
+class FrozenRootReference(local):
+    """
+    Root tree node reference of the nodes of a frozen document tree (see ``RootTreeNode.freeze``).
+    Calling the reference return the document overlay currently active in the calling thread, if any, or the
+    frozen root tree node (see ``DocumentOverlay``). Each thread has its own stack of active overlays.
+    """
+
+    def __init__(self, root_tree_node):
+        """
+        Create a new frozen root reference.
+        :param root_tree_node: The frozen root tree node instance (or a weak reference to it, in cycle-free
+        documents).
+        """
+        self.root_tree_node = root_tree_node
+        self.overlays = []
+
+    def __call__(self):
+        """
+        Return the document overlay currently active in the calling thread, or the frozen root tree node.
+        """
+        overlays = self.overlays
+        if overlays:
+            return overlays[-1]
+        root_tree_node = self.root_tree_node
+        return root_tree_node() if root_tree_node.__class__ is ReferenceType else root_tree_node
+
+    def __reduce__(self):
+        """
+        Pickle (and copy) the frozen root reference from the frozen root tree node.
+        """
+        root_tree_node = self.root_tree_node
+        if root_tree_node.__class__ is ReferenceType:
+            return get_frozen_root_reference, (root_tree_node(), True)
+        return get_frozen_root_reference, (root_tree_node, False)
+
+
+def get_frozen_root_reference(root_tree_node, cycle_free=False):
+    """
+    Create a new frozen root reference for the given root tree node.
+    :param root_tree_node: The frozen root tree node instance.
+    :param cycle_free: Set to ``True`` to keep only a weak reference to the root tree node (default ``False``).
+    :return: The frozen root reference.
+    """
+    return FrozenRootReference(ref(root_tree_node) if cycle_free else root_tree_node)
+
+
+# Types of the root tree node references to be called (see ``TreeNode.root_tree_node``)
+ROOT_REFERENCE_TYPES = (ReferenceType, FrozenRootReference)
+
+# Tree walking events (see ``iter_tree_events``)
+WALK_ENTER = 1
+WALK_EXIT = 2
+
+
+def iter_tree_preorder(tree_node, descend_fnct=None):
+    """
+    Walk down the given tree node and children (iterative, without recursion) and yield every node in
+    document order, each node before its children (pre-order).
+    The children list of a node is read after the node is yielded, so children can be altered on the fly.
+    :param tree_node: The tree node to be walked.
+    :param descend_fnct: Optional callable with the tree node as parameter, returning ``False`` to skip
+        the children of the given node (default to ``None``, walk all nodes).
+    """
+    yield tree_node
+    if not tree_node.children or (descend_fnct is not None and not descend_fnct(tree_node)):
+        return
+    iterators_stack = [iter(tree_node.children)]
+    while iterators_stack:
+        for child_node in iterators_stack[-1]:
+            yield child_node
+            if child_node.children and (descend_fnct is None or descend_fnct(child_node)):
+                iterators_stack.append(iter(child_node.children))
+                break
+        else:
+            iterators_stack.pop()
+
+
+def iter_tree_postorder(tree_node):
+    """
+    Walk down the given tree node and children (iterative, without recursion) and yield every node,
+    each node after its children (post-order).
+    The children list of a node can be replaced once the node is yielded.
+    :param tree_node: The tree node to be walked.
+    """
+    nodes_stack = [(tree_node, iter(tree_node.children))]
+    while nodes_stack:
+        for child_node in nodes_stack[-1][1]:
+            if child_node.children:
+                nodes_stack.append((child_node, iter(child_node.children)))
+                break
+            yield child_node
+        else:
+            yield nodes_stack.pop()[0]
+
+
+def iter_tree_events(tree_node):
+    """
+    Walk down the given tree node and children (iterative, without recursion) and yield an ``(event, node)``
+    tuple when entering (``WALK_ENTER``) and when exiting (``WALK_EXIT``) each node, in document order.
+    The exit event of a node comes after the events of all its children.
+    :param tree_node: The tree node to be walked.
+    """
+    yield WALK_ENTER, tree_node
+    nodes_stack = [(tree_node, iter(tree_node.children))]
+    while nodes_stack:
+        for child_node in nodes_stack[-1][1]:
+            yield WALK_ENTER, child_node
+            if child_node.children:
+                nodes_stack.append((child_node, iter(child_node.children)))
+                break
+            yield WALK_EXIT, child_node
+        else:
+            yield WALK_EXIT, nodes_stack.pop()[0]
 
 
 class TreeNode(object):
@@ -19,9 +239,24 @@ class TreeNode(object):
     - the opening and closing tag source strings (for error displaying),
     - an error message (in case of error).
 
+    When built from span tokens, the raw content and the source strings are stored as ``(start, end)`` offsets
+    in the document source text (see ``RootTreeNode.source_text``) and materialized on first access.
+    When built from lazy attributes tokens, the attributes dictionary is built from the opening tag source
+    on first access.
+
     The tree node class also contain all tag behavior options as static variables.
+
+    The per-node data is stored in slots. Per-instance overloads of the class options, error messages (rare)
+    and any other extra attribute are stored in the instance dictionary, which is only created on first use.
+
+    In cycle-free documents (see ``RootTreeNode.cycle_free``), the root node and parent node references are weak
+    references, so the document tree is freed by reference counting as soon as the root tree node is released.
     """
 
+    __slots__ = ('_root_tree_node', '_parent', 'name', 'attrs', 'attrs_offset', 'children',
+                 'content', 'source_open_tag', 'source_close_tag', 'source_spans',
+                 '__dict__', '__weakref__')
+
     # ----- Node naming options
 
     # Canonical tag name (string, mandatory)
@@ -72,11 +307,43 @@ class TreeNode(object):
 
     is_root = False
 
+    # Set to ``True`` on cycle-free root tree nodes (see ``RootTreeNode``)
+    cycle_free = False
+
+    # Set to ``True`` if the nodes without attributes share the immutable ``EMPTY_ATTRS`` dictionary (internal
+    # text and newline nodes). Other nodes without attributes get their own dictionary on first access.
+    shared_empty_attrs = False
+
+    # Error message (only set on erroneous node instances)
+    error_message = ''
+
+    # Structural hash of the node and children (only set by ``compute_structural_hashes``)
+    structural_hash = None
+
+    # Per-instance attributes not covered by the structural hash data as overloaded options
+    STRUCTURAL_HASH_EXCLUDED_ATTRIBUTES = frozenset(('error_message', 'structural_hash'))
+
+    # Mapping of lazy source string attributes and their source span attributes
+    LAZY_SOURCE_ATTRIBUTES = {
+        'content': 'content_span',
+        'source_open_tag': 'source_open_tag_span',
+        'source_close_tag': 'source_close_tag_span',
+    }
+
+    # Mapping of lazy source string attributes and their index in the source spans tuple
+    LAZY_SOURCE_SPAN_INDEXES = {
+        'content': 0,
+        'source_open_tag': 1,
+        'source_close_tag': 2,
+    }
+
     def __init__(self,
                  root_tree_node, parent, name,
                  attrs=None, content='', children=None,
                  source_open_tag='', source_close_tag='',
-                 error_message='', **kwargs):
+                 error_message='',
+                 content_span=None, source_open_tag_span=None, source_close_tag_span=None,
+                 attrs_offset=None, **kwargs):
         """
         Create a new tree node instance.
         :param root_tree_node: The root tree node instance (mandatory). Use to store document-level data.
@@ -85,46 +352,180 @@ class TreeNode(object):
         :param parent: The node parent instance (mandatory). Set to ``None`` for the root node.
         N.B. Use the ``RootTreeNode`` class for the root tree node.
         :param name: The node name (mandatory for non-internal use nodes).
-        :param attrs: the node attributes dictionary (default to an empty dictionary).
+        :param attrs: the node attributes dictionary (default to an empty dictionary, built on first access, or
+        the shared empty attributes dictionary, see ``shared_empty_attrs``).
         :param content: The node raw content (default to an empty string).
         :param children: The node children list (default to an empty list).
         N.B. Child nodes parent instance will be reset to this node instance.
         :param source_open_tag: The source text for the opening tag of this node (default to an empty string).
         :param source_close_tag: The source text for the closing tag of this node (default to an empty string).
         :param error_message: The error message, if any error need to be reported (default to an empty string).
+        :param content_span: The ``(start, end)`` source span of the node raw content (default to ``None``).
+        :param source_open_tag_span: The ``(start, end)`` source span of the opening tag (default to ``None``).
+        :param source_close_tag_span: The ``(start, end)`` source span of the closing tag (default to ``None``).
+        N.B. If any source span is given, the raw content and source strings are materialized from the document
+        source text on first access, and the related string arguments are ignored.
+        :param attrs_offset: The offset of the attributes section in the opening tag source, as returned by the
+        tokenizer in lazy attributes mode (default to ``None``). If set, the attributes dictionary is built from the
+        opening tag source on first access, and the ``attrs`` argument is ignored.
         """
         assert root_tree_node, "The root tree node instance is mandatory."
         if not self.is_root:
             assert parent, "The parent node instance is mandatory for non-root nodes."
 
-        # Store value as attributes
-        self.root_tree_node = root_tree_node
-        self.parent = parent
+        # Store value as attributes (weak references to the root and parent nodes in cycle-free documents)
+        if root_tree_node.cycle_free:
+            self._root_tree_node = ref(root_tree_node)
+            self._parent = ref(parent) if parent is not None else None
+        else:
+            self._root_tree_node = root_tree_node
+            self._parent = parent
         self.name = name
-        self.attrs = attrs or {}
-        self.content = content
+        # Offset of the attributes section in the opening tag source, for lazy attributes (``None`` if unknown)
+        self.attrs_offset = attrs_offset
+        if attrs_offset is None:
+            if attrs:
+                self.attrs = attrs
+            elif self.shared_empty_attrs:
+                self.attrs = EMPTY_ATTRS
         self.children = children or []
-        self.source_open_tag = source_open_tag
-        self.source_close_tag = source_close_tag
-        self.error_message = error_message
+        if error_message:
+            self.error_message = error_message
 
-        # Allow class constants overload at object creation
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        # Store source strings, or source spans for lazy source strings
+        if content_span is None and source_open_tag_span is None and source_close_tag_span is None:
+            self.source_spans = None
+            self.content = content
+            self.source_open_tag = source_open_tag
+            self.source_close_tag = source_close_tag
+        else:
+            self.source_spans = (content_span, source_open_tag_span, source_close_tag_span)
+
+        # Allow class constants overload at object creation (stored in the instance dictionary)
+        if kwargs:
+            self.overload_options(kwargs)
 
         # Rebase children parent and root tree node
         for child in self.children:
             child.parent = self
-        self.reset_root_tree_node(root_tree_node)
+            child.reset_root_tree_node(root_tree_node)
+
+    @property
+    def root_tree_node(self):
+        """
+        The root tree node instance (``None`` if released, in cycle-free documents, or the active document overlay,
+        in frozen documents).
+        """
+        root_tree_node = self._root_tree_node
+        return root_tree_node() if root_tree_node.__class__ in ROOT_REFERENCE_TYPES else root_tree_node
+
+    @root_tree_node.setter
+    def root_tree_node(self, root_tree_node):
+        """
+        Set the root tree node instance (stored as a weak reference in cycle-free documents).
+        :param root_tree_node: The root tree node instance.
+        """
+        if root_tree_node is not None and root_tree_node.cycle_free:
+            root_tree_node = ref(root_tree_node)
+        self._root_tree_node = root_tree_node
+
+    @property
+    def parent(self):
+        """
+        The parent node instance (``None`` for the root node, or if released, in cycle-free documents).
+        """
+        parent = self._parent
+        return parent() if parent.__class__ is ReferenceType else parent
+
+    @parent.setter
+    def parent(self, parent):
+        """
+        Set the parent node instance (stored as a weak reference in cycle-free documents).
+        :param parent: The parent node instance.
+        """
+        if parent is not None and self._root_tree_node.__class__ is ReferenceType:
+            parent = ref(parent)
+        self._parent = parent
+
+    def get_source_span(self, index):
+        """
+        Get the source span at the given index of the source spans of this node.
+        :param index: The index of the source span (0: raw content, 1: opening tag, 2: closing tag).
+        :return The ``(start, end)`` source span, or ``None`` if unknown.
+        """
+        source_spans = self.source_spans
+        return source_spans[index] if source_spans else None
+
+    def set_source_span(self, index, span):
+        """
+        Set the source span at the given index of the source spans of this node.
+        :param index: The index of the source span (0: raw content, 1: opening tag, 2: closing tag).
+        :param span: The ``(start, end)`` source span.
+        """
+        source_spans = list(self.source_spans or (None, None, None))
+        source_spans[index] = span
+        self.source_spans = tuple(source_spans)
+
+    # Source spans ``(start, end)`` of the raw content and of the opening and closing tags
+    # in the document source text (``None`` if unknown).
+    content_span = property(lambda self: self.get_source_span(0),
+                            lambda self, span: self.set_source_span(0, span))
+    source_open_tag_span = property(lambda self: self.get_source_span(1),
+                                    lambda self, span: self.set_source_span(1, span))
+    source_close_tag_span = property(lambda self: self.get_source_span(2),
+                                     lambda self, span: self.set_source_span(2, span))
+
+    def overload_options(self, options):
+        """
+        Overload the given class options (or set any extra attribute) for this node instance only.
+        :param options: Dictionary of options overload ``{key : value}``.
+        """
+        for key, value in options.items():
+            setattr(self, key, value)
+
+    def __getattr__(self, name):
+        """
+        Materialize lazy source strings (raw content, opening and closing tags source) and lazy attributes
+        (or the empty attributes dictionary of a node without attributes) on first access.
+        :param name: The attribute name.
+        :return The attribute value.
+        """
+        if name == 'attrs':
+            if self.attrs_offset is None:
+                self.attrs = value = {}
+                return value
+            root_tree_node = self.root_tree_node
+            value = parse_tag_attributes(self.source_open_tag, self.attrs_offset, self.name,
+                                         root_tree_node.opening_tag_ch, root_tree_node.closing_tag_ch)
+        else:
+            span_index = self.LAZY_SOURCE_SPAN_INDEXES.get(name)
+            if span_index is None:
+                raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
+            source_spans = self.source_spans
+            span = source_spans[span_index] if source_spans else None
+            value = self.root_tree_node.source_text[span[0]:span[1]] if span else ''
+        setattr(self, name, value)
+        return value
+
+    def materialize_source(self):
+        """
+        Materialize the lazy source strings and attributes of this node, to make the node independent of
+        the document source text.
+        """
+        for name in self.LAZY_SOURCE_ATTRIBUTES:
+            getattr(self, name)
+        getattr(self, 'attrs')
 
     def reset_root_tree_node(self, new_root_tree_node):
         """
         Reset the root tree node instance of this node and all child nodes recursively.
+        N.B. Lazy source strings are materialized when the node is moved to another document.
         :param new_root_tree_node: The new root tree node instance
         """
-        self.root_tree_node = new_root_tree_node
-        for child in self.children:
-            child.reset_root_tree_node(new_root_tree_node)
+        for tree_node in iter_tree_preorder(self):
+            if tree_node.root_tree_node is not new_root_tree_node:
+                tree_node.materialize_source()
+            tree_node.root_tree_node = new_root_tree_node
 
     def new_child(self, name, node_cls, append=True, **kwargs):
         """
@@ -137,9 +538,11 @@ class TreeNode(object):
         :param kwargs: Keyword arguments for the tree node class constructor.
         :return: The newly created node instance.
         """
-        new_child_node = node_cls(self.root_tree_node, self, name, **kwargs)
+        root_tree_node = self.root_tree_node
+        new_child_node = node_cls(root_tree_node, self, name, **kwargs)
         if append:
             self.children.append(new_child_node)
+            root_tree_node.add_to_nodes_index(new_child_node)
         return new_child_node
 
     def get_raw_content(self, recursive=True):
@@ -148,11 +551,22 @@ class TreeNode(object):
         :param recursive: Set to ``True`` to include any child nodes content (default ``True``).
         :return The raw content of this node and of children nodes, if requested.
         """
-        content = self.content
-        if recursive:
-            for child_node in self.children:
-                content += child_node.get_raw_content()
-        return content
+        if not recursive or not self.children:
+            return self.content
+
+        # Collect the raw content of all nodes of the subtree in document order (iterative, joined once).
+        # Nodes overriding this method are asked for their own raw content.
+        get_raw_content = TreeNode.get_raw_content
+        contents = [self.content]
+        walker = iter_tree_preorder(self, lambda tree_node: tree_node is self or
+                                    tree_node.__class__.get_raw_content is get_raw_content)
+        next(walker)
+        for tree_node in walker:
+            if tree_node.__class__.get_raw_content is not get_raw_content:
+                contents.append(tree_node.get_raw_content())
+            else:
+                contents.append(tree_node.content)
+        return ''.join(contents)
 
     def get_attribute_value(self, *fields, default=''):
         """
@@ -169,6 +583,21 @@ class TreeNode(object):
                 return value
         return default
 
+    def set_attribute_value(self, attr_name, value):
+        """
+        Set the value of the given attribute.
+        The shared empty attributes dictionary of an internal text or newline node is replaced by a new dictionary.
+        :param attr_name: The attribute name.
+        :param value: The attribute value.
+        """
+        attrs = self.attrs
+        if attrs is EMPTY_ATTRS:
+            if self.root_tree_node.frozen:
+                raise TypeError('Frozen document trees are immutable, '
+                                'use a document overlay for per-request settings.')
+            attrs = self.attrs = {}
+        attrs[attr_name] = value
+
     def has_attribute_switch_set(self, attr_name, name_attr_value=None):
         """
         Check if the given attribute switch is set or not.
@@ -186,22 +615,41 @@ class TreeNode(object):
         :param node_cls: The class type to search for (or a tuple of class types).
         """
 
-        # Check the current tree node first
-        if isinstance(self, node_cls):
-            yield self
+        for tree_node in iter_tree_preorder(self):
+            if isinstance(tree_node, node_cls):
+                yield tree_node
 
-        # Check all children nodes
-        for child in self.children:
-            yield from child.search_in_tree(node_cls)
+    def get_structural_hash_data(self):
+        """
+        Return the data of this node (class and children excluded) covered by the structural hash of this node:
+        the name, the attributes, the raw content, the error message (with the source strings for erroneous
+        nodes) and the class options overloaded for this node instance only (see ``overload_options``, private
+        attributes excluded). See ``compute_structural_hashes``.
+        :return: The node data, as a tuple of strings (and tuples of strings).
+        """
+        attrs = self.attrs
+        attrs = tuple(sorted(attrs.items())) if attrs else ()
+        error_message = self.error_message
+        if error_message:
+            data = self.name, attrs, self.content, error_message, self.source_open_tag, self.source_close_tag
+        else:
+            data = self.name, attrs, self.content
+        instance_attributes = vars(self)
+        if instance_attributes.keys() <= self.STRUCTURAL_HASH_EXCLUDED_ATTRIBUTES:
+            return data
+        overloaded_options = tuple(sorted((key, value) for key, value in instance_attributes.items()
+                                          if key not in self.STRUCTURAL_HASH_EXCLUDED_ATTRIBUTES
+                                          and not key.startswith('_')))
+        if overloaded_options:
+            data += (repr(get_stable_cls_key(overloaded_options)), )
+        return data
 
     def has_errors(self):
         """
         Walk down the tree and return ``True`` only if at least one node is erroneous.
         """
-        if self.error_message:
-            return True
-        for child in self.children:
-            if child.has_errors():
+        for tree_node in iter_tree_preorder(self):
+            if tree_node.error_message:
                 return True
         return False
 
@@ -307,21 +755,209 @@ class RootTreeNode(TreeNode):
     Subclass of the ``TreeNode`` class which set ``parent=None``.
     This class is special, unwrap and delete operations are not supported.
     Attributes dictionary is not used for rendering, but instead, as a document-level data container.
+
+    In a cycle-free document, all nodes (root node included) keep weak references to their parent and root nodes,
+    so the whole document tree is freed by reference counting as soon as the root tree node is released, without
+    waiting for the cyclic garbage collector. The root tree node must be kept alive as long as any node of the
+    document is used. Otherwise, ``dispose`` can be used to break the reference cycles of a document explicitly.
+
+    A frozen document (see ``freeze``) has immutable children lists and attributes and can be cached and rendered
+    concurrently. Per-request settings (smileys, cosmetics, relative URLs, etc.) and root-level state are stored in
+    a ``DocumentOverlay``.
     """
 
+    __slots__ = ('known_ids', 'source_text', 'opening_tag_ch', 'closing_tag_ch', 'indexed_nodes', 'indexed_positions')
+
     make_paragraphs_here = True
 
     is_root = True
 
-    def __init__(self, attrs=None, children=None, **kwargs):
+    # Root reference of all nodes of the document, once frozen (see ``freeze``)
+    frozen_root_reference = None
+
+    def __init__(self, attrs=None, children=None, source_text='', cycle_free=False, **kwargs):
         """
         Create a new root tree node.
         :param attrs: The root node attributes dictionary (default to an empty dictionary).
         :param children: The root node children list (default to an empty list).
+        :param source_text: The document source text, with normalized newlines (default to an empty string).
+        Source spans of all nodes of the document are offsets in this text.
+        :param cycle_free: Set to ``True`` to create a cycle-free document (default to ``False``).
         """
+        if cycle_free:
+            self.cycle_free = True
         self.known_ids = set()
+        self.source_text = source_text
+
+        # Opening and closing tag chars of the document source, for lazy attributes
+        self.opening_tag_ch = '['
+        self.closing_tag_ch = ']'
+
+        # Index of the nodes of the document by class (built on first lookup if some children are given)
+        self.indexed_nodes = None
+        self.indexed_positions = None
+        if not children:
+            self.indexed_nodes = []
+            self.indexed_positions = {}
         super(RootTreeNode, self).__init__(self, None, None, attrs=attrs, children=children, **kwargs)
 
+        # The document-level data container is always a (writable) dictionary
+        if attrs is not None:
+            self.attrs = attrs
+
+    @property
+    def frozen(self):
+        """
+        ``True`` if the document tree is frozen (see ``freeze``).
+        """
+        return self.frozen_root_reference is not None
+
+    def freeze(self):
+        """
+        Freeze the document tree structure and data (iterative walk). Once frozen, children lists are replaced by
+        tuples, attributes dictionaries (materialized if lazy) by read-only dictionaries (the shared ``EMPTY_ATTRS``
+        dictionary for nodes without attributes), the known IDs set by a frozenset, and the nodes index is built
+        once for all.
+        N.B. The node instances themselves are not frozen: the tags still set some node attributes while rendering
+        (error messages of erroneous tag attributes, like a bad table cell column span, and footnote or figure
+        counter caches). These values only depend on the frozen document, so all renders see the same values.
+        Assigning any other node attribute (children, attributes, options overloads) is not supported.
+        All nodes of the document (root node included) see the active ``DocumentOverlay`` of the calling thread
+        as their root tree node, for per-request settings and state. Tree changes, like ``make_paragraphs`` and
+        ``make_auto_title_ids``, must be done before freezing the document.
+        """
+        if self.frozen:
+            return
+        if self.indexed_nodes is None:
+            self.rebuild_nodes_index()
+        frozen_root_reference = get_frozen_root_reference(self, self.cycle_free)
+        for tree_node in iter_tree_preorder(self):
+            attrs = tree_node.attrs
+            if attrs.__class__ is dict:
+                tree_node.attrs = FrozenAttributesDict(attrs) if attrs or tree_node is self else EMPTY_ATTRS
+            tree_node.children = tuple(tree_node.children)
+            tree_node._root_tree_node = frozen_root_reference
+        self.known_ids = frozenset(self.known_ids)
+        self.frozen_root_reference = frozen_root_reference
+
+    def dispose(self):
+        """
+        Release the document tree: break the references of all nodes to their parent and root nodes (iterative
+        walk) and remove all children nodes of the root tree node. The document tree (and any node of it still
+        referenced elsewhere) is then freed by reference counting, and must not be used anymore.
+        """
+        nodes_stack = [self]
+        while nodes_stack:
+            tree_node = nodes_stack.pop()
+            tree_node._parent = None
+            tree_node._root_tree_node = None
+            nodes_stack.extend(tree_node.children)
+        self.children = []
+        self.invalidate_nodes_index()
+
+    def add_to_nodes_index(self, tree_node):
+        """
+        Add the given node to the nodes index of the document (called by ``new_child`` for each appended node).
+        The nodes index is a list of all nodes of the document (root node excluded), in document order, and
+        the positions of the nodes of each class in this list. Nodes created by the tree builder are always
+        appended in document order. If the given node is not the last node of the document in document order,
+        the nodes index is invalidated and will be rebuilt on the next lookup.
+        N.B. The nodes index is not updated when a children list is modified directly: call
+        ``invalidate_nodes_index`` after such changes (``make_paragraphs`` does it), see ``search_in_tree``.
+        :param tree_node: The newly appended tree node.
+        """
+        indexed_nodes = self.indexed_nodes
+        if indexed_nodes is None:
+            return
+
+        # The node must be the last child of an ancestor (or self) of the last indexed node
+        parent = tree_node.parent
+        last_node = indexed_nodes[-1] if indexed_nodes else self
+        while last_node is not parent:
+            last_node = last_node.parent
+            if last_node is None:
+                self.invalidate_nodes_index()
+                return
+
+        # Index the node
+        node_cls = tree_node.__class__
+        positions = self.indexed_positions.get(node_cls)
+        if positions is None:
+            positions = self.indexed_positions[node_cls] = array('i')
+        positions.append(len(indexed_nodes))
+        indexed_nodes.append(tree_node)
+
+    def invalidate_nodes_index(self):
+        """
+        Invalidate the nodes index of the document, the index will be rebuilt on the next lookup.
+        """
+        self.indexed_nodes = None
+        self.indexed_positions = None
+
+    def rebuild_nodes_index(self):
+        """
+        Rebuild the nodes index of the document from the document tree (iterative pre-order walk).
+        """
+        indexed_nodes = []
+        indexed_positions = {}
+        iterators_stack = [iter(self.children)]
+        while iterators_stack:
+            for tree_node in iterators_stack[-1]:
+                node_cls = tree_node.__class__
+                positions = indexed_positions.get(node_cls)
+                if positions is None:
+                    positions = indexed_positions[node_cls] = array('i')
+                positions.append(len(indexed_nodes))
+                indexed_nodes.append(tree_node)
+                if tree_node.children:
+                    iterators_stack.append(iter(tree_node.children))
+                    break
+            else:
+                iterators_stack.pop()
+        self.indexed_nodes = indexed_nodes
+        self.indexed_positions = indexed_positions
+
+    def search_in_tree(self, node_cls, use_index=None):
+        """
+        Yield any node of the document matching the given class, in document order.
+        If the nodes index of the document is used, only the matching nodes are visited. The nodes index is not
+        updated when a children list is modified directly, so it is only used by default for frozen documents.
+        :param node_cls: The class type to search for (or a tuple of class types).
+        :param use_index: Set to ``True`` to use the nodes index (rebuilt if invalidated), if no children list was
+        modified directly since the document was built or since the last call to ``rebuild_nodes_index``. Set to
+        ``False`` to walk down the tree. Default to ``None``, use the nodes index only if the document is frozen.
+        """
+        if use_index is None:
+            use_index = self.frozen
+        if not use_index:
+            yield from super(RootTreeNode, self).search_in_tree(node_cls)
+            return
+
+        # Check the root tree node first
+        if isinstance(self, node_cls):
+            yield self
+
+        # Lookup the nodes index (rebuilt if necessary)
+        if self.indexed_nodes is None:
+            self.rebuild_nodes_index()
+        indexed_nodes = self.indexed_nodes
+        matching_positions = [positions for cls, positions in self.indexed_positions.items()
+                              if issubclass(cls, node_cls)]
+        if len(matching_positions) == 1:
+            matching_positions = matching_positions[0]
+        else:
+            matching_positions = merge(*matching_positions)
+        for position in matching_positions:
+            yield indexed_nodes[position]
+
+    def get_structural_hash_data(self):
+        """
+        Return the data of the root tree node covered by the structural hash of the document: nothing.
+        The document-level attributes are settings, not content.
+        :return: The node data, as an empty tuple.
+        """
+        return ()
+
     def render_html(self, inner_html, **kwargs):
         """
         Callback function for rendering HTML.
@@ -341,26 +977,99 @@ class RootTreeNode(TreeNode):
         return inner_text
 
 
+def get_stable_cls_key(value):
+    """
+    Turn the given class key (or part of class key) into a value with a stable ``repr``: classes and functions are
+    replaced by their qualified name (their default ``repr`` holds their memory address), recursively in tuples,
+    lists and dictionaries (sorted by key).
+    :param value: The class key (or part of class key).
+    :return: The stable class key.
+    """
+    if isinstance(value, (tuple, list)):
+        return tuple(get_stable_cls_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, get_stable_cls_key(item)) for key, item in value.items()))
+    if isinstance(value, type) or callable(value) and hasattr(value, '__qualname__'):
+        return '{}.{}'.format(value.__module__, value.__qualname__)
+    return value
+
+
+def register_generated_node_cls(node_cls, *cls_key):
+    """
+    Register the given generated tree node class (class created at runtime by a generator function) in the module
+    of its generator, under a stable name made of the canonical tag name and of a digest of the given class key.
+    Generated classes are so importable, and can be pickled (like the tree nodes of these classes) by any process
+    generating the same classes at import time. If a class is already registered with the same key, the registered
+    class is returned instead, so a generator always returns the same class for the same arguments.
+    N.B. Only the qualified name of the class (used by pickle) is set to the registered name, the class name
+    (used for display) is kept. The class key is stored in the ``generated_cls_key`` class attribute.
+    :param node_cls: The generated tree node class.
+    :param cls_key: The class key (the generator arguments, see ``get_stable_cls_key``).
+    :return: The registered tree node class.
+    :raise ValueError: If another object is already registered under the same name (digest collision).
+    """
+    cls_key = repr(get_stable_cls_key(cls_key))
+    cls_name = '{}_{}_{}'.format(node_cls.__name__, re.sub(r'\W', '_', node_cls.canonical_tag_name),
+                                 blake2b(cls_key.encode('utf-8'), digest_size=4).hexdigest())
+    node_cls.__qualname__ = cls_name
+    node_cls.generated_cls_key = cls_key
+    registered_cls = vars(sys.modules[node_cls.__module__]).setdefault(cls_name, node_cls)
+    if registered_cls is not node_cls and getattr(registered_cls, 'generated_cls_key', None) != cls_key:
+        raise ValueError('{}.{} is already registered for another class key'.format(node_cls.__module__, cls_name))
+    return registered_cls
+
+
+def compute_structural_hashes(tree_node):
+    """
+    Compute the structural hash of the given tree node and all children nodes (iterative, children first).
+    The structural hash of a node is a digest of the node class qualified name, of the node data (see
+    ``TreeNode.get_structural_hash_data``) and of the structural hashes of its children, in order (Merkle tree).
+    Derived tag classes of dialects with options overloads are registered under names made of a digest of the
+    options (see ``build_overloaded_tag_classes``), so differently configured dialects give different hashes.
+    Identical subtrees have the same hash, in the same document or not, and the hashes are stable between processes
+    (the node data is serialized with the version 2 of the ``marshal`` format, without references). Document-level
+    state, like the footnotes counter, is not covered. The hash of each node is stored in its ``structural_hash``
+    attribute.
+    :param tree_node: The tree node to be hashed.
+    :return: The structural hash of the given tree node (16 bytes).
+    """
+    class_names = {}
+    for cur_node in iter_tree_postorder(tree_node):
+        node_cls = cur_node.__class__
+        class_name = class_names.get(node_cls)
+        if class_name is None:
+            class_name = class_names[node_cls] = node_cls.__module__ + '.' + node_cls.__qualname__
+        node_hash = blake2b(marshal_dumps((class_name, cur_node.get_structural_hash_data()), 2), digest_size=16)
+        for child_node in cur_node.children:
+            node_hash.update(child_node.structural_hash)
+        cur_node.structural_hash = node_hash.digest()
+    return tree_node.structural_hash
+
+
 def debug_print_ast(tree_node, indent_level=0, expected_parent=None, print_fnct=print):
     """
     Print the given AST tree to stdout for debugging purposes.
     :param tree_node: The tree node to be printed to stdout.
-    :param indent_level: The current indentation level (default to 0).
+    :param indent_level: The indentation level of the given tree node (default to 0).
     :param expected_parent: The excepted parent instance (for fast error detection during debug).
     :param print_fnct: Function to use for printing to stdout (default to ``print``).
     """
+    parents_stack = [expected_parent]
+    for event, cur_node in iter_tree_events(tree_node):
+
+        # Restore the parent of the next sibling nodes
+        if event == WALK_EXIT:
+            parents_stack.pop()
+            continue
 
-    # Print info about the current tree node
-    print_fnct('{indent}{classname}(name="{name}", attrs={attrs}, '
-               'content={content}, len(children)={nchild})'.format(
-                    indent='    ' * indent_level,
-                    classname=tree_node.__class__.__name__,
-                    name=tree_node.name,
-                    attrs=tree_node.attrs,
-                    content=repr(tree_node.content),
-                    nchild=len(tree_node.children)),
-               '!! Parent mismatch !!' if tree_node.parent != expected_parent else '')
-
-    # Process all children
-    for child_node in tree_node.children:
-        debug_print_ast(child_node, indent_level + 1, tree_node, print_fnct)
+        # Print info about the current tree node
+        print_fnct('{indent}{classname}(name="{name}", attrs={attrs}, '
+                   'content={content}, len(children)={nchild})'.format(
+                        indent='    ' * (indent_level + len(parents_stack) - 1),
+                        classname=cur_node.__class__.__name__,
+                        name=cur_node.name,
+                        attrs=cur_node.attrs,
+                        content=repr(cur_node.content),
+                        nchild=len(cur_node.children)),
+                   '!! Parent mismatch !!' if cur_node.parent != parents_stack[-1] else '')
+        parents_stack.append(cur_node)
@@ -0,0 +1,465 @@
+"""
+SkCode flat document tree (struct-of-arrays) code.
+"""
+
+from array import array
+from functools import lru_cache
+
+from .etree import TreeNode, RootTreeNode, EMPTY_ATTRS
+from .render import render_to_html, render_to_text
+
+
+# Base slots of the tree node classes (not stored as extra per-node data)
+BASE_NODE_SLOTS = frozenset(TreeNode.__slots__ + RootTreeNode.__slots__)
+
+
+@lru_cache(maxsize=1024)
+def get_extra_slots(node_cls):
+    """
+    Get the names of the extra slots of the given tree node class (slots not defined by ``TreeNode``
+    and ``RootTreeNode``), like the text pieces of text runs.
+    :param node_cls: The tree node class.
+    :return: The tuple of extra slot names.
+    """
+    extra_slots = []
+    for cls in node_cls.__mro__:
+        for name in vars(cls).get('__slots__', ()):
+            if name not in BASE_NODE_SLOTS and not name.startswith('__') and name not in extra_slots:
+                extra_slots.append(name)
+    return tuple(extra_slots)
+
+
+class FlatTreeNodeView(object):
+    """
+    Mixin class for the (on demand) views of the nodes of a flat document tree.
+
+    A view is an instance of a derived class of the original node class (see ``get_flat_view_cls``), so the
+    rendering callbacks and the ``isinstance`` checks work as usual. The parent node, the children list, the
+    attributes and the source strings are read from the arrays of the flat document tree on first access.
+    N.B. Views are snapshots, modifications of a view are not written back to the flat document tree, except for
+    the attributes, which are stored in the attributes table of the flat document tree.
+    """
+
+    __slots__ = ()
+
+    def has_materialized_children(self):
+        """
+        Return ``True`` if the children list of this view has been created (and maybe modified).
+        """
+        try:
+            object.__getattribute__(self, 'children')
+        except AttributeError:
+            return False
+        return True
+
+    def search_in_tree(self, node_cls):
+        """
+        Walk down the tree and yield any node matching the given class.
+        The arrays of the flat document tree are scanned directly if the children list was not created yet.
+        :param node_cls: The class type to search for (or a tuple of class types).
+        """
+        if self.has_materialized_children():
+            yield from super(FlatTreeNodeView, self).search_in_tree(node_cls)
+            return
+        flat_document = self.flat_document
+        for node_index in flat_document.iter_matching_indexes(node_cls, self.flat_index):
+            yield self if node_index == self.flat_index else flat_document.get_node(node_index)
+
+    def get_raw_content(self, recursive=True):
+        """
+        Return the raw content of this node and of children nodes if ``recursive=True``.
+        The arrays of the flat document tree are read directly if the children list was not created yet, unless
+        the node class overrides this method.
+        :param recursive: Set to ``True`` to include any child nodes content (default ``True``).
+        :return The raw content of this node and of children nodes, if requested.
+        """
+        if recursive and not self.has_materialized_children() \
+                and super(FlatTreeNodeView, self).get_raw_content.__func__ is TreeNode.get_raw_content:
+            return self.flat_document.get_raw_content(self.flat_index)
+        return super(FlatTreeNodeView, self).get_raw_content(recursive)
+
+    def set_attribute_value(self, attr_name, value):
+        """
+        Set the value of the given attribute (stored in the attributes table of the flat document tree).
+        :param attr_name: The attribute name.
+        :param value: The attribute value.
+        """
+        attrs = self.attrs = self.flat_document.get_attrs(self.flat_index)
+        attrs[attr_name] = value
+
+    def __getattr__(self, name):
+        """
+        Read the node data from the arrays of the flat document tree on first access.
+        :param name: The attribute name.
+        :return The attribute value.
+        """
+        flat_document = self.flat_document
+        flat_index = self.flat_index
+        if name == 'children':
+            value = [flat_document.get_node(child_index, self)
+                     for child_index in flat_document.iter_children_indexes(flat_index)]
+        elif name == 'parent':
+            parent_index = flat_document.parent_indexes[flat_index]
+            value = flat_document.get_node(parent_index) if parent_index >= 0 else None
+        elif name == 'attrs':
+            attrs_index = flat_document.attrs_indexes[flat_index]
+            if attrs_index >= 0:
+                value = flat_document.attrs_table[attrs_index]
+            elif self.shared_empty_attrs:
+                value = EMPTY_ATTRS
+            else:
+                value = flat_document.get_attrs(flat_index)
+        elif name in TreeNode.LAZY_SOURCE_SPAN_INDEXES:
+            value = flat_document.get_source_string(flat_index, TreeNode.LAZY_SOURCE_SPAN_INDEXES[name])
+        elif name == 'source_spans':
+            value = None
+        else:
+            return super(FlatTreeNodeView, self).__getattr__(name)
+        setattr(self, name, value)
+        return value
+
+
+@lru_cache(maxsize=1024)
+def get_flat_view_cls(node_cls):
+    """
+    Get the view class of the given tree node class (derived class, cached per class).
+    :param node_cls: The tree node class.
+    :return: The view class.
+    """
+    return type(node_cls.__name__, (FlatTreeNodeView, node_cls), {
+        '__slots__': ('flat_document', 'flat_index'),
+        '__doc__': node_cls.__doc__,
+        '__qualname__': node_cls.__qualname__,
+    })
+
+
+class FlatDocumentTree(object):
+    """
+    Flat (struct-of-arrays) representation of a document tree.
+
+    All nodes are stored in document order (pre-order, the root node is the node ``0``), as parallel arrays:
+    - ``type_ids``: index of the node class in ``node_classes``,
+    - ``name_ids``: index of the node name in ``names``,
+    - ``parent_indexes``, ``first_child_indexes``, ``next_sibling_indexes``: node indexes (``-1`` if none),
+    - ``source_offsets``: ``(start, end)`` offsets of the raw content, opening and closing tag source strings
+      in ``text`` (six offsets per node),
+    - ``attrs_indexes``: index of the attributes dictionary in ``attrs_table`` (``-1`` if empty).
+    Per-instance data (error messages, class options overloads, text pieces of text runs, etc) are stored in
+    the ``extras`` dictionary ``{node index: {name: value}}``.
+
+    The source strings are slices of the document source text when the tree was built with source spans, the other
+    strings are appended (once each) at the end of the text. The whole structure can be pickled or shared as-is,
+    and ``TreeNode`` compatible views of any node are created on demand.
+    """
+
+    def __init__(self, document_tree):
+        """
+        Flatten the given document tree.
+        :param document_tree: The root tree node of the document tree.
+        """
+        assert document_tree, "The document tree is mandatory."
+        assert document_tree.is_root, "The document tree must start from the root tree node."
+
+        # Document-level data
+        self.opening_tag_ch = document_tree.opening_tag_ch
+        self.closing_tag_ch = document_tree.closing_tag_ch
+        self.known_ids = set(document_tree.known_ids)
+
+        # Nodes arrays
+        self.type_ids = array('i')
+        self.name_ids = array('i')
+        self.parent_indexes = array('i')
+        self.first_child_indexes = array('i')
+        self.next_sibling_indexes = array('i')
+        self.source_offsets = array('i')
+        self.attrs_indexes = array('i')
+
+        # Lookup tables
+        self.node_classes = []
+        self.names = []
+        self.attrs_table = []
+        self.extras = {}
+
+        # Flatten the tree
+        source_text = document_tree.source_text
+        extra_strings = []
+        self._flatten(document_tree, source_text, extra_strings)
+        self.text = source_text + ''.join(extra_strings)
+        assert len(self.text) < 2 ** 31, "The document text is too large."
+
+    def _flatten(self, document_tree, source_text, extra_strings):
+        """
+        Fill the arrays with the nodes of the given document tree (iterative pre-order walk).
+        :param document_tree: The root tree node of the document tree.
+        :param source_text: The document source text.
+        :param extra_strings: The list of strings to be appended to the source text (filled on the fly).
+        """
+        class_ids = {}
+        name_ids = {}
+        extra_string_offsets = {'': (0, 0)}
+        extra_text_length = [len(source_text)]
+
+        def get_string_offsets(value):
+            """ Get the offsets of the given string in the flat text, appending it if necessary. """
+            offsets = extra_string_offsets.get(value)
+            if offsets is None:
+                start = extra_text_length[0]
+                extra_text_length[0] += len(value)
+                extra_strings.append(value)
+                offsets = extra_string_offsets[value] = start, start + len(value)
+            return offsets
+
+        last_child_indexes = []
+        nodes_stack = [(document_tree, -1)]
+        while nodes_stack:
+            tree_node, parent_index = nodes_stack.pop()
+            node_index = len(self.type_ids)
+
+            # Node class and name
+            node_cls = tree_node.__class__
+            type_id = class_ids.get(node_cls)
+            if type_id is None:
+                type_id = class_ids[node_cls] = len(self.node_classes)
+                self.node_classes.append(node_cls)
+            self.type_ids.append(type_id)
+            name_id = name_ids.get(tree_node.name)
+            if name_id is None:
+                name_id = name_ids[tree_node.name] = len(self.names)
+                self.names.append(tree_node.name)
+            self.name_ids.append(name_id)
+
+            # Tree structure
+            self.parent_indexes.append(parent_index)
+            self.first_child_indexes.append(-1)
+            self.next_sibling_indexes.append(-1)
+            last_child_indexes.append(-1)
+            if parent_index >= 0:
+                previous_index = last_child_indexes[parent_index]
+                if previous_index >= 0:
+                    self.next_sibling_indexes[previous_index] = node_index
+                else:
+                    self.first_child_indexes[parent_index] = node_index
+                last_child_indexes[parent_index] = node_index
+
+            # Source strings (source spans are used as-is, without materializing the lazy strings)
+            source_spans = tree_node.source_spans
+            for span_index, name in enumerate(('content', 'source_open_tag', 'source_close_tag')):
+                try:
+                    value = object.__getattribute__(tree_node, name)
+                except AttributeError:
+                    span = source_spans[span_index] if source_spans else None
+                    self.source_offsets.extend(span or (0, 0))
+                else:
+                    self.source_offsets.extend(get_string_offsets(value))
+
+            # Attributes (the document-level data of the root node is always stored)
+            attrs = tree_node.attrs
+            if attrs or not node_index:
+                self.attrs_indexes.append(len(self.attrs_table))
+                self.attrs_table.append(dict(attrs))
+            else:
+                self.attrs_indexes.append(-1)
+
+            # Per-instance data
+            extras = dict(vars(tree_node))
+            for name in get_extra_slots(node_cls):
+                try:
+                    extras[name] = object.__getattribute__(tree_node, name)
+                except AttributeError:
+                    pass
+            if extras:
+                self.extras[node_index] = extras
+
+            # Go down the tree (first child on top of the stack)
+            for child_node in reversed(tree_node.children):
+                nodes_stack.append((child_node, node_index))
+
+    def __len__(self):
+        """
+        Return the number of nodes (root node included).
+        """
+        return len(self.type_ids)
+
+    def __getstate__(self):
+        """
+        Return the state of the flat document tree for pickling (without the cached root node view).
+        """
+        state = dict(self.__dict__)
+        state.pop('_root_node', None)
+        return state
+
+    def iter_children_indexes(self, node_index):
+        """
+        Yield the indexes of the children nodes of the given node.
+        :param node_index: The node index.
+        """
+        child_index = self.first_child_indexes[node_index]
+        next_sibling_indexes = self.next_sibling_indexes
+        while child_index >= 0:
+            yield child_index
+            child_index = next_sibling_indexes[child_index]
+
+    def get_subtree_end(self, node_index):
+        """
+        Get the index following the last node of the subtree of the given node.
+        All nodes of the subtree of the given node have an index in ``range(node_index, subtree_end)``.
+        :param node_index: The node index.
+        :return The index following the last node of the subtree.
+        """
+        while node_index >= 0:
+            next_sibling_index = self.next_sibling_indexes[node_index]
+            if next_sibling_index >= 0:
+                return next_sibling_index
+            node_index = self.parent_indexes[node_index]
+        return len(self.type_ids)
+
+    def get_source_string(self, node_index, span_index):
+        """
+        Get a source string of the given node.
+        :param node_index: The node index.
+        :param span_index: The index of the source string (0: raw content, 1: opening tag, 2: closing tag).
+        :return The source string.
+        """
+        offset = node_index * 6 + span_index * 2
+        return self.text[self.source_offsets[offset]:self.source_offsets[offset + 1]]
+
+    def get_root_node(self):
+        """
+        Get the view of the root node (created on first call).
+        :return The root node view.
+        """
+        root_node = self.__dict__.get('_root_node')
+        if root_node is None:
+            root_node = self._root_node = self._new_view(0)
+            root_node.root_tree_node = root_node
+            root_node.parent = None
+            root_node.known_ids = self.known_ids
+            root_node.source_text = self.text
+            root_node.opening_tag_ch = self.opening_tag_ch
+            root_node.closing_tag_ch = self.closing_tag_ch
+            root_node.invalidate_nodes_index()
+        return root_node
+
+    def get_node(self, node_index, parent=None):
+        """
+        Get a (new) view of the given node.
+        :param node_index: The node index.
+        :param parent: The parent node view, if known (default to ``None``, created on first access).
+        :return The node view.
+        """
+        if not node_index:
+            return self.get_root_node()
+        tree_node = self._new_view(node_index)
+        tree_node.root_tree_node = self.get_root_node()
+        if parent is not None:
+            tree_node.parent = parent
+        return tree_node
+
+    def _new_view(self, node_index):
+        """
+        Create a new view of the given node.
+        :param node_index: The node index.
+        :return The node view.
+        """
+        view_cls = get_flat_view_cls(self.node_classes[self.type_ids[node_index]])
+        tree_node = view_cls.__new__(view_cls)
+        tree_node.flat_document = self
+        tree_node.flat_index = node_index
+        tree_node.name = self.names[self.name_ids[node_index]]
+        tree_node.attrs_offset = None
+        extras = self.extras.get(node_index)
+        if extras:
+            tree_node.overload_options(extras)
+        return tree_node
+
+    def get_attrs(self, node_index):
+        """
+        Get the attributes dictionary of the given node (added to the attributes table on first call, if empty).
+        :param node_index: The node index.
+        :return The attributes dictionary.
+        """
+        attrs_index = self.attrs_indexes[node_index]
+        if attrs_index < 0:
+            attrs_index = self.attrs_indexes[node_index] = len(self.attrs_table)
+            self.attrs_table.append({})
+        return self.attrs_table[attrs_index]
+
+    def iter_matching_indexes(self, node_cls, node_index=0):
+        """
+        Yield the index of any node of the subtree of the given node matching the given class, in document order.
+        Only the type ids array is scanned.
+        :param node_cls: The class type to search for (or a tuple of class types).
+        :param node_index: The node index (default to the root node).
+        """
+        matching_type_ids = {type_id for type_id, cls in enumerate(self.node_classes) if issubclass(cls, node_cls)}
+        if not matching_type_ids:
+            return
+        type_ids = self.type_ids
+        for index in range(node_index, self.get_subtree_end(node_index)):
+            if type_ids[index] in matching_type_ids:
+                yield index
+
+    def search_in_tree(self, node_cls):
+        """
+        Yield a view of any node matching the given class, in document order.
+        Views are only created for matching nodes.
+        :param node_cls: The class type to search for (or a tuple of class types).
+        """
+        for node_index in self.iter_matching_indexes(node_cls):
+            yield self.get_node(node_index)
+
+    def get_raw_content(self, node_index=0):
+        """
+        Return the raw content of the given node and of all children nodes.
+        Nodes of classes overriding ``TreeNode.get_raw_content`` are asked for their own raw content (with a view).
+        :param node_index: The node index (default to the root node).
+        :return The raw content.
+        """
+        text = self.text
+        source_offsets = self.source_offsets
+        subtree_end = self.get_subtree_end(node_index)
+        overriding_type_ids = {type_id for type_id, cls in enumerate(self.node_classes)
+                               if cls.get_raw_content is not TreeNode.get_raw_content}
+        if not overriding_type_ids:
+            return ''.join(text[source_offsets[index * 6]:source_offsets[index * 6 + 1]]
+                           for index in range(node_index, subtree_end))
+
+        # Slow path: skip the subtree of the overriding nodes
+        type_ids = self.type_ids
+        contents = []
+        index = node_index
+        while index < subtree_end:
+            if type_ids[index] in overriding_type_ids:
+                contents.append(self.get_node(index).get_raw_content())
+                index = self.get_subtree_end(index)
+            else:
+                contents.append(text[source_offsets[index * 6]:source_offsets[index * 6 + 1]])
+                index += 1
+        return ''.join(contents)
+
+    def has_errors(self, node_index=0):
+        """
+        Return ``True`` only if at least one node of the subtree of the given node is erroneous.
+        :param node_index: The node index (default to the root node).
+        """
+        subtree_end = self.get_subtree_end(node_index)
+        for index, extras in self.extras.items():
+            if node_index <= index < subtree_end and extras.get('error_message'):
+                return True
+        return False
+
+    def render_to_html(self, **kwargs):
+        """
+        Render the document as HTML (see ``render_to_html``).
+        :param kwargs: Extra keyword arguments for rendering.
+        :return The rendered HTML.
+        """
+        return render_to_html(self.get_root_node(), **kwargs)
+
+    def render_to_text(self, **kwargs):
+        """
+        Render the document as text (see ``render_to_text``).
+        :param kwargs: Extra keyword arguments for rendering.
+        :return The rendered text.
+        """
+        return render_to_text(self.get_root_node(), **kwargs)
@@ -0,0 +1,76 @@
+"""
+SkCode document overlay (per-request settings of frozen document trees) code.
+"""
+
+from collections import ChainMap
+
+from .render import render_to_html, render_to_text
+
+
+class DocumentOverlay(object):
+    """
+    Per-request overlay of a frozen document tree (see ``RootTreeNode.freeze``).
+
+    While the overlay is active in a thread (``with overlay:`` block, or the rendering methods of the overlay),
+    all nodes of the frozen document see the overlay as their root tree node. The overlay holds the document-level
+    attributes (``attrs``, written by the ``setup_*`` utilities), a copy of the known IDs set, and any root-level
+    state set by the tags (like the footnotes counter). Any other root-level attribute is read from the frozen
+    root tree node. A single cached document can so be rendered concurrently with different settings, without
+    any copy of the document tree.
+    """
+
+    def __init__(self, document_tree, attrs=None):
+        """
+        Create a new overlay for the given frozen document tree.
+        :param document_tree: The frozen document tree (root tree node).
+        :param attrs: The overlay attributes dictionary, looked up before the document attributes
+        (default to an empty dictionary).
+        """
+        assert document_tree, "Document tree is mandatory."
+        assert document_tree.is_root, "Document tree must be a root tree node instance."
+        assert document_tree.frozen, "Document tree must be frozen."
+        self.document_tree = document_tree
+        self.attrs = ChainMap(attrs if attrs is not None else {}, document_tree.attrs)
+        self.known_ids = set(document_tree.known_ids)
+
+    def __getattr__(self, name):
+        """
+        Read any other root-level attribute from the frozen root tree node.
+        :param name: The attribute name.
+        :return: The attribute value.
+        """
+        return getattr(self.document_tree, name)
+
+    def __enter__(self):
+        """
+        Activate the overlay for the calling thread.
+        :return: The overlay itself.
+        """
+        self.document_tree.frozen_root_reference.overlays.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Deactivate the overlay for the calling thread.
+        """
+        overlays = self.document_tree.frozen_root_reference.overlays
+        assert overlays and overlays[-1] is self, "The overlay is not the active one."
+        overlays.pop()
+
+    def render_to_html(self, **kwargs):
+        """
+        Render the document as HTML with this overlay (see ``render_to_html``).
+        :param kwargs: Extra keyword arguments for rendering.
+        :return The rendered HTML.
+        """
+        with self:
+            return render_to_html(self.document_tree, **kwargs)
+
+    def render_to_text(self, **kwargs):
+        """
+        Render the document as text with this overlay (see ``render_to_text``).
+        :param kwargs: Extra keyword arguments for rendering.
+        :return The rendered text.
+        """
+        with self:
+            return render_to_text(self.document_tree, **kwargs)
@@ -2,13 +2,24 @@
 SkCode tag parsing code.
 """
 
+import re
 import string
+from functools import lru_cache
+from sys import intern
 
 
 # Character charsets
 WHITESPACE_CHARSET = frozenset(string.whitespace)
 IDENTIFIER_CHARSET = frozenset(string.ascii_letters + string.digits + '_*')
 
+# Regex charsets (same charsets as above, for the compiled tag scanner)
+WHITESPACE_RE_CHARSET = r' \t\n\r\x0b\x0c'
+IDENTIFIER_RE_CHARSET = r'a-zA-Z0-9_*'
+
+# Escape sequences in quoted attribute values (only the quoting char and the backslash char can be escaped)
+DOUBLE_QUOTED_ESCAPE_RE = re.compile(r'\\(["\\])')
+SINGLE_QUOTED_ESCAPE_RE = re.compile(r"\\(['\\])")
+
 
 def skip_whitespaces(text: str, offset: int):
     """
@@ -27,7 +38,7 @@ def get_identifier(text: str, offset: int):
     Get the identifier string starting in the text at the given offset.
     :param text: The input text.
     :param offset: The current offset in the input text.
-    :return The identifier normalized as lowercase and the new offset in the input text.
+    :return The identifier normalized as lowercase (and interned) and the new offset in the input text.
     """
     identifier = ''
 
@@ -39,7 +50,7 @@ def get_identifier(text: str, offset: int):
         offset += 1
 
     # Normalize the identifier and return new values
-    return identifier.lower(), offset
+    return intern(identifier.lower()), offset
 
 
 def get_attribute_value(text: str, offset: int, opening_tag_ch: str, closing_tag_ch: str):
@@ -229,3 +240,252 @@ def parse_tag(text: str, start_offset: int,
     
     # Emit the tag
     return tag_name, is_closing_tag, is_self_closing_tag, tag_attrs, offset + 1
+
+
+@lru_cache(maxsize=16)
+def get_tag_scanner_patterns(opening_tag_ch='[', closing_tag_ch=']'):
+    """
+    Build (and cache) the compiled regex patterns used by ``scan_tag`` for the given tag chars.
+    :param opening_tag_ch: The opening tag char (must be one char long, default '[').
+    :param closing_tag_ch: The closing tag char (must be one char long, default ']').
+    :return A tuple ``(head_re, name_re, tail_re, attr_re, end_re)`` of compiled regex patterns.
+    """
+    ws = '[{}]'.format(WHITESPACE_RE_CHARSET)
+    ident = '[{}]'.format(IDENTIFIER_RE_CHARSET)
+    opening_ch = re.escape(opening_tag_ch)
+    closing_ch = re.escape(closing_tag_ch)
+
+    # Attribute value, quoted (with escape sequences) or unquoted, followed by a mandatory closing
+    # tag char or whitespace, and any trailing whitespaces (three groups: double, single and unquoted value).
+    # N.B. ``(?!ws)`` after the equal sign forbid any backtracking into the leading whitespaces.
+    value_pattern = r'={ws}*(?!{ws})' \
+                    r'(?:"([^"\\]*(?:\\[\s\S][^"\\]*)*)"' \
+                    r"|'([^'\\]*(?:\\[\s\S][^'\\]*)*)'" \
+                    r'|(?![\'"])([^{o}{c}{ws_charset}]*))' \
+                    r'(?=[{c}{ws_charset}]){ws}*'.format(ws=ws, o=opening_ch, c=closing_ch,
+                                                         ws_charset=WHITESPACE_RE_CHARSET)
+
+    # Opening char, optional slash and tag name
+    name_pattern = r'{o}{ws}*(?:(/){ws}*)?({ident}+){ws}*'.format(o=opening_ch, ws=ws, ident=ident)
+
+    # Optional tag value, with an optional closing char for the (common) tags without named attributes
+    tail_pattern = r'({value})?({c})?'.format(value=value_pattern, c=closing_ch)
+
+    # Whole head of the tag and its two halves (for early tag name lookup)
+    head_re = re.compile(name_pattern + tail_pattern)
+    name_re = re.compile(name_pattern)
+    tail_re = re.compile(tail_pattern)
+
+    # Named attribute, with optional value
+    attr_re = re.compile(r'({ident}+){ws}*(?:{value})?'.format(ident=ident, ws=ws, value=value_pattern))
+
+    # End of tag, with optional self closing slash
+    end_re = re.compile(r'(/{ws}*)?{c}'.format(ws=ws, c=closing_ch))
+
+    return head_re, name_re, tail_re, attr_re, end_re
+
+
+def get_matched_attribute_value(match, first_group):
+    """
+    Get the attribute value from a regex match of an attribute value pattern (see ``get_tag_scanner_patterns``).
+    :param match: The regex match object.
+    :param first_group: The index of the first group of the value pattern (double quoted value).
+    :return The attribute value with escape sequences processed and trailing whitespaces removed.
+    """
+    double_quoted_value, single_quoted_value, unquoted_value = match.group(first_group,
+                                                                           first_group + 1,
+                                                                           first_group + 2)
+    if double_quoted_value is not None:
+        return unescape_quoted_value(double_quoted_value, '"', DOUBLE_QUOTED_ESCAPE_RE).strip()
+    if single_quoted_value is not None:
+        return unescape_quoted_value(single_quoted_value, "'", SINGLE_QUOTED_ESCAPE_RE).strip()
+    return unquoted_value.strip()
+
+
+def unescape_quoted_value(value, quoting_ch, escape_re):
+    """
+    Process the escape sequences of a quoted attribute value.
+    Only the quoting char and the backslash char can be escaped, any other escape sequence is kept as-is.
+    :param value: The raw quoted attribute value (without the quotes).
+    :param quoting_ch: The quoting char.
+    :param escape_re: The compiled escape sequences regex for the quoting char.
+    :return The attribute value with escape sequences processed.
+    """
+
+    # Shortcut for values without escape sequence
+    if '\\' not in value:
+        return value
+
+    # Without escaped backslash, all escaped quotes can be replaced at once
+    if '\\\\' not in value:
+        return value.replace('\\' + quoting_ch, quoting_ch)
+
+    # Process escape sequences from left to right
+    return escape_re.sub(lambda match: match.group(1), value)
+
+
+def scan_tag(text: str, start_offset: int,
+             opening_tag_ch='[', closing_tag_ch=']',
+             allow_tagvalue_attr=True, allow_self_closing_tags=True,
+             recognized_tag_names=None,
+             max_tag_length=4096, max_attrs_count=32,
+             lazy_attrs=False):
+    """
+    Exception-free, regex-driven variant of ``parse_tag`` (used by the tokenizer).
+    Return exactly the same result as ``parse_tag`` for any valid tag (within the tag length and attributes
+    count limits), or ``None`` if the text at ``start_offset`` is not a valid tag (where ``parse_tag`` would
+    raise an exception).
+    :param text: The input text.
+    :param start_offset: The offset in the input text to start with.
+    :param opening_tag_ch: The opening tag char (must be one char long, default '[').
+    :param closing_tag_ch: The closing tag char (must be one char long, default ']').
+    :param allow_tagvalue_attr: Set to ``True`` to allow the BBcode ``tagname=tagvalue`` syntax shortcut
+    (default is ``True``).
+    :param allow_self_closing_tags: Set to ``True`` to allow the self closing tags syntax (default is ``True``).
+    :param recognized_tag_names: If set, any tag with a name not in this container (set or dictionary
+    of lowercase tag names) is rejected right after reading the tag name, without parsing the attributes
+    (default is ``None``, accept any tag name).
+    :param max_tag_length: The maximum length of a tag, including the opening and closing chars (default to 4096).
+    Longer tags are rejected without looking further in the text. Set to zero to disable (not recommended
+    because a Denial-Of-Service is possible if the tag length is not limited, see ``tokenize_tag``).
+    :param max_attrs_count: The maximum number of attributes of a tag, including the tag value (default to 32).
+    Set to zero to disable.
+    :param lazy_attrs: If set to ``True``, the attributes are only checked, without building the attributes
+    dictionary. ``tag_attrs`` is then the offset of the attributes section, relative to ``start_offset``, or ``None``
+    if the tag does not have any attribute (see ``parse_tag_attributes``, default is ``False``).
+    :return A tuple ``(tag_name, is_closing_tag, is_self_closing_tag, tag_attrs, offset + 1)`` on success, or
+    ``None`` on error.
+    """
+    head_re, name_re, tail_re, attr_re, end_re = get_tag_scanner_patterns(opening_tag_ch, closing_tag_ch)
+
+    # Never look further than the maximum tag length
+    end_offset = len(text)
+    if max_tag_length and start_offset + max_tag_length < end_offset:
+        end_offset = start_offset + max_tag_length
+
+    # Get the opening char, the closing slash, the tag name and the tag value
+    if recognized_tag_names is None:
+        match = head_re.match(text, start_offset, end_offset)
+        if match is None:
+            return None
+        is_closing_tag, tag_name, tag_value, closing_ch = match.group(1, 2, 3, 7)
+        tag_name = intern(tag_name.lower())
+        tag_value_group = 4
+
+    else:
+        match = name_re.match(text, start_offset, end_offset)
+        if match is None:
+            return None
+        is_closing_tag, tag_name = match.groups()
+        tag_name = intern(tag_name.lower())
+
+        # Reject unknown tag names early
+        if tag_name not in recognized_tag_names:
+            return None
+
+        # N.B. The tail pattern is made of optional groups only, it cannot fail
+        match = tail_re.match(text, match.end(), end_offset)
+        tag_value, closing_ch = match.group(1, 5)
+        tag_value_group = 2
+
+    # Handle tag value
+    if tag_value is None:
+
+        # Fast path for tags without attribute
+        if closing_ch is not None:
+            return tag_name, is_closing_tag is not None, False, None if lazy_attrs else {}, match.end()
+
+        # Closing tags cannot have attribute
+        if is_closing_tag is not None:
+            return None
+
+        attrs_offset = match.end()
+        tag_attrs = None if lazy_attrs else {}
+        attrs_count = 0
+
+    else:
+
+        # Closing tags cannot have attribute, also check for tag value support
+        if is_closing_tag is not None or not allow_tagvalue_attr:
+            return None
+
+        # Store the tag value
+        attrs_offset = match.start(tag_value_group - 1)
+        tag_attrs = None if lazy_attrs else {tag_name: get_matched_attribute_value(match, tag_value_group)}
+        attrs_count = 1
+
+        # Fast path for tags without named attribute
+        if closing_ch is not None:
+            return tag_name, False, False, attrs_offset - start_offset if lazy_attrs else tag_attrs, match.end()
+
+    # Named attributes handling
+    offset = match.end()
+    while offset < end_offset and text[offset] != closing_tag_ch and text[offset] != '/':
+
+        # Handle attributes count limit
+        if max_attrs_count and attrs_count >= max_attrs_count:
+            return None
+        attrs_count += 1
+
+        # Get the attribute name and value (only check the attribute in lazy mode)
+        match = attr_re.match(text, offset, end_offset)
+        if match is None:
+            return None
+        if tag_attrs is not None:
+            attr_name = intern(match.group(1).lower())
+            if match.lastindex > 1:
+                tag_attrs[attr_name] = get_matched_attribute_value(match, 2)
+            else:
+                tag_attrs[attr_name] = ''
+        offset = match.end()
+
+    # Handle end of tag and self closing tag
+    match = end_re.match(text, offset, end_offset)
+    if match is None:
+        return None
+    is_self_closing_tag = match.group(1) is not None
+    if is_self_closing_tag and not allow_self_closing_tags:
+        return None
+
+    # Emit the tag
+    if lazy_attrs:
+        tag_attrs = attrs_offset - start_offset if attrs_count else None
+    return tag_name, False, is_self_closing_tag, tag_attrs, match.end()
+
+
+def parse_tag_attributes(tag_source: str, attrs_offset: int, tag_name: str,
+                         opening_tag_ch='[', closing_tag_ch=']'):
+    """
+    Build the attributes dictionary of a tag checked by ``scan_tag`` in lazy attributes mode.
+    :param tag_source: The tag source string (from the opening char to the closing char).
+    :param attrs_offset: The offset of the attributes section in the tag source, as returned by ``scan_tag``
+    (``None`` if the tag does not have any attribute).
+    :param tag_name: The tag name (used as key for the tag value).
+    :param opening_tag_ch: The opening tag char (must be one char long, default '[').
+    :param closing_tag_ch: The closing tag char (must be one char long, default ']').
+    :return The attributes dictionary.
+    """
+    tag_attrs = {}
+    if attrs_offset is None:
+        return tag_attrs
+    head_re, name_re, tail_re, attr_re, end_re = get_tag_scanner_patterns(opening_tag_ch, closing_tag_ch)
+
+    # Get the tag value
+    # N.B. The tail pattern is made of optional groups only, it cannot fail
+    match = tail_re.match(tag_source, attrs_offset)
+    if match.group(1) is not None:
+        tag_attrs[tag_name] = get_matched_attribute_value(match, 2)
+    offset = match.end()
+    if match.group(5) is not None:
+        return tag_attrs
+
+    # Get the named attributes (the tag is already checked)
+    while tag_source[offset] != closing_tag_ch and tag_source[offset] != '/':
+        match = attr_re.match(tag_source, offset)
+        attr_name = intern(match.group(1).lower())
+        if match.lastindex > 1:
+            tag_attrs[attr_name] = get_matched_attribute_value(match, 2)
+        else:
+            tag_attrs[attr_name] = ''
+        offset = match.end()
+    return tag_attrs
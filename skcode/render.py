@@ -2,6 +2,8 @@
 SkCode rendering code.
 """
 
+from .etree import iter_tree_events, WALK_ENTER
+
 
 # Default HTML for error messages
 DEFAULT_ERROR_HTML_TEMPLATE = '<span style="font-weight: bold; color: red;" ' \
@@ -21,23 +23,17 @@ def render_inner_html(tree_node,
     :param kwargs: Extra keywords arguments for the ``render_html`` callback method.
     :return The rendered children tree as HTML.
     """
-
-    # Get the inner HTML
-    inner_html = []
-    for child_node in tree_node.children:
-        inner_html.append(render_to_html(child_node,
-                                         force_rel_nofollow=force_rel_nofollow,
-                                         html_error_template=html_error_template, **kwargs))
-
-    # Return the inner HTML as string
-    return ''.join(inner_html)
+    return ''.join(render_to_html(child_node,
+                                  force_rel_nofollow=force_rel_nofollow,
+                                  html_error_template=html_error_template, **kwargs)
+                   for child_node in tree_node.children)
 
 
 def render_to_html(tree_node,
                    force_rel_nofollow=True,
                    html_error_template=DEFAULT_ERROR_HTML_TEMPLATE, **kwargs):
     """
-    Render the given tree node and children recursively as HTML.
+    Render the given tree node and children as HTML (iterative, without recursion).
     :param tree_node: The tree node to be rendered.
     :param force_rel_nofollow: If set to ``True``, all links in the rendered HTML will have the attribute
         "rel=nofollow" to avoid search engines to scrawl them (default ``True``).
@@ -46,20 +42,31 @@ def render_to_html(tree_node,
     :return The rendered document tree as HTML.
     """
 
-    # Get the inner HTML
-    inner_html = render_inner_html(tree_node,
-                                   force_rel_nofollow=force_rel_nofollow,
-                                   html_error_template=html_error_template, **kwargs)
-
-    # Render the node
-    if tree_node.error_message:
-        return tree_node.render_error_html(inner_html,
-                                           force_rel_nofollow=force_rel_nofollow,
-                                           html_error_template=html_error_template, **kwargs)
-    else:
-        return tree_node.render_html(inner_html,
-                                     force_rel_nofollow=force_rel_nofollow,
-                                     html_error_template=html_error_template, **kwargs)
+    # Stack of the inner HTML pieces of each opened node (leaf nodes, like text and newlines, have no inner HTML)
+    inner_html_stack = [[]]
+    for event, cur_node in iter_tree_events(tree_node):
+
+        # Open a new inner HTML for the children
+        if event == WALK_ENTER:
+            if cur_node.children:
+                inner_html_stack.append([])
+            continue
+
+        # Render the node and append it to the parent inner HTML
+        inner_html = ''.join(inner_html_stack.pop()) if cur_node.children else ''
+        if cur_node.error_message:
+            inner_html_stack[-1].append(cur_node.render_error_html(inner_html,
+                                                                   force_rel_nofollow=force_rel_nofollow,
+                                                                   html_error_template=html_error_template,
+                                                                   **kwargs))
+        else:
+            inner_html_stack[-1].append(cur_node.render_html(inner_html,
+                                                             force_rel_nofollow=force_rel_nofollow,
+                                                             html_error_template=html_error_template,
+                                                             **kwargs))
+
+    # Return the rendered HTML of the given node
+    return inner_html_stack[0][0]
 
 
 def render_inner_text(tree_node, **kwargs):
@@ -69,29 +76,33 @@ def render_inner_text(tree_node, **kwargs):
     :param kwargs: Extra keywords arguments for the ``render_text`` callback method.
     :return The rendered children tree as text.
     """
-
-    # Get the inner text
-    inner_text = []
-    for child_node in tree_node.children:
-        inner_text.append(render_to_text(child_node, **kwargs))
-
-    # Return the inner text as string
-    return ''.join(inner_text)
+    return ''.join(render_to_text(child_node, **kwargs) for child_node in tree_node.children)
 
 
 def render_to_text(tree_node, **kwargs):
     """
-    Render the given tree node and children recursively as text.
+    Render the given tree node and children as text (iterative, without recursion).
     :param tree_node: The tree node to be rendered.
     :param kwargs: Extra keywords arguments for the ``render_text`` callback method.
     :return The rendered document tree as text.
     """
 
-    # Get the inner text
-    inner_text = render_inner_text(tree_node, **kwargs)
-
-    # Render the node
-    if tree_node.error_message:
-        return tree_node.render_error_text(inner_text, **kwargs)
-    else:
-        return tree_node.render_text(inner_text, **kwargs)
+    # Stack of the inner text pieces of each opened node (leaf nodes, like text and newlines, have no inner text)
+    inner_text_stack = [[]]
+    for event, cur_node in iter_tree_events(tree_node):
+
+        # Open a new inner text for the children
+        if event == WALK_ENTER:
+            if cur_node.children:
+                inner_text_stack.append([])
+            continue
+
+        # Render the node and append it to the parent inner text
+        inner_text = ''.join(inner_text_stack.pop()) if cur_node.children else ''
+        if cur_node.error_message:
+            inner_text_stack[-1].append(cur_node.render_error_text(inner_text, **kwargs))
+        else:
+            inner_text_stack[-1].append(cur_node.render_text(inner_text, **kwargs))
+
+    # Return the rendered text of the given node
+    return inner_text_stack[0][0]
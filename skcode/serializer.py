@@ -0,0 +1,337 @@
+"""
+SkCode compact binary serialization of document trees code.
+"""
+
+import sys
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from marshal import dumps as marshal_dumps, loads as marshal_loads
+from weakref import ref
+
+from .etree import TreeNode, RootTreeNode, EMPTY_ATTRS, iter_tree_preorder
+from .flattree import get_extra_slots
+from .tags import (
+    DEFAULT_RECOGNIZED_TAGS_LIST,
+    HardNewlineTreeNode,
+    NewlineTreeNode,
+    TextTreeNode,
+    TextRunTreeNode
+)
+from .utility.paragraphs import ParagraphTreeNode
+
+
+# Magic bytes and version of the binary format
+SERIALIZATION_MAGIC = b'SKCB'
+SERIALIZATION_VERSION = 1
+
+# Header size: magic, version (one byte) and classes registry fingerprint (8 bytes)
+SERIALIZATION_HEADER_SIZE = len(SERIALIZATION_MAGIC) + 1 + 8
+
+# Node table columns (one integers column per node field, nodes in document order)
+NODE_TYPE_ID = 0
+NODE_NAME_ID = 1
+NODE_CONTENT_ID = 2
+NODE_OPEN_TAG_ID = 3
+NODE_CLOSE_TAG_ID = 4
+NODE_ATTRS_OFFSET = 5
+NODE_ATTRS_COUNT = 6
+NODE_CHILDREN_COUNT = 7
+NODE_TABLE_WIDTH = 8
+
+# Node table columns holding string IDs (-1 for ``None``)
+STRING_ID_COLUMNS = frozenset((NODE_NAME_ID, NODE_CONTENT_ID, NODE_OPEN_TAG_ID, NODE_CLOSE_TAG_ID))
+
+# Integers columns type codes, from the smallest to the largest (see ``pack_column``)
+COLUMN_TYPECODES = ('b', 'h', 'i', 'q')
+
+# Internal node classes, always registered first
+INTERNAL_NODE_CLASSES = (
+    RootTreeNode,
+    TextTreeNode,
+    NewlineTreeNode,
+    HardNewlineTreeNode,
+    TextRunTreeNode,
+    ParagraphTreeNode,
+)
+
+# Root tree node instance attributes not serialized (runtime state of the document tree)
+ROOT_RUNTIME_ATTRIBUTES = frozenset(('cycle_free', 'frozen_root_reference'))
+
+
+def build_classes_registry(recognized_tags=DEFAULT_RECOGNIZED_TAGS_LIST, extra_classes=()):
+    """
+    Build the classes registry of the binary format: the internal node classes, the given extra classes and the
+    given tag classes, in this order (each class once). The tag ID of a class is its index in the registry, so
+    documents must be loaded with a registry built from the same classes, in the same order.
+    :param recognized_tags: The list of all valid tag classes.
+    :param extra_classes: The list of extra node classes (custom root, text or paragraph node classes, etc).
+    :return: The classes registry, as a tuple of classes.
+    """
+    classes_registry = []
+    for node_cls in INTERNAL_NODE_CLASSES + tuple(extra_classes) + tuple(recognized_tags):
+        if node_cls not in classes_registry:
+            classes_registry.append(node_cls)
+    return tuple(classes_registry)
+
+
+# Default classes registry (default tags)
+DEFAULT_CLASSES_REGISTRY = build_classes_registry()
+
+
+@lru_cache(maxsize=32)
+def get_classes_registry_info(classes_registry):
+    """
+    Get the tag IDs and the fingerprint of the given classes registry (cached per registry).
+    The fingerprint is a digest of the qualified name and canonical tag name of all classes, in order.
+    :param classes_registry: The classes registry, as built by ``build_classes_registry``.
+    :return: A tuple ``(tag_ids, fingerprint)``, with the tag IDs as a dictionary ``{class: tag_id}``.
+    """
+    tag_ids = {node_cls: tag_id for tag_id, node_cls in enumerate(classes_registry)}
+    fingerprint = blake2b('\n'.join('{}.{}:{}'.format(node_cls.__module__, node_cls.__qualname__,
+                                                      node_cls.canonical_tag_name)
+                                    for node_cls in classes_registry).encode('utf-8'), digest_size=8).digest()
+    return tag_ids, fingerprint
+
+
+def pack_column(values):
+    """
+    Pack the given integers column into the smallest signed integers array, as little-endian bytes.
+    :param values: The integers column, as a list.
+    :return: A tuple ``(typecode, bytes)``.
+    """
+    for typecode in COLUMN_TYPECODES:
+        try:
+            column = array(typecode, values)
+        except OverflowError:
+            continue
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return typecode, column.tobytes()
+    raise OverflowError('Integer too large for the binary format')
+
+
+def unpack_column(packed_column):
+    """
+    Unpack the given integers column packed by ``pack_column``.
+    :param packed_column: A tuple ``(typecode, bytes)``.
+    :return: The integers column, as an array.
+    """
+    typecode, data = packed_column
+    column = array(typecode, data)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def dumps(document_tree, classes_registry=DEFAULT_CLASSES_REGISTRY):
+    """
+    Serialize the given document tree into the compact binary format (iterative walk).
+    The binary format is made of a header (magic, version and classes registry fingerprint) and of a ``marshal``
+    payload with a node table (the tag ID, the name, the raw content, the source strings, the attributes and
+    the children count of each node, as string IDs and integers), a string table (each string once), an
+    attributes table and the per-instance data of the nodes (error messages, options overloads, etc).
+    Lazy attributes are kept lazy. The document-level attributes and the per-instance data must be serializable
+    with ``marshal``: per-request settings (smileys, cosmetics, etc.) should be set up after loading.
+    :param document_tree: The document tree (root tree node) to be serialized.
+    :param classes_registry: The classes registry, as built by ``build_classes_registry`` (default to
+    ``DEFAULT_CLASSES_REGISTRY``).
+    :return: The serialized document tree, as bytes.
+    """
+    assert document_tree, "Document tree is mandatory."
+    assert document_tree.is_root, "Document tree must be a root tree node instance."
+    tag_ids, fingerprint = get_classes_registry_info(classes_registry)
+
+    # String table
+    string_ids = {}
+    strings = []
+
+    def get_string_id(value):
+        """ Get the ID of the given string in the string table, appending it if necessary. """
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value)
+        return string_id
+
+    # Node table (one column per node field), attributes table and per-instance data
+    node_table = tuple([] for _ in range(NODE_TABLE_WIDTH))
+    tag_ids_column, name_ids_column, content_ids_column, open_tag_ids_column, close_tag_ids_column, \
+        attrs_offsets_column, attrs_counts_column, children_counts_column = node_table
+    source_strings_columns = (content_ids_column, open_tag_ids_column, close_tag_ids_column)
+    attrs_table = []
+    extras = {}
+    source_text = document_tree.source_text
+    source_strings_slots = (TreeNode.content, TreeNode.source_open_tag, TreeNode.source_close_tag)
+    attrs_slot = TreeNode.attrs
+    for node_index, tree_node in enumerate(iter_tree_preorder(document_tree)):
+
+        # Tag ID and name
+        node_cls = tree_node.__class__
+        tag_id = tag_ids.get(node_cls)
+        if tag_id is None:
+            raise ValueError('{} is not in the classes registry'.format(node_cls.__qualname__))
+        name = tree_node.name
+        tag_ids_column.append(tag_id)
+        name_ids_column.append(get_string_id(name) if name is not None else -1)
+
+        # Source strings (source spans are sliced without materializing the lazy strings)
+        source_spans = tree_node.source_spans
+        for span_index, slot in enumerate(source_strings_slots):
+            try:
+                value = slot.__get__(tree_node)
+            except AttributeError:
+                span = source_spans[span_index] if source_spans else None
+                value = source_text[span[0]:span[1]] if span else ''
+            source_strings_columns[span_index].append(get_string_id(value))
+
+        # Attributes (lazy attributes are kept lazy, the document-level data of the root node is stored apart)
+        try:
+            attrs = attrs_slot.__get__(tree_node)
+        except AttributeError:
+            attrs_offset = tree_node.attrs_offset
+            attrs_offsets_column.append(attrs_offset if attrs_offset is not None else -1)
+            attrs_counts_column.append(0)
+        else:
+            attrs_offsets_column.append(-1)
+            if attrs and node_index:
+                attrs_counts_column.append(len(attrs))
+                for key, value in attrs.items():
+                    attrs_table.append(get_string_id(key))
+                    attrs_table.append(get_string_id(value))
+            else:
+                attrs_counts_column.append(0)
+        children_counts_column.append(len(tree_node.children))
+
+        # Per-instance data
+        node_extras = dict(vars(tree_node))
+        for name in get_extra_slots(node_cls):
+            try:
+                node_extras[name] = object.__getattribute__(tree_node, name)
+            except AttributeError:
+                pass
+        if not node_index:
+            for name in ROOT_RUNTIME_ATTRIBUTES:
+                node_extras.pop(name, None)
+        if node_extras:
+            extras[node_index] = node_extras
+
+    # Build the payload
+    payload = (tuple(strings), tuple(pack_column(column) for column in node_table), pack_column(attrs_table),
+               extras, dict(document_tree.attrs), tuple(document_tree.known_ids),
+               document_tree.opening_tag_ch, document_tree.closing_tag_ch)
+    return SERIALIZATION_MAGIC + bytes((SERIALIZATION_VERSION, )) + fingerprint + marshal_dumps(payload, 4)
+
+
+def loads(data, classes_registry=DEFAULT_CLASSES_REGISTRY, cycle_free=False):
+    """
+    Load a document tree serialized by ``dumps``.
+    The nodes are rebuilt directly from the node table, without running the tree builder or the processing passes.
+    :param data: The serialized document tree (bytes-like object).
+    :param classes_registry: The classes registry, as built by ``build_classes_registry`` (must be built from the
+    same classes as the registry used for serializing, default to ``DEFAULT_CLASSES_REGISTRY``).
+    :param cycle_free: If set to ``True``, the document tree is cycle-free (default is ``False``).
+    See ``RootTreeNode``.
+    :return: The document tree (root tree node).
+    """
+    data = memoryview(data)
+
+    # Check the header
+    magic_size = len(SERIALIZATION_MAGIC)
+    if bytes(data[:magic_size]) != SERIALIZATION_MAGIC:
+        raise ValueError('Not a serialized document tree')
+    if data[magic_size] != SERIALIZATION_VERSION:
+        raise ValueError('Unsupported serialization version {}'.format(data[magic_size]))
+    tag_ids, fingerprint = get_classes_registry_info(classes_registry)
+    if bytes(data[magic_size + 1:SERIALIZATION_HEADER_SIZE]) != fingerprint:
+        raise ValueError('The classes registry does not match the registry used for serializing')
+
+    # Load the payload
+    strings, node_table, attrs_table, extras, document_attrs, known_ids, opening_tag_ch, closing_tag_ch = \
+        marshal_loads(data[SERIALIZATION_HEADER_SIZE:])
+    node_table = [unpack_column(column) for column in node_table]
+    attrs_table = unpack_column(attrs_table)
+    if len(node_table) != NODE_TABLE_WIDTH or any(len(column) != len(node_table[0]) for column in node_table):
+        raise ValueError('Malformed node table')
+
+    # Map the string IDs to strings (``None`` for ID -1)
+    strings = strings + (None, )
+    node_rows = zip(*[map(strings.__getitem__, column) if column_index in STRING_ID_COLUMNS else column
+                      for column_index, column in enumerate(node_table)])
+    attrs_table = [strings[string_id] for string_id in attrs_table]
+
+    # Rebuild the root tree node
+    tag_id, name, content, source_open_tag, source_close_tag, _, _, children_count = next(node_rows)
+    root_cls = classes_registry[tag_id]
+    root_tree_node = root_cls.__new__(root_cls)
+    root_tree_node.name = name
+    root_tree_node.attrs = document_attrs
+    root_tree_node.attrs_offset = None
+    root_tree_node.children = []
+    TreeNode.content.__set__(root_tree_node, content)
+    root_tree_node.source_open_tag = source_open_tag
+    root_tree_node.source_close_tag = source_close_tag
+    root_tree_node.source_spans = None
+    root_tree_node.known_ids = set(known_ids)
+    root_tree_node.source_text = ''
+    root_tree_node.opening_tag_ch = opening_tag_ch
+    root_tree_node.closing_tag_ch = closing_tag_ch
+    root_tree_node.indexed_nodes = None
+    root_tree_node.indexed_positions = None
+    if 0 in extras:
+        root_tree_node.overload_options(extras[0])
+    if cycle_free:
+        root_tree_node.cycle_free = True
+        root_reference = ref(root_tree_node)
+    else:
+        root_reference = root_tree_node
+    root_tree_node._root_tree_node = root_reference
+    root_tree_node._parent = None
+
+    # Rebuild all nodes in document order, with a stack of ``[parent node, parent reference, remaining children]``
+    set_content = TreeNode.content.__set__
+    nodes_stack = [[root_tree_node, root_reference, children_count]]
+    attrs_position = 0
+    for node_index, (tag_id, name, content, source_open_tag, source_close_tag,
+                     attrs_offset, attrs_count, children_count) in enumerate(node_rows, 1):
+        while not nodes_stack[-1][2]:
+            nodes_stack.pop()
+        parent_entry = nodes_stack[-1]
+        parent_entry[2] -= 1
+
+        # Create the node
+        node_cls = classes_registry[tag_id]
+        tree_node = node_cls.__new__(node_cls)
+        tree_node._root_tree_node = root_reference
+        tree_node._parent = parent_entry[1]
+        tree_node.name = name
+        set_content(tree_node, content)
+        tree_node.source_open_tag = source_open_tag
+        tree_node.source_close_tag = source_close_tag
+        tree_node.source_spans = None
+
+        # Attributes (lazy attributes and empty attributes dictionaries are built on first access)
+        if attrs_offset >= 0:
+            tree_node.attrs_offset = attrs_offset
+        else:
+            tree_node.attrs_offset = None
+            if attrs_count:
+                next_attrs_position = attrs_position + attrs_count * 2
+                attrs_pairs = iter(attrs_table[attrs_position:next_attrs_position])
+                tree_node.attrs = dict(zip(attrs_pairs, attrs_pairs))
+                attrs_position = next_attrs_position
+            elif node_cls.shared_empty_attrs:
+                tree_node.attrs = EMPTY_ATTRS
+
+        # Per-instance data
+        if node_index in extras:
+            tree_node.overload_options(extras[node_index])
+
+        # Append the node to its parent, and go down the tree
+        tree_node.children = []
+        parent_entry[0].children.append(tree_node)
+        if children_count:
+            nodes_stack.append([tree_node, ref(tree_node) if cycle_free else tree_node, children_count])
+
+    # Return the document tree
+    return root_tree_node
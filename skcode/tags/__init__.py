@@ -2,11 +2,14 @@
 SkCode tag definitions code.
 """
 
+from ..etree import get_node_flags
+
 # Import all tag definitions here
 from .internal import (
     TextTreeNode,
     NewlineTreeNode,
-    HardNewlineTreeNode
+    HardNewlineTreeNode,
+    TextRunTreeNode
 )
 from .titles import generate_title_cls
 from .codeblocks import (
@@ -263,7 +266,7 @@ def build_recognized_tags_dict(tag_class_list):
     for tag_class in tag_class_list:
 
         # Sanity checks
-        if type(tag_class) is not type:
+        if not isinstance(tag_class, type):
             raise ValueError('{} is an instance, not a class type'.format(tag_class.__class__.__name__))
         if not tag_class.canonical_tag_name:
             raise ValueError('{} does not have a canonical name'.format(tag_class.__name__))
@@ -281,3 +284,58 @@ def build_recognized_tags_dict(tag_class_list):
 
     # Return the dict
     return recognized_tags_dict
+
+
+class TagDispatchTable(dict):
+    """
+    Dispatch table of the tree builder, built on demand: the entry of each tag name is built on first lookup.
+    Each tag class is given a small integer type ID (in lookup order, shared by all aliases of the class) and the
+    flags of its options, so the tree builder does not need to look up the options of each tag class for each token.
+    """
+
+    def __init__(self, recognized_tags_dict, cls_options_overload=None):
+        """
+        Create a new (empty) dispatch table.
+        :param recognized_tags_dict: The dictionary of all valid tag classes, as built by
+        ``build_recognized_tags_dict``.
+        :param cls_options_overload: Dictionary of dictionaries mapped by node class type ``{class: {key : value}}``
+        to be used to overload node options settings on a per node class basis (default to ``None``).
+        """
+        super(TagDispatchTable, self).__init__()
+        self.recognized_tags_dict = recognized_tags_dict
+        self.cls_options_overload = cls_options_overload
+        self.class_entries = {}
+
+    def __missing__(self, tag_name):
+        """
+        Build the entry of the given tag name.
+        :param tag_name: The tag name (must be a key of the recognized tags dictionary).
+        :return: The dispatch table entry ``(class, type_id, flags)``.
+        """
+        tag_class = self.recognized_tags_dict[tag_name]
+        entry = self.class_entries.get(tag_class)
+        if entry is None:
+            options = self.cls_options_overload.get(tag_class) if self.cls_options_overload else None
+            entry = self.class_entries[tag_class] = tag_class, len(self.class_entries), \
+                get_node_flags(tag_class, options)
+        self[tag_name] = entry
+        return entry
+
+
+def build_tag_dispatch_table(recognized_tags_dict, cls_options_overload=None):
+    """
+    Turn a dictionary of tag names and corresponding node class into the dispatch table of the tree builder.
+    Each tag class is given a small integer type ID (in registration order, shared by all aliases of the class)
+    and the flags of its options, see ``TagDispatchTable``.
+    :param recognized_tags_dict: The dictionary of all valid tag classes, as built by
+    ``build_recognized_tags_dict``.
+    :param cls_options_overload: Dictionary of dictionaries mapped by node class type ``{class: {key : value}}``
+    to be used to overload node options settings on a per node class basis (default to ``None``).
+    :return: A dictionary ``{tag_name: (class, type_id, flags)}`` with all tag name and alias registered as key.
+    """
+    # Build all entries, in registration order
+    dispatch_table = TagDispatchTable(recognized_tags_dict, cls_options_overload)
+    for tag_name in recognized_tags_dict:
+        dispatch_table.__missing__(tag_name)
+    return dict(dispatch_table)
+
@@ -15,6 +15,8 @@ from ..etree import TreeNode
 class AcronymTreeNode(TreeNode):
     """ Acronym tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -5,7 +5,7 @@ SkCode alert box tag definitions code.
 from html import escape as escape_html
 from html import unescape as unescape_html_entities
 
-from ..etree import TreeNode
+from ..etree import TreeNode, register_generated_node_cls
 
 
 # Alert types
@@ -21,6 +21,8 @@ ALERT_TYPE_QUESTION = 'question'
 class AlertBoxTreeNode(TreeNode):
     """ Alert box tree node class. """
 
+    __slots__ = ()
+
     make_paragraphs_here = True
 
     canonical_tag_name = 'alert'
@@ -334,6 +336,8 @@ def generate_fixed_alert_type_cls(alert_type,
     class FixedTypeAlertBoxTreeNode(AlertBoxTreeNode):
         """ Fixed type alert box tree node class. """
 
+        __slots__ = ()
+
         canonical_tag_name = _canonical_tag_name
         alias_tag_names = _alias_tag_names
         alert_type = _alert_type
@@ -345,4 +349,5 @@ def generate_fixed_alert_type_cls(alert_type,
             """
             return self.alert_type
 
-    return FixedTypeAlertBoxTreeNode
+    return register_generated_node_cls(FixedTypeAlertBoxTreeNode, _alert_type, _canonical_tag_name,
+                                       tuple(_alias_tag_names))
@@ -13,7 +13,7 @@ from pygments.lexers import get_lexer_by_name
 from pygments.styles import get_style_by_name
 from pygments.util import ClassNotFound
 
-from ..etree import TreeNode
+from ..etree import TreeNode, register_generated_node_cls
 from ..tools import sanitize_url, slugify
 from ..utility.relative_urls import get_relative_url_base
 
@@ -21,6 +21,8 @@ from ..utility.relative_urls import get_relative_url_base
 class CodeBlockTreeNode(TreeNode):
     """ Code block tree node class. """
 
+    __slots__ = ()
+
     parse_embedded = False
 
     canonical_tag_name = 'code'
@@ -328,6 +330,8 @@ def generate_fixed_code_block_type_cls(language_name,
     class FixedCodeBlockTreeNode(CodeBlockTreeNode):
         """ Fixed language code block tree node class. """
 
+        __slots__ = ()
+
         canonical_tag_name = _canonical_tag_name
         alias_tag_names = _alias_tag_names
         language_name = _language_name
@@ -339,4 +343,5 @@ def generate_fixed_code_block_type_cls(language_name,
             """
             return self.language_name
 
-    return FixedCodeBlockTreeNode
+    return register_generated_node_cls(FixedCodeBlockTreeNode, _language_name, _canonical_tag_name,
+                                       tuple(_alias_tag_names))
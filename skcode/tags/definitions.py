@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class DefinitionListTreeNode(TreeNode):
     """ Definitions list tree node class. """
 
+    __slots__ = ()
+
     # FIXME Maybe post-process the tree to assert term/definition order
 
     canonical_tag_name = 'dl'
@@ -38,6 +40,8 @@ class DefinitionListTreeNode(TreeNode):
 class DefinitionListTermTreeNode(TreeNode):
     """ Definitions list term tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'dt'
     alias_tag_names = ()
 
@@ -69,6 +73,8 @@ class DefinitionListTermTreeNode(TreeNode):
 class DefinitionListTermDefinitionTreeNode(TreeNode):
     """ Definition list term definition tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'dd'
     alias_tag_names = ()
 
@@ -10,6 +10,8 @@ from ..etree import TreeNode
 class NotNotationTreeNode(TreeNode):
     """ NOT notation tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
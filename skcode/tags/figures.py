@@ -12,6 +12,8 @@ from ..render import render_inner_text
 class FigureCaptionTreeNode(TreeNode):
     """ Figure caption tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'figcaption'
     alias_tag_names = ()
 
@@ -45,6 +47,8 @@ class FigureCaptionTreeNode(TreeNode):
 class FigureDeclarationTreeNode(TreeNode):
     """ Figure declaration tree node class. """
 
+    __slots__ = ()
+
     make_paragraphs_here = True
 
     canonical_tag_name = 'figure'
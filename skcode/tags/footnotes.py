@@ -13,6 +13,8 @@ from ..tools import slugify
 class FootnoteDeclarationTreeNode(TreeNode):
     """ Footnote declaration tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -135,6 +137,8 @@ class FootnoteDeclarationTreeNode(TreeNode):
 class FootnoteReferenceTreeNode(TreeNode):
     """ Footnote reference tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
     parse_embedded = False
@@ -11,11 +11,40 @@ from html import escape as escape_html
 from html import unescape as unescape_html_entities
 
 
+def render_text_content_html(root_tree_node, content):
+    """
+    Render the given raw text content as HTML (with smileys and cosmetics replacement).
+    :param root_tree_node: The root tree node.
+    :param content: The raw text content.
+    :return The rendered HTML of the text content.
+    """
+    content = unescape_html_entities(content)
+    content = escape_html(content)
+    content = do_smileys_replacement(root_tree_node, content)
+    content = do_cosmetics_replacement(root_tree_node, content)
+    return content
+
+
+def render_text_content_text(root_tree_node, content):
+    """
+    Render the given raw text content as text (with cosmetics replacement).
+    :param root_tree_node: The root tree node.
+    :param content: The raw text content.
+    :return The rendered text of the text content.
+    """
+    content = unescape_html_entities(content)
+    content = do_cosmetics_replacement(root_tree_node, content)
+    return content
+
+
 class TextTreeNode(TreeNode):
     """ Text tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
+    shared_empty_attrs = True
 
     def render_html(self, inner_html, **kwargs):
         """
@@ -24,12 +53,7 @@ class TextTreeNode(TreeNode):
         :param kwargs: Extra keyword arguments for rendering.
         :return The rendered HTML of this node.
         """
-        content = self.content
-        content = unescape_html_entities(content)
-        content = escape_html(content)
-        content = do_smileys_replacement(self.root_tree_node, content)
-        content = do_cosmetics_replacement(self.root_tree_node, content)
-        return content
+        return render_text_content_html(self.root_tree_node, self.content)
 
     def render_text(self, inner_text, **kwargs):
         """
@@ -38,17 +62,17 @@ class TextTreeNode(TreeNode):
         :param kwargs: Extra keyword arguments for rendering.
         :return The rendered text of this node.
         """
-        content = self.content
-        content = unescape_html_entities(content)
-        content = do_cosmetics_replacement(self.root_tree_node, content)
-        return content
+        return render_text_content_text(self.root_tree_node, self.content)
 
 
 class NewlineTreeNode(TreeNode):
     """ Newline tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
+    shared_empty_attrs = True
 
     def render_html(self, inner_html, **kwargs):
         """
@@ -72,6 +96,8 @@ class NewlineTreeNode(TreeNode):
 class HardNewlineTreeNode(NewlineTreeNode):
     """ Newline (hard line break variant) tree node class. """
 
+    __slots__ = ()
+
     def render_html(self, inner_html, **kwargs):
         """
         Callback function for rendering HTML.
@@ -89,3 +115,78 @@ class HardNewlineTreeNode(NewlineTreeNode):
         :return The rendered text of this node.
         """
         return '\n'
+
+
+class TextRunTreeNode(TreeNode):
+    """
+    Text run tree node class.
+    A single node for adjacent text and newlines, rendered like the equivalent ``TextTreeNode`` and
+    ``NewlineTreeNode`` nodes. The text pieces are stored in the ``text_pieces`` list, with a ``\n`` string
+    for each newline. The raw content is the concatenation of all text pieces, without newlines.
+    """
+
+    __slots__ = ('text_pieces', )
+
+    inline = True
+    close_inlines = False
+    shared_empty_attrs = True
+
+    # Newline piece
+    newline_piece = '\n'
+
+    # Rendered HTML and text of each newline piece
+    newline_html = '\n'
+    newline_text = ' '
+
+    @property
+    def content(self):
+        """
+        Return the raw content of this node (all text pieces, without newlines).
+        """
+        return ''.join(piece for piece in self.text_pieces if piece != self.newline_piece)
+
+    @content.setter
+    def content(self, value):
+        """
+        Set the raw content of this node (as a single text piece).
+        :param value: The raw content (without newline).
+        """
+        self.text_pieces = [value] if value else []
+
+    def get_structural_hash_data(self):
+        """
+        Return the data of this node covered by the structural hash of this node (with the newline pieces).
+        :return: The node data, as a tuple of strings (and tuples of strings).
+        """
+        return super(TextRunTreeNode, self).get_structural_hash_data() + (tuple(self.text_pieces), )
+
+    def render_html(self, inner_html, **kwargs):
+        """
+        Callback function for rendering HTML.
+        :param inner_html: The inner HTML of this tree node.
+        :param kwargs: Extra keyword arguments for rendering.
+        :return The rendered HTML of this node.
+        """
+        output_html = []
+        for piece in self.text_pieces:
+            if piece == self.newline_piece:
+                output_html.append(self.newline_html)
+            else:
+                output_html.append(render_text_content_html(self.root_tree_node, piece))
+        return ''.join(output_html)
+
+    def render_text(self, inner_text, **kwargs):
+        """
+        Callback function for rendering text.
+        :param inner_text: The inner text of this tree node.
+        :param kwargs: Extra keyword arguments for rendering.
+        :return The rendered text of this node.
+        """
+        output_text = []
+        for piece in self.text_pieces:
+            if piece == self.newline_piece:
+                output_text.append(self.newline_text)
+            else:
+                output_text.append(render_text_content_text(self.root_tree_node, piece))
+        return ''.join(output_text)
+
@@ -11,6 +11,8 @@ from html import unescape as unescape_html_entities
 class NoParseTreeNode(TreeNode):
     """ "No Parse" tree node class. """
 
+    __slots__ = ()
+
     parse_embedded = False
     inline = True
     close_inlines = False
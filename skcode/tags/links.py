@@ -15,6 +15,8 @@ from ..utility.relative_urls import get_relative_url_base
 class UrlLinkTreeNode(TreeNode):
     """ URL link tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'url'
     alias_tag_names = ('link', )
 
@@ -122,6 +124,8 @@ class UrlLinkTreeNode(TreeNode):
 class EmailLinkTreeNode(TreeNode):
     """ Email link tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -208,6 +212,8 @@ class EmailLinkTreeNode(TreeNode):
 class AnchorTreeNode(TreeNode):
     """ Anchor tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -261,6 +267,8 @@ class AnchorTreeNode(TreeNode):
 class GoToAnchorTreeNode(TreeNode):
     """ "Go to anchor" tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
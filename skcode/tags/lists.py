@@ -73,6 +73,8 @@ def int_to_alphabet_numerals(value):
 class ListTreeNode(TreeNode):
     """ List tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'list'
     alias_tag_names = ()
 
@@ -228,6 +230,8 @@ class ListTreeNode(TreeNode):
 class UnorderedListTreeNode(ListTreeNode):
     """ Un-ordered list tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'ul'
     alias_tag_names = ()
 
@@ -242,6 +246,8 @@ class UnorderedListTreeNode(ListTreeNode):
 class OrderedListTreeNode(ListTreeNode):
     """ Ordered list tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'ol'
     alias_tag_names = ()
 
@@ -261,6 +267,8 @@ class OrderedListTreeNode(ListTreeNode):
 class ListElementTreeNode(TreeNode):
     """ List element tree node class. """
 
+    __slots__ = ()
+
     same_tag_closes = True
     weak_parent_close = True
     make_paragraphs_here = True
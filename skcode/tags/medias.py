@@ -22,6 +22,8 @@ from ..utility.relative_urls import get_relative_url_base
 class ImageTreeNode(TreeNode):
     """ Image tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'img'
     alias_tag_names = ()
 
@@ -159,6 +161,8 @@ class ImageTreeNode(TreeNode):
 class YoutubeTreeNode(TreeNode):
     """ Youtube video integration tree node class. """
 
+    __slots__ = ()
+
     parse_embedded = False
 
     canonical_tag_name = 'youtube'
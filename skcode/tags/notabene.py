@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class NotaBeneTreeNode(TreeNode):
     """ Nota Bene tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'notabene'
     alias_tag_names = ('nb', )
 
@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class PostScriptumTreeNode(TreeNode):
     """ Post scriptum tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'postscriptum'
     alias_tag_names = ('ps', )
 
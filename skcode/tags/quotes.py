@@ -15,6 +15,8 @@ from ..utility.relative_urls import get_relative_url_base
 class QuoteTreeNode(TreeNode):
     """ Quote tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'quote'
     alias_tag_names = ('blockquote', )
 
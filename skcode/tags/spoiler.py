@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class SpoilerTreeNode(TreeNode):
     """ Spoiler tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'spoiler'
     alias_tag_names = ('hide', )
 
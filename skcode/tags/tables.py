@@ -10,6 +10,8 @@ from ..etree import TreeNode
 class TableTreeNode(TreeNode):
     """ Table tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'table'
     alias_tag_names = ()
 
@@ -42,6 +44,8 @@ class TableTreeNode(TreeNode):
 class TableRowTreeNode(TreeNode):
     """ Table row tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'tr'
     alias_tag_names = ()
 
@@ -71,6 +75,8 @@ class TableRowTreeNode(TreeNode):
 class TableCellTreeNode(TreeNode):
     """ Table tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'td'
     alias_tag_names = ()
 
@@ -185,6 +191,8 @@ class TableCellTreeNode(TreeNode):
 class TableHeaderCellTreeNode(TableCellTreeNode):
     """ Table tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'th'
     alias_tag_names = ()
 
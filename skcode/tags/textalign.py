@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class TextAlignBaseTreeNode(TreeNode):
     """ Base class for all text alignment tag class. """
 
+    __slots__ = ()
+
     # HTML template for rendering
     html_render_template = '<p class="text-{text_alignment}">{inner_html}</p>\n'
 
@@ -36,6 +38,8 @@ class TextAlignBaseTreeNode(TreeNode):
 class CenterTextTreeNode(TextAlignBaseTreeNode):
     """ Center align text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'center'
     alias_tag_names = ()
 
@@ -45,6 +49,8 @@ class CenterTextTreeNode(TextAlignBaseTreeNode):
 class LeftTextTreeNode(TextAlignBaseTreeNode):
     """ Left align text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'left'
     alias_tag_names = ()
 
@@ -54,6 +60,8 @@ class LeftTextTreeNode(TextAlignBaseTreeNode):
 class RightTextTreeNode(TextAlignBaseTreeNode):
     """ Right align text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'right'
     alias_tag_names = ()
 
@@ -63,6 +71,8 @@ class RightTextTreeNode(TextAlignBaseTreeNode):
 class JustifyTextTreeNode(TextAlignBaseTreeNode):
     """ Justify align text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'justify'
     alias_tag_names = ()
 
@@ -5,7 +5,7 @@ SkCode coloured text tag definitions code.
 import re
 from gettext import gettext as _
 
-from ..etree import TreeNode
+from ..etree import TreeNode, register_generated_node_cls
 
 
 # Valid HEX color according https://www.w3.org/TR/CSS21/syndata.html#value-def-color
@@ -15,6 +15,8 @@ RGB_COLOR_RE = re.compile(r'^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$')
 class ColorTextTreeNode(TreeNode):
     """ Coloured tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -100,6 +102,8 @@ def generate_fixed_color_text_cls(color_value,
     class FixedColorTextTreeNode(ColorTextTreeNode):
         """ Fixed coloured tree node class. """
 
+        __slots__ = ()
+
         canonical_tag_name = _canonical_tag_name
         alias_tag_names = _alias_tag_names
         color_value = _color_value
@@ -111,4 +115,5 @@ def generate_fixed_color_text_cls(color_value,
             """
             return self.color_value
 
-    return FixedColorTextTreeNode
+    return register_generated_node_cls(FixedColorTextTreeNode, _color_value, _canonical_tag_name,
+                                       tuple(_alias_tag_names))
@@ -13,6 +13,8 @@ TEXT_DIR_RIGHT_TO_LEFT = 2
 class DirectionTextTreeNode(TreeNode):
     """ Custom direction text tree node class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -93,6 +95,8 @@ class DirectionTextTreeNode(TreeNode):
 class LTRFixedDirectionTextTreeNode(DirectionTextTreeNode):
     """ Left-to-right fixed direction text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'ltr'
     alias_tag_names = ()
 
@@ -110,6 +114,8 @@ class LTRFixedDirectionTextTreeNode(DirectionTextTreeNode):
 class RTLFixedDirectionTextTreeNode(LTRFixedDirectionTextTreeNode):
     """ Right-to-left fixed direction text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'rtl'
     alias_tag_names = ()
 
@@ -14,6 +14,8 @@ class InlineWrappingTreeNode(TreeNode):
     Subclass of ``TreeNode`` which wrap the HTML output of children nodes with a format string.
     """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -42,6 +44,8 @@ class InlineWrappingTreeNode(TreeNode):
 class BoldTextTreeNode(InlineWrappingTreeNode):
     """ Bold text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'b'
     alias_tag_names = ('bold', 'strong')
 
@@ -51,6 +55,8 @@ class BoldTextTreeNode(InlineWrappingTreeNode):
 class ItalicTextTreeNode(InlineWrappingTreeNode):
     """ Italic text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'i'
     alias_tag_names = ('italic', 'em')
 
@@ -60,6 +66,8 @@ class ItalicTextTreeNode(InlineWrappingTreeNode):
 class StrikeTextTreeNode(InlineWrappingTreeNode):
     """ Strike text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 's'
     alias_tag_names = ('strike', 'del')
 
@@ -69,6 +77,8 @@ class StrikeTextTreeNode(InlineWrappingTreeNode):
 class UnderlineTextTreeNode(InlineWrappingTreeNode):
     """ Underline text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'u'
     alias_tag_names = ('underline', 'ins')
 
@@ -78,6 +88,8 @@ class UnderlineTextTreeNode(InlineWrappingTreeNode):
 class SubscriptTextTreeNode(InlineWrappingTreeNode):
     """ Subscript text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'sub'
     alias_tag_names = ()
 
@@ -87,6 +99,8 @@ class SubscriptTextTreeNode(InlineWrappingTreeNode):
 class SupscriptTextTreeNode(InlineWrappingTreeNode):
     """ Supscript text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'sup'
     alias_tag_names = ()
 
@@ -96,6 +110,8 @@ class SupscriptTextTreeNode(InlineWrappingTreeNode):
 class PreTextTreeNode(InlineWrappingTreeNode):
     """ Pre text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'pre'
     alias_tag_names = ()
 
@@ -105,6 +121,8 @@ class PreTextTreeNode(InlineWrappingTreeNode):
 class CiteTextTreeNode(InlineWrappingTreeNode):
     """ Cite text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'cite'
     alias_tag_names = ()
 
@@ -114,6 +132,8 @@ class CiteTextTreeNode(InlineWrappingTreeNode):
 class InlineCodeTextTreeNode(TreeNode):
     """ Inline code text tree node class. """
 
+    __slots__ = ()
+
     parse_embedded = False
     inline = True
     close_inlines = False
@@ -151,6 +171,8 @@ class InlineCodeTextTreeNode(TreeNode):
 class InlineSpoilerTextTreeNode(InlineWrappingTreeNode):
     """ Inline spoiler text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'ispoiler'
     alias_tag_names = ()
 
@@ -160,6 +182,8 @@ class InlineSpoilerTextTreeNode(InlineWrappingTreeNode):
 class KeyboardTextTreeNode(InlineWrappingTreeNode):
     """ Keyboard text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'kbd'
     alias_tag_names = ('keyboard', )
 
@@ -169,6 +193,8 @@ class KeyboardTextTreeNode(InlineWrappingTreeNode):
 class HighlightTextTreeNode(InlineWrappingTreeNode):
     """ Highlight text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'mark'
     alias_tag_names = ('glow', 'highlight')
 
@@ -178,6 +204,8 @@ class HighlightTextTreeNode(InlineWrappingTreeNode):
 class SmallTextTreeNode(InlineWrappingTreeNode):
     """ Small text tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'small'
     alias_tag_names = ()
 
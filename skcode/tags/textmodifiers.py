@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class TextModifierBaseTreeNode(TreeNode):
     """ Base class for all text modifier tag class. """
 
+    __slots__ = ()
+
     inline = True
     close_inlines = False
 
@@ -49,6 +51,8 @@ class TextModifierBaseTreeNode(TreeNode):
 class LowerCaseTextTreeNode(TextModifierBaseTreeNode):
     """ Lowercase text modifier tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'lowercase'
     alias_tag_names = ()
 
@@ -58,6 +62,8 @@ class LowerCaseTextTreeNode(TextModifierBaseTreeNode):
 class UpperCaseTextTreeNode(TextModifierBaseTreeNode):
     """ Uppercase text modifier tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'uppercase'
     alias_tag_names = ()
 
@@ -67,6 +73,8 @@ class UpperCaseTextTreeNode(TextModifierBaseTreeNode):
 class CapitalizeTextTreeNode(TextModifierBaseTreeNode):
     """ Capitalize text modifier tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'capitalize'
     alias_tag_names = ()
 
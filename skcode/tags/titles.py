@@ -4,13 +4,15 @@ SkCode title tag definitions code.
 
 from html import escape as escape_html
 
-from ..etree import TreeNode
+from ..etree import TreeNode, register_generated_node_cls
 from ..tools import slugify
 
 
 class TitleBaseTreeNode(TreeNode):
     """ Title tree node class. """
 
+    __slots__ = ()
+
     # Slug ID attribute name
     slug_id_attr_name = 'id'
 
@@ -87,10 +89,12 @@ def generate_title_cls(index):
     class TitleTreeNode(TitleBaseTreeNode):
         """ Level N title tree node """
 
+        __slots__ = ()
+
         canonical_tag_name = tag_name
         alias_tag_names = ()
 
         html_tagname = tag_name
         title_level = index
 
-    return TitleTreeNode
+    return register_generated_node_cls(TitleTreeNode, index)
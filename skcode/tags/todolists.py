@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class TodoListTreeNode(TreeNode):
     """ TODO list tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'todolist'
     alias_tag_names = ()
 
@@ -39,6 +41,8 @@ class TodoListTreeNode(TreeNode):
 class TodoTaskTreeNode(TreeNode):
     """ TODO task tree node class. """
 
+    __slots__ = ()
+
     canonical_tag_name = 'task'
     alias_tag_names = ()
 
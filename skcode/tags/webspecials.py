@@ -8,6 +8,8 @@ from ..etree import TreeNode
 class HorizontalLineTreeNode(TreeNode):
     """ Horizontal line tree node class. """
 
+    __slots__ = ()
+
     standalone = True
 
     canonical_tag_name = 'hr'
@@ -35,6 +37,8 @@ class HorizontalLineTreeNode(TreeNode):
 class LineBreakTreeNode(TreeNode):
     """ Line break tree node class. """
 
+    __slots__ = ()
+
     standalone = True
     inline = True
     close_inlines = False
@@ -64,6 +68,8 @@ class LineBreakTreeNode(TreeNode):
 class CutHereTreeNode(TreeNode):
     """ "Cut here" tree node class. """
 
+    __slots__ = ()
+
     standalone = True
 
     canonical_tag_name = 'cuthere'
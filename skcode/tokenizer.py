@@ -2,7 +2,11 @@
 SkCode tag tokenizer code.
 """
 
-from .parser import parse_tag
+import codecs
+import mmap
+from functools import lru_cache
+
+from .parser import scan_tag
 
 
 # Token types
@@ -12,6 +16,9 @@ TOKEN_OPEN_TAG = 2
 TOKEN_CLOSE_TAG = 3
 TOKEN_SELF_CLOSE_TAG = 4
 
+# Bytes-like input types (decoded incrementally)
+BYTES_LIKE_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
 
 def tokenize_newline(data: str):
     """
@@ -32,61 +39,233 @@ def tokenize_newline(data: str):
         yield TOKEN_DATA, None, None, last_line
 
 
-def tokenize_tag(text: str,
+def tokenize_newline_spans(text: str, start: int, end: int):
+    """
+    Span version of ``tokenize_newline``: given a slice of text that does not contain any tags, this function will
+    yield a list of ``TOKEN_NEWLINE`` and ``TOKEN_DATA`` span tokens ``(type, None, None, start, end)``
+    without slicing the text.
+    N.B. Newline must have been normalized to ``\n`` before calling this function.
+    :param text: Input text buffer.
+    :param start: Start offset of the data in the text buffer.
+    :param end: End offset (excluded) of the data in the text buffer.
+    """
+    newline = text.find('\n', start, end)
+    while newline >= 0:
+        if newline > start:
+            yield TOKEN_DATA, None, None, start, newline
+        start = newline + 1
+        yield TOKEN_NEWLINE, None, None, newline, start
+        newline = text.find('\n', start, end)
+
+    if end > start:
+        yield TOKEN_DATA, None, None, start, end
+
+
+def normalize_newlines(text: str):
+    """
+    Normalize all newlines of the given text to ``\n`` (fastest method).
+    :param text: The input text.
+    :return The normalized text.
+    """
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def tokenize_tag(text,
                  opening_tag_ch='[', closing_tag_ch=']',
-                 allow_tagvalue_attr=True, allow_self_closing_tags=True):
+                 allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                 recognized_tag_names=None,
+                 max_tag_length=4096, max_attrs_count=32,
+                 lazy_attrs=False):
     """
     Split the given text into tokens (generator function).
-    :param text: The input text to be tokenize.
+    Raw blocks are supported, see ``tokenize_text_buffer``.
+    :param text: The input text to be tokenize, as a string or as an UTF-8 encoded bytes-like object (``bytes``,
+    ``bytearray``, ``memoryview`` or ``mmap``). Bytes-like objects are decoded chunk by chunk, without decoding
+    the whole text at once (except if ``max_tag_length`` is disabled), the tokens are the same as with the
+    decoded text.
     :param opening_tag_ch: The opening tag char (must be one char long, default '[').
     :param closing_tag_ch: The closing tag char (must be one char long, default ']').
     :param allow_tagvalue_attr: Set to ``True`` to allow the BBcode ``tagname=tagvalue`` syntax shortcut
     (default is ``True``).
     :param allow_self_closing_tags: Set to ``True`` to allow the self closing tags syntax (default is ``True``).
+    :param recognized_tag_names: If set, only tags with a name in this container (set or dictionary of
+    lowercase tag names, like the one returned by ``build_recognized_tags_dict``) are turned into tag tokens.
+    Any other tag is kept as raw data (default is ``None``, accept any tag name).
+    :param max_tag_length: The maximum length of a tag, including the opening and closing chars (default to 4096).
+    Longer tags are kept as raw data. This limit keep the tokenizing time linear in the size of the input text,
+    even with adversarial input like unterminated quoted attribute values. Set to zero to disable (not recommended
+    because a Denial-Of-Service is possible if the tag length is not limited).
+    :param max_attrs_count: The maximum number of attributes of a tag, including the tag value (default to 32).
+    Tags with more attributes are kept as raw data. Set to zero to disable.
+    :param lazy_attrs: If set to ``True``, the attributes of tags are only checked. ``tag_attrs`` is then the offset
+    of the attributes section in the tag source, or ``None`` if the tag does not have any attribute. The attributes
+    dictionary can be built later using ``parse_tag_attributes`` (default is ``False``).
     """
     assert text, "No text input given (mandatory)."
     assert len(opening_tag_ch) == 1, "Opening tag character must be one char long exactly."
     assert len(closing_tag_ch) == 1, "Closing tag character must be one char long exactly."
+    assert max_tag_length >= 0, "Maximum tag length must be greater or equal than zero."
+    assert max_attrs_count >= 0, "Maximum attributes count must be greater or equal than zero."
+
+    # Decode bytes-like objects chunk by chunk
+    if isinstance(text, BYTES_LIKE_TYPES):
+        if max_tag_length:
+            yield from tokenize_tag_stream(text,
+                                           opening_tag_ch, closing_tag_ch,
+                                           allow_tagvalue_attr, allow_self_closing_tags,
+                                           recognized_tag_names,
+                                           max_tag_length, max_attrs_count,
+                                           lazy_attrs)
+            return
+        text = str(text, 'utf-8')
 
     # Normalize newlines (fastest method)
     text = text.replace('\r\n', '\n').replace('\r', '\n')
 
+    # Process the whole text at once
+    yield from tokenize_text_buffer(text, 0, True,
+                                    opening_tag_ch, closing_tag_ch,
+                                    allow_tagvalue_attr, allow_self_closing_tags,
+                                    recognized_tag_names,
+                                    max_tag_length, max_attrs_count,
+                                    lazy_attrs)
+
+
+@lru_cache(maxsize=64)
+def tokenize_tag_cached(text: str,
+                        opening_tag_ch='[', closing_tag_ch=']',
+                        allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                        recognized_tag_names=None,
+                        max_tag_length=4096, max_attrs_count=32):
+    """
+    Split the given text into tokens, once (see ``tokenize_tag`` for parameters).
+    Return the tuple of all tokens, with lazy attributes (``lazy_attrs=True``) to allow sharing the tokens between
+    several document trees. The tokens are cached in a LRU cache keyed by the text and the tokenizer options,
+    so the same text can be parsed several times (with different tree building options) for the cost of a single
+    tokenizing pass.
+    N.B. ``recognized_tag_names`` must be hashable (use a ``frozenset``) if given.
+    :return The tuple of all tokens.
+    """
+    return tuple(tokenize_tag(text,
+                              opening_tag_ch, closing_tag_ch,
+                              allow_tagvalue_attr, allow_self_closing_tags,
+                              recognized_tag_names,
+                              max_tag_length, max_attrs_count,
+                              lazy_attrs=True))
+
+
+def tokenize_tag_spans(text: str,
+                       opening_tag_ch='[', closing_tag_ch=']',
+                       allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                       recognized_tag_names=None,
+                       max_tag_length=4096, max_attrs_count=32,
+                       lazy_attrs=False):
+    """
+    Split the given text into span tokens (generator function, see ``tokenize_tag`` for parameters).
+    Yield ``(type, tag_name, tag_attrs, start, end)`` tokens, with the source of each token given as offsets in
+    the text instead of a string. This avoid slicing the text for each token.
+    N.B. Newline must have been normalized to ``\n`` before calling this function (see ``normalize_newlines``).
+    :param text: The input text to be tokenize (with normalized newlines).
+    """
+    assert text, "No text input given (mandatory)."
+    assert len(opening_tag_ch) == 1, "Opening tag character must be one char long exactly."
+    assert len(closing_tag_ch) == 1, "Closing tag character must be one char long exactly."
+    assert max_tag_length >= 0, "Maximum tag length must be greater or equal than zero."
+    assert max_attrs_count >= 0, "Maximum attributes count must be greater or equal than zero."
+
+    # Process the whole text at once
+    yield from tokenize_text_spans(text, 0, True,
+                                   opening_tag_ch, closing_tag_ch,
+                                   allow_tagvalue_attr, allow_self_closing_tags,
+                                   recognized_tag_names,
+                                   max_tag_length, max_attrs_count,
+                                   lazy_attrs)
+
+
+def tokenize_text_spans(text: str, search_offset: int, end_of_text: bool,
+                        opening_tag_ch='[', closing_tag_ch=']',
+                        allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                        recognized_tag_names=None,
+                        max_tag_length=4096, max_attrs_count=32,
+                        lazy_attrs=False, raw_tag_name=None):
+    """
+    Split the given text buffer into span tokens (generator function, see ``tokenize_tag`` for parameters).
+    Yield ``(type, tag_name, tag_attrs, start, end)`` tokens, with the source of each token given as offsets in
+    the buffer. This is the tokenizer core loop, see ``tokenize_text_buffer`` for string tokens.
+    If ``end_of_text`` is not set, the buffer is the beginning of a longer text: any tag which cannot be decided
+    without looking at the rest of the text (less than ``max_tag_length`` chars before the end of the buffer) and
+    any unfinished line of raw data is left unprocessed.
+    N.B. Newline must have been normalized to ``\n`` before calling this function.
+    :param text: The input text buffer to be tokenize.
+    :param search_offset: The offset in the buffer to start searching for opening tag chars
+    (previous chars of the buffer must not contain any tag).
+    :param end_of_text: Set to ``True`` if the buffer is the end of the text (or the whole text).
+    :param raw_tag_name: The name of the raw block tag if the buffer start inside a raw block (default to ``None``).
+    :return A tuple ``(data_offset, search_offset, raw_tag_name)`` with the offset of the first unprocessed char in
+    the buffer, the offset where to resume the search for opening tag chars and the name of the raw block tag if the
+    buffer end inside a raw block (generator return value).
+
+    Raw blocks: when an opening tag token is received, the caller can send the tag name back to the generator
+    (using ``send(tag_name)``, which return ``None``) to start a raw block. All the text up to the next closing tag
+    with the same name is then yielded as a single data token (newlines included), without yielding any other tag
+    in between. The closing tag is found exactly like in normal mode, so the concatenation of the tokens is the same.
+    """
+
     # Search an opening tag
-    start = text.find(opening_tag_ch)
+    start = text.find(opening_tag_ch, search_offset)
     pos = 0
 
     # Process the whole text until no more tag can be found
     # N.B. string.find(s, beg) return -1 if beg >= len(string)
     while start >= 0:
 
-        # Run the parser to get the tag
-        try:
-            tag = parse_tag(text, start,
-                            opening_tag_ch, closing_tag_ch,
-                            allow_tagvalue_attr, allow_self_closing_tags)
-        
-        except (IndexError, ValueError):
+        # Run the scanner to get the tag
+        tag = scan_tag(text, start,
+                       opening_tag_ch, closing_tag_ch,
+                       allow_tagvalue_attr, allow_self_closing_tags,
+                       recognized_tag_names,
+                       max_tag_length, max_attrs_count,
+                       lazy_attrs)
+
+        # Continue searching if not a valid tag
+        if tag is None:
+
+            # Wait for more text if the tag may continue after the end of the buffer
+            if not end_of_text and start + max_tag_length > len(text):
+                break
 
-            # Continue searching if not a valid tag
             start = text.find(opening_tag_ch, start + 1)
             continue
 
-        # Get the text before the tag, if any
-        if start > pos:
-            text_before_tag = text[pos:start]
-            yield from tokenize_newline(text_before_tag)
-
         # Unpack the tag structure
         tag_name, is_closing_tag, is_self_closing_tag, tag_attrs, offset = tag
-        tag_source = text[start:offset]
+
+        # Skip all tags of a raw block until the closing tag of the block
+        if raw_tag_name is not None:
+            if not is_closing_tag or tag_name != raw_tag_name:
+                start = text.find(opening_tag_ch, offset)
+                continue
+            raw_tag_name = None
+
+            # Get the whole raw block content at once, if any
+            if start > pos:
+                yield TOKEN_DATA, None, None, pos, start
+
+        # Get the text before the tag, if any
+        elif start > pos:
+            yield from tokenize_newline_spans(text, pos, start)
 
         # Yield the tag token
         if is_self_closing_tag:
-            yield TOKEN_SELF_CLOSE_TAG, tag_name, tag_attrs, tag_source
+            yield TOKEN_SELF_CLOSE_TAG, tag_name, tag_attrs, start, offset
         elif is_closing_tag:
-            yield TOKEN_CLOSE_TAG, tag_name, tag_attrs, tag_source
+            yield TOKEN_CLOSE_TAG, tag_name, tag_attrs, start, offset
         else:
-            yield TOKEN_OPEN_TAG, tag_name, tag_attrs, tag_source
+            raw_tag_name = yield TOKEN_OPEN_TAG, tag_name, tag_attrs, start, offset
+
+            # Acknowledge the start of a raw block (value returned by ``send``)
+            if raw_tag_name is not None:
+                yield
             
         # Store the current position in text for next loop
         pos = offset
@@ -95,6 +274,190 @@ def tokenize_tag(text: str,
         start = text.find(opening_tag_ch, offset)
 
     # Yield the remaining piece of text if any
-    remaining_text = text[pos:]
-    if remaining_text:
-        yield from tokenize_newline(remaining_text)
+    if end_of_text:
+        if raw_tag_name is None:
+            yield from tokenize_newline_spans(text, pos, len(text))
+        elif len(text) > pos:
+            yield TOKEN_DATA, None, None, pos, len(text)
+        return len(text), len(text), raw_tag_name
+
+    # Yield all the decided text of a raw block at once
+    if start < 0:
+        start = len(text)
+    if raw_tag_name is not None:
+        if start > pos:
+            yield TOKEN_DATA, None, None, pos, start
+        return start, start, raw_tag_name
+
+    # Only yield complete lines of the remaining text, to get the same tokens as with the whole text
+    last_newline = text.rfind('\n', pos, start)
+    if last_newline >= 0:
+        yield from tokenize_newline_spans(text, pos, last_newline + 1)
+        pos = last_newline + 1
+    return pos, start, raw_tag_name
+
+
+def tokenize_text_buffer(text: str, search_offset: int, end_of_text: bool,
+                         opening_tag_ch='[', closing_tag_ch=']',
+                         allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                         recognized_tag_names=None,
+                         max_tag_length=4096, max_attrs_count=32,
+                         lazy_attrs=False, raw_tag_name=None):
+    """
+    String version of ``tokenize_text_spans`` (generator function, see ``tokenize_text_spans`` for parameters,
+    raw blocks protocol and return value).
+    Yield ``(type, tag_name, tag_attrs, source)`` tokens, with the source of each token sliced from the buffer.
+    """
+    span_tokens = tokenize_text_spans(text, search_offset, end_of_text,
+                                      opening_tag_ch, closing_tag_ch,
+                                      allow_tagvalue_attr, allow_self_closing_tags,
+                                      recognized_tag_names,
+                                      max_tag_length, max_attrs_count,
+                                      lazy_attrs, raw_tag_name)
+    try:
+        token_type, tag_name, tag_attrs, start, end = next(span_tokens)
+        while True:
+            raw_tag_name = yield token_type, tag_name, tag_attrs, text[start:end]
+
+            # Forward the start of a raw block, and acknowledge it (value returned by ``send``)
+            if raw_tag_name is not None:
+                span_tokens.send(raw_tag_name)
+                yield
+            token_type, tag_name, tag_attrs, start, end = next(span_tokens)
+    except StopIteration as stop_iteration:
+        return stop_iteration.value
+
+
+def iter_text_chunks(source, chunk_size=65536, encoding='utf-8'):
+    """
+    Turn the given text source into an iterator of text chunks.
+    Binary sources and chunks are decoded incrementally, so the whole source is never decoded at once.
+    :param source: A file-like object (with a ``read`` method, text or binary), a string, a bytes-like object
+    (``bytes``, ``bytearray``, ``memoryview`` or ``mmap``) or an iterable of strings (or bytes).
+    :param chunk_size: The size of each chunk read from a file-like object or a bytes-like object
+    (default to 64KiB).
+    :param encoding: The encoding of binary sources (default to UTF-8).
+    :return An iterator of text chunks.
+    """
+    if isinstance(source, str):
+        return iter((source, ))
+    if isinstance(source, BYTES_LIKE_TYPES):
+        return decode_text_chunks(iter_bytes_chunks(source, chunk_size), encoding)
+    if hasattr(source, 'read'):
+        return decode_text_chunks(iter_file_chunks(source, chunk_size), encoding)
+    return decode_text_chunks(source, encoding)
+
+
+def iter_bytes_chunks(source, chunk_size=65536):
+    """
+    Split the given bytes-like object into chunks, without copying it (generator function).
+    :param source: The bytes-like object (``bytes``, ``bytearray``, ``memoryview`` or ``mmap``).
+    :param chunk_size: The size of each chunk (default to 64KiB).
+    """
+    with memoryview(source) as source_view:
+        for offset in range(0, source_view.nbytes, chunk_size):
+            yield source_view[offset:offset + chunk_size]
+
+
+def iter_file_chunks(source, chunk_size=65536):
+    """
+    Read the given file-like object chunk by chunk, until the end of the file (generator function).
+    :param source: The file-like object (text or binary).
+    :param chunk_size: The size of each chunk (default to 64KiB).
+    """
+    chunk = source.read(chunk_size)
+    while chunk:
+        yield chunk
+        chunk = source.read(chunk_size)
+
+
+def decode_text_chunks(chunks, encoding='utf-8'):
+    """
+    Incrementally decode the binary chunks of the given iterable, text chunks are kept as-is (generator function).
+    Multi-bytes chars split across two chunks are handled.
+    :param chunks: The iterable of chunks (strings or bytes-like objects).
+    :param encoding: The encoding of binary chunks (default to UTF-8).
+    """
+    decoder = None
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            yield chunk
+        else:
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            yield decoder.decode(chunk)
+    if decoder is not None:
+        yield decoder.decode(b'', True)
+
+
+def tokenize_tag_stream(chunks,
+                        opening_tag_ch='[', closing_tag_ch=']',
+                        allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                        recognized_tag_names=None,
+                        max_tag_length=4096, max_attrs_count=32,
+                        lazy_attrs=False):
+    """
+    Split the given chunked text into tokens (generator function, see ``tokenize_tag`` for parameters).
+    Yield the same tokens as ``tokenize_tag`` on the whole text, but only keep in memory the current
+    unfinished line (or tag) of the text, and the chunks received since the last processing of the text.
+    :param chunks: The input text chunks, as an iterable of strings or a file-like object (see ``iter_text_chunks``).
+    """
+    assert len(opening_tag_ch) == 1, "Opening tag character must be one char long exactly."
+    assert len(closing_tag_ch) == 1, "Closing tag character must be one char long exactly."
+    assert max_tag_length > 0, "Maximum tag length must be greater than zero for streaming."
+    assert max_attrs_count >= 0, "Maximum attributes count must be greater or equal than zero."
+
+    buffer = ''
+    search_offset = 0
+    raw_tag_name = None
+    pending_chunks = []
+    pending_length = 0
+    for chunk in iter_text_chunks(chunks):
+        if not chunk:
+            continue
+
+        # Wait for more text while the pending chunks are shorter than the unprocessed text (a long line without
+        # newline or tag is so only copied a logarithmic number of times, in linear time overall)
+        pending_chunks.append(chunk)
+        pending_length += len(chunk)
+        if pending_length < len(buffer):
+            continue
+        chunk = buffer + ''.join(pending_chunks)
+        pending_chunks = []
+        pending_length = 0
+
+        # Keep any trailing CR char for the next chunk (may be a CRLF newline)
+        if chunk[-1] == '\r':
+            chunk = chunk[:-1]
+            pending_cr = '\r'
+        else:
+            pending_cr = ''
+
+        # Normalize newlines (fastest method)
+        # N.B. The (already normalized) buffer cannot end with a CR char
+        buffer = chunk.replace('\r\n', '\n').replace('\r', '\n')
+
+        # Process the buffer as much as possible
+        pos, search_offset, raw_tag_name = yield from tokenize_text_buffer(buffer, search_offset, False,
+                                                                           opening_tag_ch, closing_tag_ch,
+                                                                           allow_tagvalue_attr,
+                                                                           allow_self_closing_tags,
+                                                                           recognized_tag_names,
+                                                                           max_tag_length, max_attrs_count,
+                                                                           lazy_attrs, raw_tag_name)
+
+        # Keep the unprocessed text for the next chunk
+        buffer = buffer[pos:] + pending_cr
+        search_offset -= pos
+
+    # Process the end of the text (with the pending chunks, if any)
+    if pending_chunks:
+        buffer += ''.join(pending_chunks)
+    buffer = buffer.replace('\r\n', '\n').replace('\r', '\n')
+    if buffer:
+        yield from tokenize_text_buffer(buffer, search_offset, True,
+                                        opening_tag_ch, closing_tag_ch,
+                                        allow_tagvalue_attr, allow_self_closing_tags,
+                                        recognized_tag_names,
+                                        max_tag_length, max_attrs_count,
+                                        lazy_attrs, raw_tag_name)
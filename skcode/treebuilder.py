@@ -3,20 +3,38 @@ SkCode AST tree builder code.
 """
 
 from collections import defaultdict
+from functools import lru_cache
 from gettext import gettext as _
 
 from .etree import (
     RootTreeNode,
-    TreeNode
+    TreeNode,
+    compute_structural_hashes,
+    get_node_flags,
+    NODE_FLAG_NEWLINE_CLOSES,
+    NODE_FLAG_SAME_TAG_CLOSES,
+    NODE_FLAG_WEAK_PARENT_CLOSE,
+    NODE_FLAG_STANDALONE,
+    NODE_FLAG_PARSE_EMBEDDED,
+    NODE_FLAG_INLINE,
+    NODE_FLAG_CLOSE_INLINES
 )
 from .tags import (
     DEFAULT_RECOGNIZED_TAGS_LIST,
     build_recognized_tags_dict,
+    TagDispatchTable,
     NewlineTreeNode,
-    TextTreeNode
+    TextTreeNode,
+    TextRunTreeNode
 )
 from .tokenizer import (
+    BYTES_LIKE_TYPES,
+    normalize_newlines,
     tokenize_tag,
+    tokenize_tag_cached,
+    tokenize_tag_spans,
+    tokenize_tag_stream,
+    iter_text_chunks,
     TOKEN_DATA,
     TOKEN_NEWLINE,
     TOKEN_OPEN_TAG,
@@ -25,7 +43,7 @@ from .tokenizer import (
 )
 
 
-def parse_skcode(text: str,
+def parse_skcode(text,
                  recognized_tags=DEFAULT_RECOGNIZED_TAGS_LIST,
                  opening_tag_ch='[', closing_tag_ch=']',
                  allow_tagvalue_attr=True, allow_self_closing_tags=True,
@@ -34,11 +52,23 @@ def parse_skcode(text: str,
                  newline_node_cls=NewlineTreeNode,
                  mark_unclosed_tags_as_erroneous=False,
                  max_nesting_depth=16,
-                 cls_options_overload=None):
+                 cls_options_overload=None,
+                 unknown_tags_as_data=False,
+                 max_tag_length=4096,
+                 max_attrs_count=32,
+                 source_spans=False,
+                 lazy_attrs=True,
+                 use_tokens_cache=False,
+                 coalesce_text_runs=False,
+                 text_run_node_cls=TextRunTreeNode,
+                 cycle_free=False,
+                 structural_hashes=False):
     """
     Parse the given text as a BBCode formatted document.
     Return the resulting document tree (DOM-like parser).
-    :param text: The input text to be parsed.
+    :param text: The input text to be parsed, as a string or as an UTF-8 encoded bytes-like object (``bytes``,
+    ``bytearray``, ``memoryview`` or ``mmap``). Bytes-like objects are decoded chunk by chunk, so the whole text
+    is never decoded in memory (except with ``source_spans`` or without ``max_tag_length``).
     :param recognized_tags: A list containing all valid tag classes.
     :type recognized_tags: iterable[TreeNode]
     :param opening_tag_ch: The opening tag char (must be one char long exactly, default '[').
@@ -57,6 +87,31 @@ def parse_skcode(text: str,
     to be used to overload node options settings on a per node class basis.
     This allow simple tweak of a default class behaviour at runtime.
     :type cls_options_overload: dict[TreeNode, dict[str, Any]]
+    :param unknown_tags_as_data: If set to ``True``, tags with an unknown name are kept as raw text by the
+    tokenizer, instead of being turned into erroneous text nodes (default is ``False``).
+    :param max_tag_length: The maximum length of a tag (default to 4096). Longer tags are kept as raw text.
+    Set to zero to disable (not recommended because a Denial-Of-Service is possible if the tag length is not
+    limited, see ``tokenize_tag``).
+    :param max_attrs_count: The maximum number of attributes of a tag (default to 32). Tags with more
+    attributes are kept as raw text. Set to zero to disable.
+    :param source_spans: If set to ``True``, the text is tokenized into span tokens (see ``tokenize_tag_spans``)
+    and all nodes keep the source spans of their raw content and tags, as offsets in the (stripped, with
+    normalized newlines) source text stored in ``root_tree_node.source_text``. The related strings are materialized
+    on first access (default is ``False``).
+    :param lazy_attrs: If set to ``True``, the attributes of tags are only checked by the tokenizer, and the
+    attributes dictionary of each node is built from the opening tag source on first access (default is ``True``).
+    :param use_tokens_cache: If set to ``True``, the tokens are taken from the LRU cache of ``tokenize_tag_cached``,
+    so parsing the same text several times (with different tree building options) only tokenize the text once
+    (default is ``False``). Implies ``lazy_attrs=True``. Not used for bytes-like objects and source spans.
+    :param coalesce_text_runs: If set to ``True``, adjacent text and newlines are merged into a single text run
+    node, instead of one text node and one newline node per line (default is ``False``). Text runs are rendered like
+    the default text and newline nodes, and are supported by ``make_paragraphs``. Not supported with source spans.
+    :param text_run_node_cls: The tree node class for all text runs.
+    :param cycle_free: If set to ``True``, the document tree is cycle-free: nodes keep weak references to their
+    parent and root nodes, so the document tree is freed by reference counting as soon as the root tree node is
+    released (default is ``False``). See ``RootTreeNode``.
+    :param structural_hashes: If set to ``True``, the structural hash of each node is computed at the end of the
+    parsing stage, see ``compute_structural_hashes`` (default is ``False``).
     :return The resulting document tree at the end of the parsing stage.
     """
     assert opening_tag_ch, "The opening tag character is mandatory."
@@ -67,6 +122,250 @@ def parse_skcode(text: str,
     assert text_node_cls, "Text tree node class is mandatory."
     assert newline_node_cls, "Newline tree node class is mandatory."
     assert max_nesting_depth >= 0, "Maximum nesting depth must be greater or equal than zero."
+    assert max_tag_length >= 0, "Maximum tag length must be greater or equal than zero."
+    assert max_attrs_count >= 0, "Maximum attributes count must be greater or equal than zero."
+    assert not (coalesce_text_runs and source_spans), "Text runs are not supported with source spans."
+
+    # Build the known tag names dictionary
+    recognized_tags = build_recognized_tags_dict(recognized_tags)
+
+    # Build the overload options dictionary
+    extra_cls_kwargs = defaultdict(dict)
+    if cls_options_overload:
+        extra_cls_kwargs.update(cls_options_overload)
+
+    # Build the document tree
+    return build_document_tree(text, recognized_tags, extra_cls_kwargs,
+                               opening_tag_ch, closing_tag_ch,
+                               allow_tagvalue_attr, allow_self_closing_tags,
+                               root_node_cls, text_node_cls, newline_node_cls,
+                               mark_unclosed_tags_as_erroneous,
+                               max_nesting_depth,
+                               unknown_tags_as_data,
+                               max_tag_length, max_attrs_count,
+                               source_spans, lazy_attrs, use_tokens_cache,
+                               text_run_node_cls=text_run_node_cls if coalesce_text_runs else None,
+                               cycle_free=cycle_free,
+                               structural_hashes=structural_hashes)
+
+
+def build_document_tree(text, recognized_tags, extra_cls_kwargs=None,
+                        opening_tag_ch='[', closing_tag_ch=']',
+                        allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                        root_node_cls=RootTreeNode,
+                        text_node_cls=TextTreeNode,
+                        newline_node_cls=NewlineTreeNode,
+                        mark_unclosed_tags_as_erroneous=False,
+                        max_nesting_depth=16,
+                        unknown_tags_as_data=False,
+                        max_tag_length=4096,
+                        max_attrs_count=32,
+                        source_spans=False,
+                        lazy_attrs=True,
+                        use_tokens_cache=False,
+                        dispatch_table=None,
+                        text_run_node_cls=None,
+                        cycle_free=False,
+                        structural_hashes=False):
+    """
+    Parse the given text as a BBCode formatted document, with an already built (and checked) configuration.
+    This is the parsing stage of ``parse_skcode``, without the (costly) configuration building stage.
+    See ``parse_skcode`` for the other parameters.
+    :param recognized_tags: The dictionary of all valid tag classes, as built by ``build_recognized_tags_dict``.
+    Only read, can be shared between threads.
+    :param extra_cls_kwargs: Default dictionary of dictionaries mapped by node class type ``{class: {key : value}}``
+    to be used to overload node options settings on a per node class basis (default to ``None``, no overload).
+    :param dispatch_table: The dispatch table of all valid tag classes, as built by ``build_tag_dispatch_table``
+    (default to ``None``, built on the fly).
+    :param text_run_node_cls: The tree node class for text runs (default to ``None``, no text runs).
+    :return The resulting document tree at the end of the parsing stage.
+    """
+
+    # Cached tokens are shared between document trees, attributes dictionaries cannot be shared
+    if use_tokens_cache:
+        lazy_attrs = True
+
+    # Initialize the parser
+    root_tree_node = root_node_cls(cycle_free=True) if cycle_free else root_node_cls()
+    if lazy_attrs:
+        root_tree_node.opening_tag_ch = opening_tag_ch
+        root_tree_node.closing_tag_ch = closing_tag_ch
+    skip_raw_blocks = True
+
+    # Decode bytes-like objects chunk by chunk (with whitespaces stripped like below)
+    if isinstance(text, BYTES_LIKE_TYPES) and max_tag_length and not source_spans:
+        tokens = tokenize_tag_stream(strip_text_chunks(iter_text_chunks(text)),
+                                     opening_tag_ch, closing_tag_ch,
+                                     allow_tagvalue_attr, allow_self_closing_tags,
+                                     recognized_tags if unknown_tags_as_data else None,
+                                     max_tag_length, max_attrs_count,
+                                     lazy_attrs)
+
+    else:
+
+        # The whole text is required for source spans
+        if isinstance(text, BYTES_LIKE_TYPES):
+            text = str(text, 'utf-8')
+
+        # Cleanup text to avoid parsing useless whitespaces
+        text = text.strip()
+        if not text:
+            if structural_hashes:
+                compute_structural_hashes(root_tree_node)
+            return root_tree_node
+
+        # Fast path for tag-free text (most of user posts)
+        if opening_tag_ch not in text and not source_spans:
+            build_text_tree(root_tree_node, text, text_node_cls, newline_node_cls, text_run_node_cls)
+            process_text_tree(root_tree_node, text_node_cls, newline_node_cls, text_run_node_cls)
+            if structural_hashes:
+                compute_structural_hashes(root_tree_node)
+            return root_tree_node
+
+        # Tokenize the input text
+        if source_spans:
+            text = normalize_newlines(text)
+            root_tree_node.source_text = text
+            tokens = tokenize_tag_spans(text,
+                                        opening_tag_ch, closing_tag_ch,
+                                        allow_tagvalue_attr, allow_self_closing_tags,
+                                        recognized_tags if unknown_tags_as_data else None,
+                                        max_tag_length, max_attrs_count,
+                                        lazy_attrs)
+        elif use_tokens_cache:
+            tokens = tokenize_tag_cached(text,
+                                         opening_tag_ch, closing_tag_ch,
+                                         allow_tagvalue_attr, allow_self_closing_tags,
+                                         frozenset(recognized_tags) if unknown_tags_as_data else None,
+                                         max_tag_length, max_attrs_count)
+            skip_raw_blocks = False
+        else:
+            tokens = tokenize_tag(text,
+                                  opening_tag_ch, closing_tag_ch,
+                                  allow_tagvalue_attr, allow_self_closing_tags,
+                                  recognized_tags if unknown_tags_as_data else None,
+                                  max_tag_length, max_attrs_count,
+                                  lazy_attrs)
+
+    # Build the document tree
+    for _step in build_tree(root_tree_node, tokens, recognized_tags,
+                            text_node_cls, newline_node_cls,
+                            mark_unclosed_tags_as_erroneous,
+                            max_nesting_depth, extra_cls_kwargs,
+                            span_tokens=source_spans,
+                            skip_raw_blocks=skip_raw_blocks,
+                            lazy_attrs=lazy_attrs,
+                            dispatch_table=dispatch_table,
+                            text_run_node_cls=text_run_node_cls):
+        pass
+
+    # Perform sanity check
+    process_tree(root_tree_node)
+
+    # Compute the structural hashes (once the nodes are processed)
+    if structural_hashes:
+        compute_structural_hashes(root_tree_node)
+
+    # Return the resulting AST
+    return root_tree_node
+
+
+def parse_skcode_tokens(tokens,
+                        recognized_tags=DEFAULT_RECOGNIZED_TAGS_LIST,
+                        opening_tag_ch='[', closing_tag_ch=']',
+                        root_node_cls=RootTreeNode,
+                        text_node_cls=TextTreeNode,
+                        newline_node_cls=NewlineTreeNode,
+                        mark_unclosed_tags_as_erroneous=False,
+                        max_nesting_depth=16,
+                        cls_options_overload=None,
+                        coalesce_text_runs=False,
+                        text_run_node_cls=TextRunTreeNode,
+                        cycle_free=False,
+                        structural_hashes=False):
+    """
+    Build the document tree of an already tokenized text (tokenize once, build many times).
+    The tokens must have lazy attributes, like the tokens returned by ``tokenize_tag_cached``, and are not
+    modified, so the same tokens can be used to build several document trees with different options.
+    See ``parse_skcode`` for the other parameters.
+    :param tokens: The tokens iterable (with lazy attributes).
+    :param opening_tag_ch: The opening tag char used for tokenizing (default '[').
+    :param closing_tag_ch: The closing tag char used for tokenizing (default ']').
+    :return The resulting document tree at the end of the parsing stage.
+    """
+    assert root_node_cls, "Root tree node class is mandatory."
+    assert text_node_cls, "Text tree node class is mandatory."
+    assert newline_node_cls, "Newline tree node class is mandatory."
+    assert max_nesting_depth >= 0, "Maximum nesting depth must be greater or equal than zero."
+
+    # Build the known tag names dictionary
+    recognized_tags = build_recognized_tags_dict(recognized_tags)
+
+    # Build the overload options dictionary
+    extra_cls_kwargs = defaultdict(dict)
+    if cls_options_overload:
+        extra_cls_kwargs.update(cls_options_overload)
+
+    # Initialize the parser
+    root_tree_node = root_node_cls(cycle_free=True) if cycle_free else root_node_cls()
+    root_tree_node.opening_tag_ch = opening_tag_ch
+    root_tree_node.closing_tag_ch = closing_tag_ch
+
+    # Build the document tree
+    for _step in build_tree(root_tree_node, tokens, recognized_tags,
+                            text_node_cls, newline_node_cls,
+                            mark_unclosed_tags_as_erroneous,
+                            max_nesting_depth, extra_cls_kwargs,
+                            lazy_attrs=True,
+                            text_run_node_cls=text_run_node_cls if coalesce_text_runs else None):
+        pass
+
+    # Perform sanity check
+    process_tree(root_tree_node)
+
+    # Compute the structural hashes (once the nodes are processed)
+    if structural_hashes:
+        compute_structural_hashes(root_tree_node)
+
+    # Return the resulting AST
+    return root_tree_node
+
+
+def parse_skcode_stream(chunks,
+                        recognized_tags=DEFAULT_RECOGNIZED_TAGS_LIST,
+                        opening_tag_ch='[', closing_tag_ch=']',
+                        allow_tagvalue_attr=True, allow_self_closing_tags=True,
+                        root_node_cls=RootTreeNode,
+                        text_node_cls=TextTreeNode,
+                        newline_node_cls=NewlineTreeNode,
+                        mark_unclosed_tags_as_erroneous=False,
+                        max_nesting_depth=16,
+                        cls_options_overload=None,
+                        unknown_tags_as_data=False,
+                        max_tag_length=4096,
+                        max_attrs_count=32,
+                        lazy_attrs=True):
+    """
+    Parse the given chunked text as a BBCode formatted document (generator function).
+    Yield each top-level node of the document tree (the children of the root tree node) as soon as it is closed
+    and processed, so the memory usage is bounded by the largest top-level block instead of the whole document.
+    Yielded nodes are not kept in the root tree node children list, but keep their reference to the (shared)
+    root tree node, which can be used to setup document-level options (smileys, cosmetics, etc) before rendering.
+    N.B. Each top-level node is pre-processed, sanitized and post-processed on its own, so references to IDs
+    declared in a later top-level node (anchors, footnotes, etc) are reported as unknown.
+    See ``parse_skcode`` for the other parameters.
+    :param chunks: The input text chunks, as an iterable of strings or a file-like object.
+    """
+    assert opening_tag_ch, "The opening tag character is mandatory."
+    assert len(opening_tag_ch) == 1, "Opening tag character must be one char long exactly."
+    assert closing_tag_ch, "The closing tag character is mandatory."
+    assert len(closing_tag_ch) == 1, "Closing tag character must be one char long exactly."
+    assert root_node_cls, "Root tree node class is mandatory."
+    assert text_node_cls, "Text tree node class is mandatory."
+    assert newline_node_cls, "Newline tree node class is mandatory."
+    assert max_nesting_depth >= 0, "Maximum nesting depth must be greater or equal than zero."
+    assert max_tag_length > 0, "Maximum tag length must be greater than zero for streaming."
+    assert max_attrs_count >= 0, "Maximum attributes count must be greater or equal than zero."
 
     # Build the known tag names dictionary
     recognized_tags = build_recognized_tags_dict(recognized_tags)
@@ -77,27 +376,156 @@ def parse_skcode(text: str,
         extra_cls_kwargs.update(cls_options_overload)
 
     # Initialize the parser
-    root_tree_node = cur_tree_node = root_node_cls()
+    root_tree_node = root_node_cls()
+    if lazy_attrs:
+        root_tree_node.opening_tag_ch = opening_tag_ch
+        root_tree_node.closing_tag_ch = closing_tag_ch
+    root_tree_node.pre_process_node()
+
+    # Tokenize the input text (with whitespaces stripped like in ``parse_skcode``)
+    tokens = tokenize_tag_stream(strip_text_chunks(iter_text_chunks(chunks)),
+                                 opening_tag_ch, closing_tag_ch,
+                                 allow_tagvalue_attr, allow_self_closing_tags,
+                                 recognized_tags if unknown_tags_as_data else None,
+                                 max_tag_length, max_attrs_count,
+                                 lazy_attrs)
+
+    # Build the document tree, top-level node by top-level node
+    for _step in build_tree(root_tree_node, tokens, recognized_tags,
+                            text_node_cls, newline_node_cls,
+                            mark_unclosed_tags_as_erroneous,
+                            max_nesting_depth, extra_cls_kwargs,
+                            yield_top_level_nodes=True,
+                            skip_raw_blocks=True,
+                            lazy_attrs=lazy_attrs):
+        yield from pop_top_level_nodes(root_tree_node)
+    yield from pop_top_level_nodes(root_tree_node)
+
+    # Perform sanity check of the root node itself
+    root_tree_node.sanitize_node([])
+    root_tree_node.post_process_node()
+
+
+def strip_text_chunks(chunks):
+    """
+    Remove leading and trailing whitespaces of the chunked text, like ``str.strip()`` on the whole text
+    (generator function).
+    :param chunks: The input text chunks iterable.
+    """
+    pending_whitespaces = None
+    for chunk in chunks:
+
+        # Skip leading whitespaces
+        if pending_whitespaces is None:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            pending_whitespaces = ''
+
+        # Keep trailing whitespaces until some non-whitespace text is found
+        stripped_chunk = chunk.rstrip()
+        if stripped_chunk:
+            yield pending_whitespaces + stripped_chunk
+            pending_whitespaces = chunk[len(stripped_chunk):]
+        else:
+            pending_whitespaces += chunk
+
+
+def pop_top_level_nodes(root_tree_node):
+    """
+    Pre-process, sanitize and post-process each (closed) child node of the given root tree node,
+    then remove them from the root node children list and yield them (generator function).
+    :param root_tree_node: The root tree node.
+    """
+    top_level_nodes = root_tree_node.children
+    root_tree_node.children = []
+    root_tree_node.rebuild_nodes_index()
+    for tree_node in top_level_nodes:
+        process_tree(tree_node)
+        yield tree_node
+
+
+def build_tree(root_tree_node, tokens, recognized_tags,
+               text_node_cls=TextTreeNode,
+               newline_node_cls=NewlineTreeNode,
+               mark_unclosed_tags_as_erroneous=False,
+               max_nesting_depth=16,
+               extra_cls_kwargs=None,
+               yield_top_level_nodes=False,
+               span_tokens=False,
+               skip_raw_blocks=False,
+               lazy_attrs=False,
+               dispatch_table=None,
+               text_run_node_cls=None):
+    """
+    Build the document tree from the given tokens (SAX-like tree building algorithm, generator function).
+    :param root_tree_node: The root tree node of the document tree.
+    :param tokens: The tokens iterable, as generated by ``tokenize_tag``.
+    :param recognized_tags: The dictionary of all valid tag classes, as built by ``build_recognized_tags_dict``.
+    :param text_node_cls: The tree node class for all normal text nodes.
+    :param newline_node_cls: The tree node class for all newlines.
+    :param mark_unclosed_tags_as_erroneous: If set to ``True``, unclosed tags will be mark as erroneous
+    (default is ``False``).
+    :param max_nesting_depth: The maximum nesting depth (default to 16). Set to zero to disable.
+    :param extra_cls_kwargs: Default dictionary of dictionaries mapped by node class type ``{class: {key : value}}``
+    to be used to overload node options settings on a per node class basis.
+    :param yield_top_level_nodes: If set to ``True``, yield ``None`` each time all the children nodes of the root
+    tree node are closed (default is ``False``, never yield).
+    :param span_tokens: If set to ``True``, the tokens are span tokens, as generated by ``tokenize_tag_spans``
+    on the root tree node source text (default is ``False``). Nodes are then built with source spans.
+    :param skip_raw_blocks: If set to ``True``, the tokens generator is asked to yield the whole content of each
+    node with ``parse_embedded=False`` as a single data token (default is ``False``). The tokens generator must
+    support the raw blocks protocol of ``tokenize_text_buffer``.
+    :param lazy_attrs: If set to ``True``, the tokens are lazy attributes tokens (see ``tokenize_tag``) and the
+    attributes dictionary of each node is built on first access (default is ``False``). The opening and closing
+    tag chars must be set on the root tree node.
+    :param dispatch_table: The dispatch table of all valid tag classes, as built by ``build_tag_dispatch_table``
+    with the same options overload (default to ``None``, built on demand, see ``TagDispatchTable``).
+    The dispatch table must have an entry for each tag name of ``recognized_tags``, and is only read. All aliases of
+    a tag class share the same type ID, the ``same_tag_closes`` option matches nodes of the same tag class (or of a
+    subclass of it).
+    :param text_run_node_cls: The tree node class for text runs, see ``TextRunTreeNode`` (default to ``None``).
+    If set, adjacent text and newlines are merged into a single text run node, instead of one text node and one
+    newline node per line. Not supported with span tokens.
+    """
+    if extra_cls_kwargs is None:
+        extra_cls_kwargs = defaultdict(dict)
+    if dispatch_table is None:
+        dispatch_table = TagDispatchTable(recognized_tags, extra_cls_kwargs)
+
+    # Stack of ``(node, flags, type_id)`` from the root tree node to the current tree node
+    node_stack = [(root_tree_node, get_node_flags(root_tree_node), -1)]
+    cur_tree_node, cur_flags, cur_type_id = node_stack[-1]
     cur_nesting_depth = 0
+    raw_content_parts = []
 
-    # Cleanup text to avoid parsing useless whitespaces
-    text = text.strip()
-    if not text:
-        return root_tree_node
+    # Process all tokens
+    for token in tokens:
+
+        # Notify the caller when all top-level nodes are closed
+        if yield_top_level_nodes and len(node_stack) == 1 and root_tree_node.children:
+            yield
 
-    # Tokenize the input text
-    for token in tokenize_tag(text,
-                              opening_tag_ch, closing_tag_ch,
-                              allow_tagvalue_attr, allow_self_closing_tags):
-        
         # Unpack the token
-        token_type, tag_name, tag_attrs, token_source = token
+        if span_tokens:
+            token_type, tag_name, tag_attrs, token_start, token_end = token
+            token_source = ''
+            token_span = token_start, token_end
+        else:
+            token_type, tag_name, tag_attrs, token_source = token
+            token_span = None
 
         # Handle DATA block
-        if not cur_tree_node.parse_embedded and (token_type != TOKEN_CLOSE_TAG or tag_name != cur_tree_node.name):
-
-            # Append the raw source to the node until closing tag found
-            cur_tree_node.content += token_source
+        if not cur_flags & NODE_FLAG_PARSE_EMBEDDED \
+                and (token_type != TOKEN_CLOSE_TAG or tag_name != cur_tree_node.name):
+
+            # Append the raw source to the node until closing tag found (joined when the node is closed)
+            if token_span is None:
+                raw_content_parts.append(token_source)
+            elif cur_tree_node.content_span is None:
+                cur_tree_node.content_span = token_span
+            else:
+                cur_tree_node.content_span = cur_tree_node.content_span[0], token_end
             continue
 
         # The ``if`` below must be an ``if`` and not an ``elif`` because we need to parse
@@ -109,24 +537,34 @@ def parse_skcode(text: str,
             # Turn the token into raw data
             cur_tree_node.new_child(None, text_node_cls,
                                     source_open_tag=token_source,
+                                    source_open_tag_span=token_span,
                                     error_message=_('Unknown tag name'))
 
         # SAX-like tree building algorithm
         elif token_type == TOKEN_DATA:
-            
-            # Append to the current node
-            cur_tree_node.new_child(None, text_node_cls,
-                                    content=token_source)
+
+            # Append to the current node (or to the current text run)
+            if text_run_node_cls is None:
+                cur_tree_node.new_child(None, text_node_cls,
+                                        content=token_source,
+                                        content_span=token_span)
+            else:
+                append_text_run_piece(cur_tree_node, token_source, text_run_node_cls)
             
         elif token_type == TOKEN_NEWLINE:
 
             # Handle newline_closes option
             # Loop to handle the case when nested tag need to be closed at once
-            while cur_tree_node.newline_closes and cur_tree_node.parent is not None:
-                cur_tree_node = cur_tree_node.parent
-
-            # Append to the current node
-            cur_tree_node.new_child(None, newline_node_cls)
+            if cur_flags & NODE_FLAG_NEWLINE_CLOSES:
+                while len(node_stack) > 1 and node_stack[-1][1] & NODE_FLAG_NEWLINE_CLOSES:
+                    node_stack.pop()
+                cur_tree_node, cur_flags, cur_type_id = node_stack[-1]
+
+            # Append to the current node (or to the current text run)
+            if text_run_node_cls is None:
+                cur_tree_node.new_child(None, newline_node_cls)
+            else:
+                append_text_run_piece(cur_tree_node, text_run_node_cls.newline_piece, text_run_node_cls)
             
         elif token_type == TOKEN_OPEN_TAG:
 
@@ -136,76 +574,99 @@ def parse_skcode(text: str,
                 # Tag cannot be open, fallback as erroneous text
                 cur_tree_node.new_child(None, text_node_cls,
                                         source_open_tag=token_source,
+                                        source_open_tag_span=token_span,
                                         error_message=_('Nesting depth limit reached'))
 
                 # End of processing for this tag
                 continue
 
             # Load tag options
-            tag_cls = recognized_tags[tag_name]
+            tag_cls, tag_type_id, tag_flags = dispatch_table[tag_name]
 
             # Handle same_tag_closes option
-            if cur_tree_node.same_tag_closes \
-                    and isinstance(cur_tree_node, tag_cls) \
-                    and cur_tree_node.parent is not None:
-                cur_tree_node = cur_tree_node.parent
+            if cur_flags & NODE_FLAG_SAME_TAG_CLOSES \
+                    and (cur_type_id == tag_type_id or isinstance(cur_tree_node, tag_cls)) \
+                    and len(node_stack) > 1:
+                node_stack.pop()
+                cur_tree_node, cur_flags, cur_type_id = node_stack[-1]
 
             # Handle close_inlines
-            if tag_cls.close_inlines:
-                while cur_tree_node.inline and cur_tree_node.parent is not None:
-                    cur_tree_node = cur_tree_node.parent
+            if tag_flags & NODE_FLAG_CLOSE_INLINES and cur_flags & NODE_FLAG_INLINE:
+                while len(node_stack) > 1 and node_stack[-1][1] & NODE_FLAG_INLINE:
+                    node_stack.pop()
+                cur_tree_node, cur_flags, cur_type_id = node_stack[-1]
 
             # Create a new child node
             new_node = cur_tree_node.new_child(tag_name, tag_cls,
-                                               attrs=tag_attrs,
+                                               attrs=None if lazy_attrs else tag_attrs,
+                                               attrs_offset=tag_attrs if lazy_attrs else None,
                                                source_open_tag=token_source,
+                                               source_open_tag_span=token_span,
                                                **extra_cls_kwargs[tag_cls])
 
             # Jump to the new child node if not standalone
-            if not tag_cls.standalone:
-                cur_tree_node = new_node
+            if not tag_flags & NODE_FLAG_STANDALONE:
+                node_stack.append((new_node, tag_flags, tag_type_id))
+                cur_tree_node, cur_flags, cur_type_id = new_node, tag_flags, tag_type_id
 
                 # Update nesting depth limit
                 cur_nesting_depth += 1
+
+                # Get the whole content of DATA block at once
+                if skip_raw_blocks and not tag_flags & NODE_FLAG_PARSE_EMBEDDED:
+                    tokens.send(tag_name)
         
         elif token_type == TOKEN_CLOSE_TAG:
 
             # Check if current node can be closed
-            if cur_tree_node.parent is None or cur_tree_node.name != tag_name:
+            if len(node_stack) == 1 or cur_tree_node.name != tag_name:
 
                 # Look for the parent to close
-                depth = 0
-                cursor = cur_tree_node
-                while cursor.parent is not None and (
-                            (cursor.weak_parent_close and cursor.parent.name != tag_name) or cursor.parent.name == tag_name):
-                    depth += 1
-                    cursor = cursor.parent
+                index = len(node_stack) - 1
+                while index and ((node_stack[index][1] & NODE_FLAG_WEAK_PARENT_CLOSE
+                                  and node_stack[index - 1][0].name != tag_name)
+                                 or node_stack[index - 1][0].name == tag_name):
+                    index -= 1
+                cursor = node_stack[index][0]
 
                 # Handle weak parent close option
                 if cursor.name == tag_name:
 
-                    # Close all traversal tree nodes
-                    cur_tree_node = cursor
-
                     # Also close the parent node
-                    cur_tree_node.source_close_tag = token_source
-                    cur_tree_node = cur_tree_node.parent
+                    if token_span is None:
+                        cursor.source_close_tag = token_source
+                    else:
+                        cursor.source_close_tag_span = token_span
 
                     # Update nesting depth limit
-                    cur_nesting_depth -= depth
+                    cur_nesting_depth -= len(node_stack) - 1 - index
+
+                    # Close all traversal tree nodes
+                    del node_stack[index:]
+                    cur_tree_node, cur_flags, cur_type_id = node_stack[-1]
 
                 else:
 
                     # Tag cannot be closed, fallback as erroneous text
                     cur_tree_node.new_child(None, text_node_cls,
                                             source_close_tag=token_source,
+                                            source_close_tag_span=token_span,
                                             error_message=_('Unexpected closing tag'))
 
             else:
 
+                # Set the raw content of DATA block
+                if raw_content_parts:
+                    cur_tree_node.content += ''.join(raw_content_parts)
+                    raw_content_parts = []
+
                 # Close the current tree node
-                cur_tree_node.source_close_tag = token_source
-                cur_tree_node = cur_tree_node.parent
+                if token_span is None:
+                    cur_tree_node.source_close_tag = token_source
+                else:
+                    cur_tree_node.source_close_tag_span = token_span
+                node_stack.pop()
+                cur_tree_node, cur_flags, cur_type_id = node_stack[-1]
 
                 # Update nesting depth limit
                 if cur_nesting_depth:
@@ -214,84 +675,251 @@ def parse_skcode(text: str,
         elif token_type == TOKEN_SELF_CLOSE_TAG:
 
             # Load tag options
-            tag_cls = recognized_tags[tag_name]
+            tag_cls, tag_type_id, tag_flags = dispatch_table[tag_name]
 
             # Detect erroneous self closing tag
-            if not tag_cls.standalone:
+            if not tag_flags & NODE_FLAG_STANDALONE:
 
                 # Erroneous tag, fallback as erroneous text
                 cur_tree_node.new_child(None, text_node_cls,
                                         source_open_tag=token_source,
+                                        source_open_tag_span=token_span,
                                         error_message=_('Unexpected self closing tag'))
                 
             else:
                 
                 # Create a new child node
                 cur_tree_node.new_child(tag_name, tag_cls,
-                                        attrs=tag_attrs,
+                                        attrs=None if lazy_attrs else tag_attrs,
+                                        attrs_offset=tag_attrs if lazy_attrs else None,
                                         source_open_tag=token_source,
+                                        source_open_tag_span=token_span,
                                         **extra_cls_kwargs[tag_cls])
 
+    # Set the raw content of unclosed DATA block
+    if raw_content_parts:
+        cur_tree_node.content += ''.join(raw_content_parts)
+
     # Close all remaining weak nodes
-    while cur_tree_node != root_tree_node and cur_tree_node.parent is not None and cur_tree_node.weak_parent_close:
-        cur_tree_node = cur_tree_node.parent
+    while len(node_stack) > 1 and node_stack[-1][1] & NODE_FLAG_WEAK_PARENT_CLOSE:
+        node_stack.pop()
 
     # Mark unclosed tags as erroneous
     if mark_unclosed_tags_as_erroneous:
-        while cur_tree_node != root_tree_node and cur_tree_node.parent is not None:
-            cur_tree_node.error_message = _('Unclosed tag')
-            cur_tree_node = cur_tree_node.parent
+        while len(node_stack) > 1:
+            node_stack.pop()[0].error_message = _('Unclosed tag')
 
-    # Perform sanity check
-    pre_process_tree(root_tree_node)
-    sanitize_tree(root_tree_node)
-    post_process_tree(root_tree_node)
 
-    # Return the resulting AST
-    return root_tree_node
+def append_text_run_piece(tree_node, piece, text_run_node_cls=TextRunTreeNode):
+    """
+    Append the given text piece to the text run node at the end of the children list of the given tree node.
+    A new text run node is created if the last child node is not a text run node.
+    :param tree_node: The parent tree node.
+    :param piece: The text piece (a newline piece or a text without newline).
+    :param text_run_node_cls: The tree node class for text runs.
+    """
+    children = tree_node.children
+    if children and children[-1].__class__ is text_run_node_cls:
+        children[-1].text_pieces.append(piece)
+    else:
+        tree_node.new_child(None, text_run_node_cls, text_pieces=[piece])
 
 
-def pre_process_tree(tree_node: TreeNode):
+def build_text_tree(root_tree_node, text,
+                    text_node_cls=TextTreeNode,
+                    newline_node_cls=NewlineTreeNode,
+                    text_run_node_cls=None):
     """
-    Recursive method for pre-processing the given tree node and children recursively.
-    :param tree_node: The tree node to be pre-processed.
+    Build the document tree of a tag-free text (linear fast path of ``tokenize_tag`` and ``build_tree``).
+    The resulting document tree is the same as the one built from the tokens of the text: one text node per
+    non-empty line and one newline node per newline, as children of the root tree node.
+    :param root_tree_node: The root tree node of the document tree.
+    :param text: The input text, without any opening tag char.
+    :param text_node_cls: The tree node class for all normal text nodes.
+    :param newline_node_cls: The tree node class for all newlines.
+    :param text_run_node_cls: The tree node class for text runs (default to ``None``). If set, the whole text is
+    stored in a single text run node.
     """
+    lines = normalize_newlines(text).split('\n')
+    last_line = lines.pop()
+
+    # Single text run
+    if text_run_node_cls is not None:
+        newline_piece = text_run_node_cls.newline_piece
+        text_pieces = []
+        for line in lines:
+            if line:
+                text_pieces.append(line)
+            text_pieces.append(newline_piece)
+        if last_line:
+            text_pieces.append(last_line)
+        root_tree_node.new_child(None, text_run_node_cls, text_pieces=text_pieces)
+        return
+
+    new_child = root_tree_node.new_child
+    for line in lines:
+        if line:
+            new_child(None, text_node_cls, content=line)
+        new_child(None, newline_node_cls)
+
+    if last_line:
+        new_child(None, text_node_cls, content=last_line)
+
+
+# Processing callback functions overridden by a tree node class (packed in a single integer)
+PROCESSING_HOOK_PRE_PROCESS = 0x01
+PROCESSING_HOOK_SANITIZE = 0x02
+PROCESSING_HOOK_POST_PROCESS = 0x04
+
+
+@lru_cache(maxsize=1024)
+def get_processing_hooks(node_cls):
+    """
+    Get the pre-processing, sanitizing and post-processing callback functions overridden by the given tree node
+    class (result cached per class).
+    :param node_cls: The tree node class to be checked.
+    :return: The overridden callback functions flags, see the ``PROCESSING_HOOK_*`` constants.
+    """
+    hooks = 0
+    if node_cls.pre_process_node is not TreeNode.pre_process_node:
+        hooks |= PROCESSING_HOOK_PRE_PROCESS
+    if node_cls.sanitize_node is not TreeNode.sanitize_node:
+        hooks |= PROCESSING_HOOK_SANITIZE
+    if node_cls.post_process_node is not TreeNode.post_process_node:
+        hooks |= PROCESSING_HOOK_POST_PROCESS
+    return hooks
 
-    # Pre-process the node
-    tree_node.pre_process_node()
 
-    # Go down the tree
-    for child_node in tree_node.children:
-        pre_process_tree(child_node)
+def has_default_processing_hooks(node_cls):
+    """
+    Check if the given tree node class use the default (no-op) pre-processing, sanitizing and post-processing
+    callback functions of the ``TreeNode`` class.
+    :param node_cls: The tree node class to be checked.
+    :return: ``True`` if none of the callback functions is overridden, ``False`` otherwise.
+    """
+    return not get_processing_hooks(node_cls)
+
+
+def process_text_tree(root_tree_node, text_node_cls=TextTreeNode, newline_node_cls=NewlineTreeNode,
+                      text_run_node_cls=None):
+    """
+    Pre-process, sanitize and post-process a document tree built by ``build_text_tree``.
+    The children nodes are only visited if the text, newline or text run node class override a callback function.
+    :param root_tree_node: The root tree node of the document tree.
+    :param text_node_cls: The tree node class for all normal text nodes.
+    :param newline_node_cls: The tree node class for all newlines.
+    :param text_run_node_cls: The tree node class for text runs (default to ``None``).
+    """
+    if has_default_processing_hooks(text_node_cls) and has_default_processing_hooks(newline_node_cls) \
+            and (text_run_node_cls is None or has_default_processing_hooks(text_run_node_cls)):
+        root_tree_node.pre_process_node()
+        root_tree_node.sanitize_node([])
+        root_tree_node.post_process_node()
+    else:
+        process_tree(root_tree_node)
+
+
+def process_tree(tree_node: TreeNode):
+    """
+    Pre-process, sanitize and post-process the given tree node and children.
+    Same as calling ``pre_process_tree``, ``sanitize_tree`` and ``post_process_tree`` in this order: the whole tree
+    is pre-processed before being sanitized, and sanitized before being post-processed. The sanitizing and
+    post-processing passes are skipped when no visited node class override the related callback function.
+    :param tree_node: The tree node to be processed.
+    """
+    hooks = pre_process_tree(tree_node)
+    if hooks & PROCESSING_HOOK_SANITIZE:
+        sanitize_tree(tree_node)
+        post_process_tree(tree_node)
+    elif hooks & PROCESSING_HOOK_POST_PROCESS:
+        post_process_tree(tree_node)
+
+
+def pre_process_tree(tree_node: TreeNode):
+    """
+    Pre-process the given tree node and children (top-to-down visit order, iterative).
+    The callback function is only called for node classes overriding it.
+    :param tree_node: The tree node to be pre-processed.
+    :return: The callback functions flags overridden by any of the visited node classes (see ``get_processing_hooks``).
+    """
+    all_hooks = 0
+    get_hooks = get_processing_hooks
+    iterators_stack = [iter((tree_node, ))]
+    while iterators_stack:
+        for tree_node in iterators_stack[-1]:
+
+            # Pre-process the node
+            hooks = get_hooks(tree_node.__class__)
+            if hooks & PROCESSING_HOOK_PRE_PROCESS:
+                tree_node.pre_process_node()
+            all_hooks |= hooks
+
+            # Go down the tree
+            if tree_node.children:
+                iterators_stack.append(iter(tree_node.children))
+                break
+        else:
+            iterators_stack.pop()
+    return all_hooks
 
 
 def sanitize_tree(tree_node: TreeNode, breadcrumb=None):
     """
-    Recursive method for sanitizing the given tree node and children recursively.
+    Sanitize the given tree node and children (down-to-top visit order, iterative).
+    The callback function is only called for node classes overriding it, with a copy of the current breadcrumb.
     :param tree_node: The tree node to be sanitized.
     :param breadcrumb: The current breadcrumb of parent nodes (default to an empty list).
     :type breadcrumb: list or None
     """
-    breadcrumb = breadcrumb or []
 
-    # Down to top visit order (depth-first algorithm) with breadcrumb
-    sub_breadcrumb = [] if tree_node.is_root else [tree_node]
-    for child_node in tree_node.children:
-        sanitize_tree(child_node, breadcrumb + sub_breadcrumb)
-
-    # Sanitize the node
-    tree_node.sanitize_node(breadcrumb)
+    # Breadcrumb stack (copied for each callback), and stack of ``(node, children iterator)``.
+    # Children lists are iterated live, like a for loop, to allow unwrapping of nodes in the parent children list.
+    breadcrumb = list(breadcrumb) if breadcrumb else []
+    if not tree_node.is_root:
+        breadcrumb.append(tree_node)
+    get_hooks = get_processing_hooks
+    nodes_stack = [(tree_node, iter(tree_node.children))]
+    while nodes_stack:
+        for child_node in nodes_stack[-1][1]:
+
+            # Go down the tree first
+            if child_node.children:
+                if not child_node.is_root:
+                    breadcrumb.append(child_node)
+                nodes_stack.append((child_node, iter(child_node.children)))
+                break
+
+            # Sanitize leaf nodes directly
+            if get_hooks(child_node.__class__) & PROCESSING_HOOK_SANITIZE:
+                child_node.sanitize_node(breadcrumb[:])
+        else:
+
+            # Then sanitize the node, with the breadcrumb of parent nodes
+            tree_node = nodes_stack.pop()[0]
+            if not tree_node.is_root:
+                breadcrumb.pop()
+            if get_hooks(tree_node.__class__) & PROCESSING_HOOK_SANITIZE:
+                tree_node.sanitize_node(breadcrumb[:])
 
 
 def post_process_tree(tree_node: TreeNode):
     """
-    Recursive method for post-processing the given tree node and children recursively.
+    Post-process the given tree node and children (top-to-down visit order, iterative).
+    The callback function is only called for node classes overriding it.
     :param tree_node: The tree node to be post-processed.
     """
-
-    # Post-process the node
-    tree_node.post_process_node()
-
-    # Go down the tree
-    for child_node in tree_node.children:
-        post_process_tree(child_node)
+    get_hooks = get_processing_hooks
+    iterators_stack = [iter((tree_node, ))]
+    while iterators_stack:
+        for tree_node in iterators_stack[-1]:
+
+            # Post-process the node
+            if get_hooks(tree_node.__class__) & PROCESSING_HOOK_POST_PROCESS:
+                tree_node.post_process_node()
+
+            # Go down the tree
+            if tree_node.children:
+                iterators_stack.append(iter(tree_node.children))
+                break
+        else:
+            iterators_stack.pop()
@@ -2,13 +2,15 @@
 SkCode auto paragraphs utility code.
 """
 
-from ..etree import TreeNode
-from ..tags import TextTreeNode, NewlineTreeNode
+from ..etree import TreeNode, compute_structural_hashes, iter_tree_postorder
+from ..tags import TextTreeNode, NewlineTreeNode, TextRunTreeNode
 
 
 class ParagraphTreeNode(TreeNode):
     """ Paragraph tree node class. """
 
+    __slots__ = ()
+
     # HTML class for the paragraph
     html_text_class = 'text-justify'
 
@@ -34,22 +36,92 @@ class ParagraphTreeNode(TreeNode):
         return inner_text.strip() + '\n\n'
 
 
+# Kinds of nodes for the paragraphs grouping
+NODE_KIND_OTHER = 0
+NODE_KIND_TEXT = 1
+NODE_KIND_NEWLINE = 2
+NODE_KIND_TEXT_RUN = 3
+
+
 def make_paragraphs(tree_node,
                     paragraph_node_cls=ParagraphTreeNode,
                     text_node_cls=TextTreeNode,
-                    newline_node_cls=NewlineTreeNode):
+                    newline_node_cls=NewlineTreeNode,
+                    text_run_node_cls=TextRunTreeNode):
     """
     Group all inline nodes into paragraphs according to each node options.
+    Text runs are split at paragraph boundaries, like the equivalent text and newline nodes.
+    The nodes index of the document is invalidated (rebuilt on the next lookup), and the structural hashes of the
+    document are computed again, if any.
     :param tree_node: Tree node to be processed.
     :param paragraph_node_cls: The tree node class for all newly created paragraph nodes.
     :param text_node_cls: The tree node class for all text nodes.
     :param newline_node_cls: The tree node class for all newlines.
+    :param text_run_node_cls: The tree node class for all text runs.
     """
     assert tree_node, "The tree node instance is mandatory."
+    assert not tree_node.root_tree_node.frozen, "Frozen document trees are immutable, make paragraphs before freezing."
+    node_kinds = {}
+    group_paragraphs(tree_node, paragraph_node_cls, text_node_cls, newline_node_cls, node_kinds, text_run_node_cls)
+    root_tree_node = tree_node.root_tree_node
+    root_tree_node.invalidate_nodes_index()
+    if root_tree_node.structural_hash is not None:
+        compute_structural_hashes(root_tree_node)
 
-    # Process all children first
-    for child_node in tree_node.children:
-        make_paragraphs(child_node, paragraph_node_cls, text_node_cls, newline_node_cls)
+
+def get_node_kind(node_cls, text_node_cls, newline_node_cls, text_run_node_cls=TextRunTreeNode):
+    """
+    Get the kind of the given node class for the paragraphs grouping.
+    :param node_cls: The tree node class.
+    :param text_node_cls: The tree node class for all text nodes.
+    :param newline_node_cls: The tree node class for all newlines.
+    :param text_run_node_cls: The tree node class for all text runs.
+    :return: The node kind, see the ``NODE_KIND_*`` constants.
+    """
+    if issubclass(node_cls, text_run_node_cls):
+        return NODE_KIND_TEXT_RUN
+    if issubclass(node_cls, text_node_cls):
+        return NODE_KIND_TEXT
+    if issubclass(node_cls, newline_node_cls):
+        return NODE_KIND_NEWLINE
+    return NODE_KIND_OTHER
+
+
+def append_text_run_piece_to(children, parent, piece, text_run_node_cls):
+    """
+    Append the given text piece to the last text run of the given children list, or to a new text run.
+    :param children: The destination children list.
+    :param parent: The parent node of the destination children list.
+    :param piece: The text piece to be appended.
+    :param text_run_node_cls: The tree node class for the text run.
+    """
+    if children and children[-1].__class__ is text_run_node_cls:
+        children[-1].text_pieces.append(piece)
+    else:
+        children.append(parent.new_child(None, text_run_node_cls, append=False, text_pieces=[piece]))
+
+
+def group_paragraphs(tree_node, paragraph_node_cls, text_node_cls, newline_node_cls, node_kinds,
+                     text_run_node_cls=TextRunTreeNode):
+    """
+    Group all inline nodes of the given tree node and children into paragraphs (iterative, without recursion).
+    See ``make_paragraphs`` for the parameters.
+    :param node_kinds: The dictionary of already known node kinds ``{class: kind}`` (filled on the fly).
+    """
+
+    # Process all children first, bottom-up (leaf nodes have nothing to group)
+    for cur_node in iter_tree_postorder(tree_node):
+        if cur_node.children:
+            group_node_paragraphs(cur_node, paragraph_node_cls, text_node_cls, newline_node_cls, node_kinds,
+                                  text_run_node_cls)
+
+
+def group_node_paragraphs(tree_node, paragraph_node_cls, text_node_cls, newline_node_cls, node_kinds,
+                          text_run_node_cls=TextRunTreeNode):
+    """
+    Group the inline children nodes of the given tree node into paragraphs (children nodes are not processed).
+    See ``group_paragraphs`` for the parameters.
+    """
 
     # Process only block node with make_paragraphs_here option set
     if tree_node.inline or not tree_node.make_paragraphs_here:
@@ -61,12 +133,49 @@ def make_paragraphs(tree_node,
     prev_was_newline = False
     for child_node in tree_node.children:
 
+        # Get the node kind
+        node_cls = child_node.__class__
+        node_kind = node_kinds.get(node_cls)
+        if node_kind is None:
+            node_kind = node_kinds[node_cls] = get_node_kind(node_cls, text_node_cls, newline_node_cls,
+                                                             text_run_node_cls)
+
+        # Split text runs into pieces, handled like the equivalent text and newline nodes
+        if node_kind == NODE_KIND_TEXT_RUN:
+            newline_piece = child_node.newline_piece
+            for piece in child_node.text_pieces:
+
+                # Handle newlines
+                if piece == newline_piece:
+
+                    # If two consecutive newline are found, close the current paragraph (if any)
+                    if prev_was_newline:
+                        if cur_paragraph is not None:
+                            new_children.append(cur_paragraph)
+                            cur_paragraph = None
+
+                    # Keep the first newline
+                    else:
+                        prev_was_newline = True
+                        if cur_paragraph is not None:
+                            append_text_run_piece_to(cur_paragraph.children, cur_paragraph, piece, node_cls)
+                        else:
+                            append_text_run_piece_to(new_children, tree_node, piece, node_cls)
+
+                # Group text, ignoring blank lines
+                elif piece.strip():
+                    prev_was_newline = False
+                    if cur_paragraph is None:
+                        cur_paragraph = tree_node.new_child(None, paragraph_node_cls, append=False)
+                    append_text_run_piece_to(cur_paragraph.children, cur_paragraph, piece, node_cls)
+            continue
+
         # Ignore blank lines
-        if isinstance(child_node, text_node_cls) and not child_node.content.strip() and not child_node.error_message:
+        if node_kind == NODE_KIND_TEXT and not child_node.content.strip() and not child_node.error_message:
             continue
 
         # Handle newlines
-        if isinstance(child_node, newline_node_cls):
+        if node_kind == NODE_KIND_NEWLINE:
 
             # If two consecutive newline are found
             if prev_was_newline:
@@ -144,7 +144,7 @@ def make_auto_title_ids(document_tree,
             title_id = slugify(tree_node.get_raw_content())
 
             # Save the ID
-            tree_node.attrs[tree_node.slug_id_attr_name] = title_id
+            tree_node.set_attribute_value(tree_node.slug_id_attr_name, title_id)
 
 
 def _recursive_render_titles_html(title_groups, output, li_class_name, a_class_name, ul_class_name):
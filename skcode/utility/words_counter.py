@@ -2,19 +2,24 @@
 SkCode words counter utility code.
 """
 
-from ..tags.internal import TextTreeNode
+from ..tags.internal import TextTreeNode, TextRunTreeNode
 
 
 def count_words(document_tree,
-                text_node_cls=TextTreeNode):
+                text_node_cls=TextTreeNode,
+                text_run_node_cls=TextRunTreeNode):
     """
     Count all words present in the given document tree.
     :param document_tree: The document tree to be analyzed.
     :param text_node_cls: The tree node class used for text.
+    :param text_run_node_cls: The tree node class used for text runs.
     :return: The number of words in the document.
     """
     assert document_tree, "Document tree is mandatory."
     words_count = 0
     for tree_node in document_tree.search_in_tree(text_node_cls):
         words_count += len(tree_node.content.split())
+    for tree_node in document_tree.search_in_tree(text_run_node_cls):
+        for piece in tree_node.text_pieces:
+            words_count += len(piece.split())
     return words_count
@@ -0,0 +1,178 @@
+"""
+SkCode dialect test code.
+"""
+
+import os
+import pickle
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import skcode
+from skcode import parse_skcode, render_to_html, render_to_text, SkCodeDialect
+from skcode import dialect as dialect_module
+from skcode.dialect import build_overloaded_tag_classes
+from skcode.etree import TreeNode, RootTreeNode
+from skcode.tags import BoldTextTreeNode
+
+
+class DummyTreeNode(TreeNode):
+    """ Dummy tag options for tests """
+
+    canonical_tag_name = 'test'
+    alias_tag_names = ('alias', )
+
+    foo = 'bar'
+
+    def render_html(self, inner_html, **kwargs):
+        return '<{foo}>{inner_html}</{foo}>'.format(foo=self.foo, inner_html=inner_html)
+
+    def render_text(self, inner_text, **kwargs):
+        return '{foo}:{inner_text}'.format(foo=self.foo, inner_text=inner_text)
+
+
+class DialectTestCase(unittest.TestCase):
+    """ Tests suite for the dialect module. """
+
+    def test_build_overloaded_tag_classes(self):
+        """ Test the ``build_overloaded_tag_classes`` function """
+        other_tag_cls = type('OtherTreeNode', (TreeNode, ), {'canonical_tag_name': 'other'})
+        tag_classes = build_overloaded_tag_classes((DummyTreeNode, other_tag_cls), {DummyTreeNode: {'foo': 'baz'}})
+        self.assertEqual(2, len(tag_classes))
+        self.assertTrue(issubclass(tag_classes[0], DummyTreeNode))
+        self.assertIsNot(DummyTreeNode, tag_classes[0])
+        self.assertEqual('DummyTreeNode', tag_classes[0].__name__)
+        self.assertTrue(tag_classes[0].__qualname__.startswith('DummyTreeNode_test_'))
+        self.assertIs(tag_classes[0], getattr(dialect_module, tag_classes[0].__qualname__))
+        self.assertEqual('baz', tag_classes[0].foo)
+        self.assertEqual('bar', DummyTreeNode.foo)
+        self.assertIs(other_tag_cls, tag_classes[1])
+
+    def test_build_overloaded_tag_classes_registered(self):
+        """ Test if the same options overload always give the same derived class """
+        tag_classes = build_overloaded_tag_classes((DummyTreeNode, ), {DummyTreeNode: {'foo': 'baz', 'x': 1}})
+        self.assertEqual(tag_classes, build_overloaded_tag_classes((DummyTreeNode, ),
+                                                                   {DummyTreeNode: {'x': 1, 'foo': 'baz'}}))
+        self.assertNotEqual(tag_classes, build_overloaded_tag_classes((DummyTreeNode, ),
+                                                                      {DummyTreeNode: {'foo': 'qux', 'x': 1}}))
+
+    def test_build_overloaded_tag_classes_no_overload(self):
+        """ Test the ``build_overloaded_tag_classes`` function without overload """
+        self.assertEqual([DummyTreeNode], build_overloaded_tag_classes((DummyTreeNode, ), None))
+        self.assertEqual([DummyTreeNode], build_overloaded_tag_classes((DummyTreeNode, ), {DummyTreeNode: {}}))
+
+    def test_recognized_tags(self):
+        """ Test the recognized tags dictionary of the dialect """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ))
+        self.assertEqual({'test': DummyTreeNode, 'alias': DummyTreeNode}, dict(dialect.recognized_tags))
+        with self.assertRaises(TypeError):
+            dialect.recognized_tags['foo'] = DummyTreeNode
+        self.assertEqual({'test', 'alias'}, set(dialect.dispatch_table))
+        self.assertIs(dialect.dispatch_table['test'], dialect.dispatch_table['alias'])
+
+    def test_recognized_tags_checked_once(self):
+        """ Test if the recognized tags list is checked at creation """
+        with self.assertRaises(KeyError):
+            SkCodeDialect(recognized_tags=(DummyTreeNode, DummyTreeNode))
+
+    def test_parse(self):
+        """ Test if the dialect parse like ``parse_skcode`` """
+        text = '[test]Hello [alias=value]world[/alias][/test]\n[unknown] [test]'
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ), mark_unclosed_tags_as_erroneous=True)
+        document_tree = dialect.parse(text)
+        self.assertIsInstance(document_tree, RootTreeNode)
+        expected = parse_skcode(text, recognized_tags=(DummyTreeNode, ), mark_unclosed_tags_as_erroneous=True)
+        self.assertEqual(render_to_html(expected), render_to_html(document_tree))
+        self.assertEqual(render_to_text(expected), render_to_text(document_tree))
+        self.assertEqual('Unclosed tag', document_tree.children[-1].error_message)
+
+    def test_parse_cls_options_overload(self):
+        """ Test if the dialect handle class options overload """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ),
+                                cls_options_overload={DummyTreeNode: {'foo': 'baz'}})
+        document_tree = dialect.parse('[test]Hello[/test]')
+        child_node = document_tree.children[0]
+        self.assertIsInstance(child_node, DummyTreeNode)
+        self.assertEqual('baz', child_node.foo)
+        self.assertNotIn('foo', child_node.__dict__)
+        self.assertEqual('bar', DummyTreeNode.foo)
+
+    def test_structural_hashes_cls_options_overload(self):
+        """ Test if differently configured dialects give different structural hashes """
+        hashes = []
+        for wrapping_format in ('<strong>{}</strong>', '<b>{}</b>', '<b>{}</b>'):
+            dialect = SkCodeDialect(cls_options_overload={BoldTextTreeNode: {'wrapping_format': wrapping_format}})
+            hashes.append(dialect.parse('[b]foo[/b]', structural_hashes=True).structural_hash)
+        self.assertNotEqual(hashes[0], hashes[1])
+        self.assertEqual(hashes[1], hashes[2])
+        self.assertNotEqual(parse_skcode('[b]foo[/b]', structural_hashes=True).structural_hash, hashes[1])
+        document_tree = parse_skcode('[b]foo[/b]', structural_hashes=True,
+                                     cls_options_overload={BoldTextTreeNode: {'wrapping_format': '<b>{}</b>'}})
+        self.assertNotEqual(parse_skcode('[b]foo[/b]', structural_hashes=True).structural_hash,
+                            document_tree.structural_hash)
+
+    def test_render(self):
+        """ Test the ``render`` method """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ),
+                                cls_options_overload={DummyTreeNode: {'foo': 'baz'}})
+        document_tree = dialect.parse('[test]Hello[/test]')
+        self.assertEqual('<baz>Hello</baz>', dialect.render(document_tree))
+        self.assertEqual('baz:Hello', dialect.render(document_tree, as_text=True))
+        self.assertEqual('<baz>Hello</baz>', dialect.render('[test]Hello[/test]'))
+
+    def test_render_error_template(self):
+        """ Test the ``render`` method with a custom error template """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ), html_error_template='<!-- {error_message} -->')
+        self.assertEqual('<!-- Unknown tag name -->', dialect.render('[foo]'))
+
+    def test_thread_safety(self):
+        """ Test if the same dialect can be used from several threads """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ),
+                                cls_options_overload={DummyTreeNode: {'foo': 'baz'}})
+        texts = ['[test]Hello {}[/test]\n[alias]world[/alias]'.format(i) for i in range(200)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(dialect.render, texts))
+        self.assertEqual(['<baz>Hello {}</baz>\n<baz>world</baz>'.format(i) for i in range(200)], results)
+
+    def test_pickle(self):
+        """ Test if the dialect can be pickled """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ), max_nesting_depth=4,
+                                cls_options_overload={DummyTreeNode: {'foo': 'baz'}})
+        new_dialect = pickle.loads(pickle.dumps(dialect))
+        self.assertEqual(dialect.creation_kwargs, new_dialect.creation_kwargs)
+        self.assertEqual(4, new_dialect.max_nesting_depth)
+        self.assertEqual('<baz>Hello</baz>', new_dialect.render('[test]Hello[/test]'))
+
+    def test_pickle_overloaded_tags(self):
+        """ Test if documents of dialects with overloaded tag classes can be pickled """
+        dialect = SkCodeDialect(recognized_tags=(DummyTreeNode, ),
+                                cls_options_overload={DummyTreeNode: {'foo': 'baz'}})
+        document_tree = dialect.parse('[test]Hello[/test]')
+        new_dialect, new_document_tree = pickle.loads(pickle.dumps((dialect, document_tree)))
+        self.assertIs(document_tree.children[0].__class__, new_document_tree.children[0].__class__)
+        self.assertEqual('<baz>Hello</baz>', new_dialect.render(new_document_tree))
+        self.assertEqual(dialect.recognized_tags, new_dialect.recognized_tags)
+
+    def test_pickle_overloaded_tags_fresh_process(self):
+        """ Test if documents of dialects with overloaded tag classes can be unpickled in a fresh process """
+        dialect = SkCodeDialect(cls_options_overload={BoldTextTreeNode: {'wrapping_format': '<b>{}</b>'}})
+        document_tree = dialect.parse('[b]Hello[/b] [i]world[/i]')
+        output = subprocess.run([sys.executable, '-c',
+                                 'import pickle, sys\n'
+                                 'from skcode import render_to_html\n'
+                                 'document_tree = pickle.loads(sys.stdin.buffer.read())\n'
+                                 'sys.stdout.write(render_to_html(document_tree))\n'
+                                 'sys.stdout.write(" " + type(document_tree.children[0]).__qualname__)'],
+                                input=pickle.dumps(document_tree), stdout=subprocess.PIPE, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(skcode.__file__)))).stdout
+        self.assertEqual('<b>Hello</b> <em>world</em> {}'.format(type(document_tree.children[0]).__qualname__),
+                         output.decode('utf-8'))
+
+    def test_pickle_generated_tags(self):
+        """ Test if dialects and documents with generated tag classes can be pickled """
+        dialect = SkCodeDialect()
+        document_tree = dialect.parse('[h2]Title[/h2] [python]pass[/python] [warning]Hey[/warning] [red]Red[/red]')
+        new_dialect, new_document_tree = pickle.loads(pickle.dumps((dialect, document_tree)))
+        self.assertEqual(render_to_html(document_tree), render_to_html(new_document_tree))
+        self.assertEqual(dialect.recognized_tags, new_dialect.recognized_tags)
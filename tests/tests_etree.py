@@ -2,15 +2,57 @@
 SkCode elements tree test code.
 """
 
+import copy
+import gc
+from hashlib import blake2b
+import pickle
 import unittest
+import weakref
 
 from skcode.etree import (
+    EMPTY_ATTRS,
     TreeNode,
     RootTreeNode,
-    debug_print_ast
+    compute_structural_hashes,
+    debug_print_ast,
+    get_node_flags,
+    iter_tree_preorder,
+    iter_tree_postorder,
+    iter_tree_events,
+    get_stable_cls_key,
+    register_generated_node_cls,
+    WALK_ENTER,
+    WALK_EXIT,
+    NODE_FLAG_NEWLINE_CLOSES,
+    NODE_FLAG_SAME_TAG_CLOSES,
+    NODE_FLAG_WEAK_PARENT_CLOSE,
+    NODE_FLAG_STANDALONE,
+    NODE_FLAG_PARSE_EMBEDDED,
+    NODE_FLAG_INLINE,
+    NODE_FLAG_CLOSE_INLINES,
+    NODE_FLAG_MAKE_PARAGRAPHS_HERE
 )
 
 
+def get_stored_attributes(tree_node):
+    """
+    Get the names of all attributes stored in the given tree node (slots and instance dictionary).
+    :param tree_node: The tree node instance.
+    :return: The set of stored attribute names.
+    """
+    stored_attributes = set(vars(tree_node))
+    for cls in type(tree_node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name.startswith('__'):
+                continue
+            try:
+                object.__getattribute__(tree_node, name)
+            except AttributeError:
+                continue
+            stored_attributes.add(name)
+    return stored_attributes
+
+
 class DummyTreeNode(TreeNode):
     """ Dummy tag options class for tests. """
 
@@ -25,6 +67,14 @@ class OtherDummyTreeNode(TreeNode):
     alias_tag_names = ()
 
 
+class SharedEmptyAttrsDummyTreeNode(TreeNode):
+    """ Dummy tag options class for tests (nodes without attributes share the empty attributes dictionary). """
+
+    canonical_tag_name = 'test'
+    alias_tag_names = ()
+    shared_empty_attrs = True
+
+
 class TreeNodeTestCase(unittest.TestCase):
     """ Tests suite for the ``TreeNode`` class. """
 
@@ -62,6 +112,27 @@ class TreeNodeTestCase(unittest.TestCase):
             TreeNode(root_tree_node, None, 'test')
         self.assertEqual('The parent node instance is mandatory for non-root nodes.', str(e.exception))
 
+    def test_get_node_flags(self):
+        """ Test the ``get_node_flags`` function """
+        self.assertEqual(NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_CLOSE_INLINES, get_node_flags(DummyTreeNode))
+        self.assertEqual(NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_CLOSE_INLINES | NODE_FLAG_MAKE_PARAGRAPHS_HERE,
+                         get_node_flags(RootTreeNode()))
+        options = {
+            'newline_closes': True,
+            'same_tag_closes': True,
+            'weak_parent_close': True,
+            'standalone': True,
+            'parse_embedded': False,
+            'inline': True,
+        }
+        self.assertEqual(NODE_FLAG_NEWLINE_CLOSES | NODE_FLAG_SAME_TAG_CLOSES | NODE_FLAG_WEAK_PARENT_CLOSE |
+                         NODE_FLAG_STANDALONE | NODE_FLAG_INLINE | NODE_FLAG_CLOSE_INLINES,
+                         get_node_flags(DummyTreeNode, options))
+        root_tree_node = RootTreeNode()
+        tree_node = DummyTreeNode(root_tree_node, root_tree_node, 'test', inline=True)
+        self.assertEqual(NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_INLINE | NODE_FLAG_CLOSE_INLINES,
+                         get_node_flags(tree_node))
+
     def test_node_creation(self):
         """ Test if the tree node constructor work as expected. """
         root_tree_node = RootTreeNode()
@@ -144,6 +215,94 @@ class TreeNodeTestCase(unittest.TestCase):
         self.assertEqual(parent_tree_node.children, [])
         self.assertEqual('', tree_node.error_message)
 
+    def test_lazy_source_strings(self):
+        """ Test if source strings are materialized from the source spans on first access. """
+        root_tree_node = RootTreeNode(source_text='[test]content[/test]')
+        tree_node = root_tree_node.new_child('test', DummyTreeNode,
+                                             content='ignored',
+                                             content_span=(6, 13),
+                                             source_open_tag_span=(0, 6),
+                                             source_close_tag_span=(13, 20))
+        self.assertNotIn('content', get_stored_attributes(tree_node))
+        self.assertEqual('content', tree_node.content)
+        self.assertEqual('[test]', tree_node.source_open_tag)
+        self.assertEqual('[/test]', tree_node.source_close_tag)
+        self.assertIn('content', get_stored_attributes(tree_node))
+
+    def test_slots(self):
+        """ Test if the node data is stored in slots, without per-instance dictionary entries. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, attrs={'foo': 'bar'}, content='content')
+        self.assertEqual({}, vars(tree_node))
+        self.assertEqual({}, vars(root_tree_node))
+        self.assertEqual('', tree_node.error_message)
+        tree_node.error_message = 'Error'
+        self.assertEqual({'error_message': 'Error'}, vars(tree_node))
+
+    def test_overload_options(self):
+        """ Test if class options overloads are stored per instance. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, inline=True)
+        other_tree_node = root_tree_node.new_child('test', DummyTreeNode)
+        self.assertTrue(tree_node.inline)
+        self.assertFalse(other_tree_node.inline)
+        self.assertFalse(DummyTreeNode.inline)
+        self.assertEqual({'inline': True}, vars(tree_node))
+        other_tree_node.overload_options({'inline': True, 'foo': 'bar'})
+        self.assertTrue(other_tree_node.inline)
+        self.assertEqual('bar', other_tree_node.foo)
+
+    def test_source_spans(self):
+        """ Test the source spans accessors. """
+        root_tree_node = RootTreeNode(source_text='[test]content[/test]')
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, source_open_tag_span=(0, 6))
+        self.assertEqual((None, (0, 6), None), tree_node.source_spans)
+        self.assertIsNone(tree_node.content_span)
+        self.assertEqual((0, 6), tree_node.source_open_tag_span)
+        tree_node.source_close_tag_span = (13, 20)
+        self.assertEqual((None, (0, 6), (13, 20)), tree_node.source_spans)
+        self.assertEqual('[/test]', tree_node.source_close_tag)
+        other_tree_node = root_tree_node.new_child('test', DummyTreeNode)
+        self.assertIsNone(other_tree_node.source_spans)
+        self.assertIsNone(other_tree_node.content_span)
+
+    def test_lazy_source_strings_without_span(self):
+        """ Test if source strings without source span default to an empty string. """
+        root_tree_node = RootTreeNode(source_text='[test]')
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, source_open_tag_span=(0, 6))
+        self.assertEqual('', tree_node.content)
+        self.assertEqual('[test]', tree_node.source_open_tag)
+        self.assertEqual('', tree_node.source_close_tag)
+        with self.assertRaises(AttributeError):
+            getattr(tree_node, 'unknown_attribute')
+
+    def test_lazy_source_strings_materialized_on_rebase(self):
+        """ Test if source strings are materialized when a node is moved to another document. """
+        root_tree_node = RootTreeNode(source_text='content')
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, content_span=(0, 7))
+        root_tree_node_2 = RootTreeNode(children=[tree_node], source_text='other text')
+        self.assertEqual(root_tree_node_2, tree_node.root_tree_node)
+        self.assertEqual('content', tree_node.content)
+
+    def test_lazy_attrs(self):
+        """ Test if the attributes dictionary is built from the opening tag source on first access. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', DummyTreeNode,
+                                             attrs={'ignored': ''},
+                                             source_open_tag='[TEST="value" Key=\'a\\\'b\']',
+                                             attrs_offset=5)
+        self.assertNotIn('attrs', get_stored_attributes(tree_node))
+        self.assertEqual({'test': 'value', 'key': "a'b"}, tree_node.attrs)
+        self.assertIn('attrs', get_stored_attributes(tree_node))
+
+    def test_lazy_attrs_custom_tag_chars(self):
+        """ Test if lazy attributes use the tag chars of the root tree node. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.opening_tag_ch = '<'
+        root_tree_node.closing_tag_ch = '>'
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, source_open_tag='<test key=[v]>', attrs_offset=6)
+        self.assertEqual({'key': '[v]'}, tree_node.attrs)
+
     def test_get_raw_content_method(self):
         """ Test if the ``get_raw_content`` method work as expected. """
         # RootTreeNode
@@ -174,6 +333,31 @@ class TreeNodeTestCase(unittest.TestCase):
         raw_content = l1_tree_node.get_raw_content(recursive=False)
         self.assertEqual('Level 1-1', raw_content)
 
+    def test_get_raw_content_method_deep_nesting(self):
+        """ Test if the ``get_raw_content`` method work with deeply nested nodes. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node
+        for _ in range(5000):
+            tree_node = tree_node.new_child('test', DummyTreeNode, content='x')
+        self.assertEqual('x' * 5000, root_tree_node.get_raw_content())
+        self.assertEqual('x' * 5000, root_tree_node.children[0].get_raw_content())
+
+    def test_get_raw_content_method_override(self):
+        """ Test if the ``get_raw_content`` method use the overridden method of children nodes. """
+
+        class CustomTreeNode(DummyTreeNode):
+            """ Tree node with a custom raw content. """
+
+            def get_raw_content(self, recursive=True):
+                return '<custom>'
+
+        root_tree_node = RootTreeNode()
+        l1_tree_node = root_tree_node.new_child('level 1 child 1', DummyTreeNode, content='Level 1-1')
+        l2_tree_node = l1_tree_node.new_child('level 2 child', CustomTreeNode, content='Level 2')
+        l2_tree_node.new_child('level 3 child', DummyTreeNode, content='Level 3')
+        root_tree_node.new_child('level 1 child 2', DummyTreeNode, content='Level 1-2')
+        self.assertEqual('Level 1-1<custom>Level 1-2', root_tree_node.get_raw_content())
+
     def test_get_attribute_value(self):
         """ Test the ``get_attribute_value`` helper method """
         document_tree = RootTreeNode()
@@ -206,6 +390,58 @@ class TreeNodeTestCase(unittest.TestCase):
         tree_node = document_tree.new_child('node', DummyTreeNode, attrs={})
         self.assertEqual('xyz', tree_node.get_attribute_value('at1', 'at2', 'at3', default='xyz'))
 
+    def test_empty_attrs_shared(self):
+        """ Test if the internal nodes without attributes share the same empty attributes dictionary. """
+        document_tree = RootTreeNode()
+        tree_node = document_tree.new_child('node', SharedEmptyAttrsDummyTreeNode, attrs={})
+        other_tree_node = document_tree.new_child('node', SharedEmptyAttrsDummyTreeNode)
+        self.assertIs(EMPTY_ATTRS, tree_node.attrs)
+        self.assertIs(EMPTY_ATTRS, other_tree_node.attrs)
+        self.assertEqual({}, tree_node.attrs)
+        self.assertIsNot(EMPTY_ATTRS, document_tree.attrs)
+
+    def test_empty_attrs_writable(self):
+        """ Test if the attributes dictionary of a tag node without attributes is built on first access. """
+        document_tree = RootTreeNode()
+        tree_node = document_tree.new_child('node', DummyTreeNode, attrs={})
+        other_tree_node = document_tree.new_child('node', DummyTreeNode)
+        self.assertNotIn('attrs', get_stored_attributes(tree_node))
+        tree_node.attrs['foo'] = 'bar'
+        self.assertEqual({'foo': 'bar'}, tree_node.attrs)
+        self.assertEqual({}, other_tree_node.attrs)
+        self.assertIsNot(EMPTY_ATTRS, other_tree_node.attrs)
+        self.assertEqual({}, EMPTY_ATTRS)
+
+    def test_empty_attrs_immutable(self):
+        """ Test if the shared empty attributes dictionary cannot be modified. """
+        with self.assertRaises(TypeError):
+            EMPTY_ATTRS['foo'] = 'bar'
+        with self.assertRaises(TypeError):
+            EMPTY_ATTRS.update(foo='bar')
+        with self.assertRaises(TypeError):
+            EMPTY_ATTRS.setdefault('foo', 'bar')
+        self.assertEqual({}, EMPTY_ATTRS)
+
+    def test_empty_attrs_pickle_and_copy(self):
+        """ Test if the shared empty attributes dictionary is preserved by pickling and copy. """
+        self.assertIs(EMPTY_ATTRS, pickle.loads(pickle.dumps(EMPTY_ATTRS)))
+        self.assertIs(EMPTY_ATTRS, copy.copy(EMPTY_ATTRS))
+        self.assertIs(EMPTY_ATTRS, copy.deepcopy(EMPTY_ATTRS))
+
+    def test_set_attribute_value(self):
+        """ Test the ``set_attribute_value`` helper method """
+        document_tree = RootTreeNode()
+        tree_node = document_tree.new_child('node', SharedEmptyAttrsDummyTreeNode)
+        other_tree_node = document_tree.new_child('node', SharedEmptyAttrsDummyTreeNode)
+        tree_node.set_attribute_value('foo', 'bar')
+        self.assertEqual({'foo': 'bar'}, tree_node.attrs)
+        self.assertIs(EMPTY_ATTRS, other_tree_node.attrs)
+        self.assertEqual({}, EMPTY_ATTRS)
+        attrs = tree_node.attrs
+        tree_node.set_attribute_value('baz', 'qux')
+        self.assertIs(attrs, tree_node.attrs)
+        self.assertEqual({'foo': 'bar', 'baz': 'qux'}, tree_node.attrs)
+
     def test_has_attribute_switch_set_with_attr(self):
         """ Test the ``has_attribute_switch_set`` method. """
         document_tree = RootTreeNode()
@@ -441,6 +677,409 @@ class RootTreeNodeTestCase(unittest.TestCase):
         root_tree_node = RootTreeNode()
         self.assertEqual('inner text', root_tree_node.render_text('inner text'))
 
+    def test_cycle_free(self):
+        """ Test if the nodes of a cycle-free document keep weak references to their parent and root nodes. """
+        root_tree_node = RootTreeNode(cycle_free=True)
+        self.assertTrue(root_tree_node.cycle_free)
+        self.assertIs(root_tree_node, root_tree_node.root_tree_node)
+        l1_tree_node = root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+        tree_node = l1_tree_node.new_child('node', DummyTreeNode)
+        self.assertIs(root_tree_node, tree_node.root_tree_node)
+        self.assertIs(l1_tree_node, tree_node.parent)
+        self.assertIsInstance(tree_node._parent, weakref.ref)
+        self.assertIsInstance(tree_node._root_tree_node, weakref.ref)
+        tree_node.parent = root_tree_node
+        self.assertIsInstance(tree_node._parent, weakref.ref)
+        self.assertIs(root_tree_node, tree_node.parent)
+
+    def test_cycle_free_released(self):
+        """ Test if a cycle-free document is freed by reference counting. """
+        gc.collect()
+        gc.disable()
+        try:
+            root_tree_node = RootTreeNode(cycle_free=True)
+            l1_tree_node = root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+            tree_node = l1_tree_node.new_child('node', DummyTreeNode)
+            root_tree_node_ref = weakref.ref(root_tree_node)
+            l1_tree_node_ref = weakref.ref(l1_tree_node)
+            del root_tree_node, l1_tree_node
+            self.assertIsNone(root_tree_node_ref())
+            self.assertIsNone(l1_tree_node_ref())
+            self.assertIsNone(tree_node.root_tree_node)
+            self.assertIsNone(tree_node.parent)
+        finally:
+            gc.enable()
+
+    def test_default_not_cycle_free(self):
+        """ Test if the nodes of a default document keep strong references to their parent and root nodes. """
+        root_tree_node = RootTreeNode()
+        self.assertFalse(root_tree_node.cycle_free)
+        tree_node = root_tree_node.new_child('node', DummyTreeNode)
+        self.assertIs(root_tree_node, tree_node._root_tree_node)
+        self.assertIs(root_tree_node, tree_node._parent)
+
+    def test_dispose(self):
+        """ Test if the ``dispose`` method break the reference cycles of the document. """
+        gc.collect()
+        gc.disable()
+        try:
+            root_tree_node = RootTreeNode()
+            l1_tree_node = root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+            tree_node = l1_tree_node.new_child('node', DummyTreeNode)
+            root_tree_node_ref = weakref.ref(root_tree_node)
+            root_tree_node.dispose()
+            self.assertEqual([], root_tree_node.children)
+            self.assertEqual([tree_node], l1_tree_node.children)
+            self.assertIsNone(l1_tree_node.parent)
+            self.assertIsNone(tree_node.root_tree_node)
+            del root_tree_node
+            self.assertIsNone(root_tree_node_ref())
+        finally:
+            gc.enable()
+
+    def test_nodes_index(self):
+        """ Test if the nodes index is filled by the ``new_child`` method. """
+        root_tree_node = RootTreeNode()
+        node1 = root_tree_node.new_child('node', DummyTreeNode)
+        l1_tree_node = root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+        node2 = l1_tree_node.new_child('node', DummyTreeNode)
+        node3 = root_tree_node.new_child('node', DummyTreeNode)
+        self.assertEqual([node1, l1_tree_node, node2, node3], root_tree_node.indexed_nodes)
+        self.assertEqual([0, 2, 3], list(root_tree_node.indexed_positions[DummyTreeNode]))
+        self.assertEqual([1], list(root_tree_node.indexed_positions[OtherDummyTreeNode]))
+        self.assertEqual([node1, node2, node3], list(root_tree_node.search_in_tree(DummyTreeNode, use_index=True)))
+        self.assertEqual([node1, l1_tree_node, node2, node3],
+                         list(root_tree_node.search_in_tree((DummyTreeNode, OtherDummyTreeNode), use_index=True)))
+        self.assertEqual([root_tree_node, node1, l1_tree_node, node2, node3],
+                         list(root_tree_node.search_in_tree(TreeNode, use_index=True)))
+
+    def test_nodes_index_not_in_document_order(self):
+        """ Test if the nodes index is invalidated when a node is not created in document order. """
+        root_tree_node = RootTreeNode()
+        l1_tree_node = root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+        node1 = root_tree_node.new_child('node', DummyTreeNode)
+        node2 = l1_tree_node.new_child('node', DummyTreeNode)
+        self.assertIsNone(root_tree_node.indexed_nodes)
+        self.assertEqual([node2, node1], list(root_tree_node.search_in_tree(DummyTreeNode, use_index=True)))
+        self.assertEqual([l1_tree_node, node2, node1], root_tree_node.indexed_nodes)
+
+    def test_nodes_index_detached_parent(self):
+        """ Test if the nodes index is invalidated when a node is created in a detached node. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('node', DummyTreeNode)
+        parent_tree_node = TreeNode(root_tree_node, root_tree_node, 'parent')
+        parent_tree_node.new_child('node', DummyTreeNode)
+        self.assertIsNone(root_tree_node.indexed_nodes)
+        self.assertEqual(1, len(list(root_tree_node.search_in_tree(DummyTreeNode, use_index=True))))
+
+    def test_nodes_index_not_appended(self):
+        """ Test if the nodes created without being appended are not indexed. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('node', DummyTreeNode, append=False)
+        self.assertEqual([], root_tree_node.indexed_nodes)
+
+    def test_nodes_index_with_children(self):
+        """ Test if the nodes index is built on first lookup when some children are given. """
+        root_tree_node = RootTreeNode()
+        tree_node = DummyTreeNode(root_tree_node, root_tree_node, 'node')
+        other_root_tree_node = RootTreeNode(children=[tree_node])
+        self.assertIsNone(other_root_tree_node.indexed_nodes)
+        self.assertEqual([tree_node], list(other_root_tree_node.search_in_tree(DummyTreeNode, use_index=True)))
+
+    def test_invalidate_nodes_index(self):
+        """ Test the ``invalidate_nodes_index`` and ``rebuild_nodes_index`` methods. """
+        root_tree_node = RootTreeNode()
+        node1 = root_tree_node.new_child('node', DummyTreeNode)
+        node2 = root_tree_node.new_child('node', DummyTreeNode)
+        root_tree_node.children.remove(node1)
+        root_tree_node.invalidate_nodes_index()
+        self.assertIsNone(root_tree_node.indexed_nodes)
+        self.assertIsNone(root_tree_node.indexed_positions)
+        root_tree_node.rebuild_nodes_index()
+        self.assertEqual([node2], root_tree_node.indexed_nodes)
+        self.assertEqual([node2], list(root_tree_node.search_in_tree(DummyTreeNode, use_index=True)))
+
+    def test_search_in_tree_children_modified(self):
+        """ Test if ``search_in_tree`` sees the changes made directly to a children list. """
+        root_tree_node = RootTreeNode()
+        node1 = root_tree_node.new_child('node', DummyTreeNode)
+        l1_tree_node = root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+        self.assertIsNotNone(root_tree_node.indexed_nodes)
+        node2 = DummyTreeNode(root_tree_node, l1_tree_node, 'node')
+        l1_tree_node.children.append(node2)
+        node3 = DummyTreeNode(root_tree_node, root_tree_node, 'node')
+        root_tree_node.children.insert(0, node3)
+        self.assertEqual([node3, node1, node2], list(root_tree_node.search_in_tree(DummyTreeNode)))
+        root_tree_node.children[1:] = []
+        self.assertEqual([node3], list(root_tree_node.search_in_tree(DummyTreeNode)))
+        self.assertEqual([], list(root_tree_node.search_in_tree(OtherDummyTreeNode)))
+        root_tree_node.rebuild_nodes_index()
+        self.assertEqual([node3], list(root_tree_node.search_in_tree(DummyTreeNode, use_index=True)))
+
+    def test_search_in_tree_frozen(self):
+        """ Test if ``search_in_tree`` use the nodes index of frozen documents. """
+        root_tree_node = RootTreeNode()
+        node1 = root_tree_node.new_child('node', DummyTreeNode)
+        root_tree_node.new_child('test_l1', OtherDummyTreeNode)
+        root_tree_node.invalidate_nodes_index()
+        root_tree_node.freeze()
+        self.assertEqual([node1], root_tree_node.indexed_nodes[:1])
+        self.assertEqual([node1], list(root_tree_node.search_in_tree(DummyTreeNode)))
+
+
+class TreeWalkersTestCase(unittest.TestCase):
+    """ Tests suite for the tree walkers. """
+
+    def setUp(self):
+        # RootTreeNode
+        #  - a
+        #    - b
+        #    - c
+        #      - d
+        #  - e
+        self.root_tree_node = RootTreeNode()
+        self.a = self.root_tree_node.new_child('a', DummyTreeNode)
+        self.b = self.a.new_child('b', DummyTreeNode)
+        self.c = self.a.new_child('c', OtherDummyTreeNode)
+        self.d = self.c.new_child('d', DummyTreeNode)
+        self.e = self.root_tree_node.new_child('e', DummyTreeNode)
+
+    def get_deeply_nested_tree(self, depth=5000):
+        """ Build a document tree deeper than the Python recursion limit. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node
+        for _ in range(depth):
+            tree_node = tree_node.new_child('node', DummyTreeNode, content='x')
+        return root_tree_node, tree_node
+
+    def test_iter_tree_preorder(self):
+        """ Test the ``iter_tree_preorder`` walker. """
+        self.assertEqual([self.root_tree_node, self.a, self.b, self.c, self.d, self.e],
+                         list(iter_tree_preorder(self.root_tree_node)))
+        self.assertEqual([self.c, self.d], list(iter_tree_preorder(self.c)))
+        self.assertEqual([self.b], list(iter_tree_preorder(self.b)))
+
+    def test_iter_tree_preorder_descend_fnct(self):
+        """ Test the ``iter_tree_preorder`` walker with a descend function. """
+        nodes = list(iter_tree_preorder(self.root_tree_node, lambda tree_node: tree_node is not self.c))
+        self.assertEqual([self.root_tree_node, self.a, self.b, self.c, self.e], nodes)
+        nodes = list(iter_tree_preorder(self.root_tree_node, lambda tree_node: False))
+        self.assertEqual([self.root_tree_node], nodes)
+
+    def test_iter_tree_preorder_children_altered(self):
+        """ Test if the ``iter_tree_preorder`` walker read the children list after yielding the node. """
+        walked_nodes = []
+        for tree_node in iter_tree_preorder(self.root_tree_node):
+            walked_nodes.append(tree_node)
+            if tree_node is self.a:
+                self.a.children = [self.c]
+        self.assertEqual([self.root_tree_node, self.a, self.c, self.d, self.e], walked_nodes)
+
+    def test_iter_tree_postorder(self):
+        """ Test the ``iter_tree_postorder`` walker. """
+        self.assertEqual([self.b, self.d, self.c, self.a, self.e, self.root_tree_node],
+                         list(iter_tree_postorder(self.root_tree_node)))
+        self.assertEqual([self.b], list(iter_tree_postorder(self.b)))
+
+    def test_iter_tree_events(self):
+        """ Test the ``iter_tree_events`` walker. """
+        self.assertEqual([(WALK_ENTER, self.root_tree_node),
+                          (WALK_ENTER, self.a),
+                          (WALK_ENTER, self.b),
+                          (WALK_EXIT, self.b),
+                          (WALK_ENTER, self.c),
+                          (WALK_ENTER, self.d),
+                          (WALK_EXIT, self.d),
+                          (WALK_EXIT, self.c),
+                          (WALK_EXIT, self.a),
+                          (WALK_ENTER, self.e),
+                          (WALK_EXIT, self.e),
+                          (WALK_EXIT, self.root_tree_node)], list(iter_tree_events(self.root_tree_node)))
+        self.assertEqual([(WALK_ENTER, self.b), (WALK_EXIT, self.b)], list(iter_tree_events(self.b)))
+
+    def test_walkers_deeply_nested_tree(self):
+        """ Test if the walkers work with trees deeper than the Python recursion limit. """
+        root_tree_node, last_tree_node = self.get_deeply_nested_tree()
+        nodes = list(iter_tree_preorder(root_tree_node))
+        self.assertEqual(5001, len(nodes))
+        self.assertIs(last_tree_node, nodes[-1])
+        nodes = list(iter_tree_postorder(root_tree_node))
+        self.assertEqual(5001, len(nodes))
+        self.assertIs(last_tree_node, nodes[0])
+        self.assertEqual(10002, len(list(iter_tree_events(root_tree_node))))
+
+    def test_helpers_deeply_nested_tree(self):
+        """ Test if the tree helpers work with trees deeper than the Python recursion limit. """
+        root_tree_node, last_tree_node = self.get_deeply_nested_tree()
+        self.assertEqual('x' * 5000, root_tree_node.get_raw_content())
+        self.assertFalse(root_tree_node.has_errors())
+        last_tree_node.error_message = 'foobar'
+        self.assertTrue(root_tree_node.has_errors())
+        self.assertEqual(5000, len(list(TreeNode.search_in_tree(root_tree_node, DummyTreeNode))))
+        new_root_tree_node = RootTreeNode()
+        root_tree_node.children[0].reset_root_tree_node(new_root_tree_node)
+        self.assertIs(new_root_tree_node, last_tree_node.root_tree_node)
+        output_returned = []
+        debug_print_ast(root_tree_node, print_fnct=lambda *args: output_returned.append(' '.join(args)))
+        self.assertEqual(5001, len(output_returned))
+        self.assertTrue(output_returned[-1].startswith('    ' * 5000 + 'DummyTreeNode('))
+
+
+class StructuralHashesTestCase(unittest.TestCase):
+    """ Tests suite for the structural hashes. """
+
+    def build_tree(self, content='Hello world!', attrs=None, node_cls=DummyTreeNode):
+        """ Build a small document tree for tests. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', node_cls, attrs=attrs)
+        tree_node.new_child('child', DummyTreeNode, content=content)
+        tree_node.new_child('child', OtherDummyTreeNode)
+        return root_tree_node
+
+    def test_get_structural_hash_data(self):
+        """ Test the ``get_structural_hash_data`` method. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, attrs={'b': '2', 'a': '1'}, content='foo')
+        self.assertEqual(('test', (('a', '1'), ('b', '2')), 'foo'), tree_node.get_structural_hash_data())
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, error_message='Error',
+                                             source_open_tag='[test]', source_close_tag='[/test]')
+        self.assertEqual(('test', (), '', 'Error', '[test]', '[/test]'), tree_node.get_structural_hash_data())
+        root_tree_node.attrs['foo'] = 'bar'
+        self.assertEqual((), root_tree_node.get_structural_hash_data())
+
+    def test_get_structural_hash_data_overloaded_options(self):
+        """ Test if the options overloaded for a node instance are covered by the structural hash data. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', DummyTreeNode, content='foo', inline=True, _cache=1)
+        tree_node.structural_hash = b'hash'
+        self.assertEqual(('test', (), 'foo', "(('inline', True),)"), tree_node.get_structural_hash_data())
+
+    def test_structural_hashes_overloaded_options(self):
+        """ Test if the same nodes with other overloaded options have different hashes. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('test', DummyTreeNode, content='foo')
+        root_tree_node.new_child('test', DummyTreeNode, content='foo', inline=True)
+        compute_structural_hashes(root_tree_node)
+        self.assertNotEqual(root_tree_node.children[0].structural_hash, root_tree_node.children[1].structural_hash)
+
+    def test_compute_structural_hashes(self):
+        """ Test the ``compute_structural_hashes`` helper. """
+        root_tree_node = self.build_tree()
+        self.assertIsNone(root_tree_node.structural_hash)
+        structural_hash = compute_structural_hashes(root_tree_node)
+        self.assertIsInstance(structural_hash, bytes)
+        self.assertEqual(16, len(structural_hash))
+        self.assertEqual(structural_hash, root_tree_node.structural_hash)
+        for tree_node in TreeNode.search_in_tree(root_tree_node, TreeNode):
+            self.assertIsNotNone(tree_node.structural_hash)
+        self.assertEqual(structural_hash, compute_structural_hashes(self.build_tree()))
+
+    def test_structural_hashes_differ(self):
+        """ Test if any change of a subtree changes the structural hash. """
+        reference = compute_structural_hashes(self.build_tree())
+        self.assertNotEqual(reference, compute_structural_hashes(self.build_tree(content='Hello')))
+        self.assertNotEqual(reference, compute_structural_hashes(self.build_tree(attrs={'foo': 'bar'})))
+        self.assertNotEqual(reference, compute_structural_hashes(self.build_tree(node_cls=OtherDummyTreeNode)))
+        root_tree_node = self.build_tree()
+        root_tree_node.children[0].children.reverse()
+        self.assertNotEqual(reference, compute_structural_hashes(root_tree_node))
+        root_tree_node = self.build_tree()
+        root_tree_node.children[0].error_message = 'Error'
+        self.assertNotEqual(reference, compute_structural_hashes(root_tree_node))
+
+    def test_structural_hashes_subtrees(self):
+        """ Test if identical subtrees have the same structural hash. """
+        root_tree_node = self.build_tree()
+        compute_structural_hashes(root_tree_node)
+        other_root_tree_node = self.build_tree()
+        other_root_tree_node.attrs['foo'] = 'bar'
+        other_root_tree_node.new_child('other', OtherDummyTreeNode)
+        compute_structural_hashes(other_root_tree_node)
+        self.assertNotEqual(root_tree_node.structural_hash, other_root_tree_node.structural_hash)
+        self.assertEqual(root_tree_node.children[0].structural_hash,
+                         other_root_tree_node.children[0].structural_hash)
+
+    def test_structural_hashes_stable(self):
+        """ Test if the structural hashes are stable (not randomized). """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('test', TreeNode, attrs={'foo': 'bar', 'baz': 'qux'}, content='Hello world!')
+        self.assertEqual('4bc525a9b42d212b29ecbca1ed04a017', compute_structural_hashes(root_tree_node).hex())
+
+
+def generate_dummy_cls(foo):
+    """ Generate a dummy tree node class for the given ``foo`` value. """
+
+    class GeneratedDummyTreeNode(TreeNode):
+        """ Generated dummy tree node class. """
+
+        canonical_tag_name = 'dummy-tag'
+
+    GeneratedDummyTreeNode.foo = foo
+    return register_generated_node_cls(GeneratedDummyTreeNode, foo)
+
+
+class GeneratedNodeClassesTestCase(unittest.TestCase):
+    """ Tests suite for the generated tree node classes registry. """
+
+    def test_register_generated_node_cls(self):
+        """ Test the ``register_generated_node_cls`` function. """
+        cls = generate_dummy_cls('bar')
+        self.assertEqual('bar', cls.foo)
+        self.assertTrue(cls.__qualname__.startswith('GeneratedDummyTreeNode_dummy_tag_'))
+        self.assertEqual('GeneratedDummyTreeNode', cls.__name__)
+        self.assertEqual("('bar',)", cls.generated_cls_key)
+        self.assertIs(cls, globals()[cls.__qualname__])
+
+    def test_register_generated_node_cls_same_key(self):
+        """ Test if generating a class twice with the same key return the registered class. """
+        cls = generate_dummy_cls('bar')
+        self.assertIs(cls, generate_dummy_cls('bar'))
+        other_cls = generate_dummy_cls('baz')
+        self.assertIsNot(cls, other_cls)
+        self.assertNotEqual(cls.__qualname__, other_cls.__qualname__)
+
+    def test_register_generated_node_cls_collision(self):
+        """ Test if registering another class key under a registered name raise an error. """
+        cls = generate_dummy_cls('bar')
+        cls.generated_cls_key = "('other',)"
+        try:
+            with self.assertRaises(ValueError):
+                generate_dummy_cls('bar')
+        finally:
+            cls.generated_cls_key = "('bar',)"
+        cls_name = generate_dummy_cls('qux').__qualname__
+        globals()[cls_name] = object()
+        try:
+            with self.assertRaises(ValueError):
+                generate_dummy_cls('qux')
+        finally:
+            del globals()[cls_name]
+
+    def test_register_generated_node_cls_stable_name(self):
+        """ Test if the registered names are stable (not randomized). """
+        self.assertEqual('GeneratedDummyTreeNode_dummy_tag_1b823a66', generate_dummy_cls('bar').__qualname__)
+
+    def test_get_stable_cls_key(self):
+        """ Test the ``get_stable_cls_key`` function. """
+        self.assertEqual(('bar', 1), get_stable_cls_key(('bar', 1)))
+        self.assertEqual(('skcode.etree.TreeNode', ('skcode.etree.iter_tree_preorder', )),
+                         get_stable_cls_key((TreeNode, [iter_tree_preorder])))
+        self.assertEqual((('a', 1), ('b', 'skcode.etree.TreeNode')),
+                         get_stable_cls_key({'b': TreeNode, 'a': 1}))
+
+    def test_register_generated_node_cls_stable_name_class_key(self):
+        """ Test if the registered names do not depend on the memory address of classes in the class key. """
+        self.assertEqual('GeneratedDummyTreeNode_dummy_tag_{}'.format(
+            blake2b(repr(('skcode.etree.TreeNode', )).encode('utf-8'), digest_size=4).hexdigest()),
+            generate_dummy_cls(TreeNode).__qualname__)
+
+    def test_register_generated_node_cls_pickle(self):
+        """ Test if the tree nodes of generated classes can be pickled. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('dummy', generate_dummy_cls('bar'))
+        new_root_tree_node = pickle.loads(pickle.dumps(root_tree_node))
+        self.assertIs(generate_dummy_cls('bar'), new_root_tree_node.children[0].__class__)
+
 
 class DebugApiTestCase(unittest.TestCase):
     """ Test suite for the etree debug API. """
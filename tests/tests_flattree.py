@@ -0,0 +1,168 @@
+"""
+SkCode flat document tree test code.
+"""
+
+import pickle
+import unittest
+
+from skcode import parse_skcode, render_to_html, render_to_text, FlatDocumentTree
+from skcode.etree import RootTreeNode, EMPTY_ATTRS
+from skcode.flattree import FlatTreeNodeView, get_flat_view_cls
+from skcode.tags import (
+    BoldTextTreeNode,
+    ItalicTextTreeNode,
+    UrlLinkTreeNode,
+    TextTreeNode,
+    TextRunTreeNode,
+)
+
+
+class FlatDocumentTreeTestCase(unittest.TestCase):
+    """ Tests suite for the flat document tree module. """
+
+    def test_arrays(self):
+        """ Test the arrays of the flat document tree. """
+        document_tree = parse_skcode('[b]foo[/b][i]bar[/i]baz')
+        flat_document = FlatDocumentTree(document_tree)
+        self.assertEqual(6, len(flat_document))
+        self.assertEqual([-1, 0, 1, 0, 3, 0], list(flat_document.parent_indexes))
+        self.assertEqual([1, 2, -1, 4, -1, -1], list(flat_document.first_child_indexes))
+        self.assertEqual([-1, 3, -1, 5, -1, -1], list(flat_document.next_sibling_indexes))
+        self.assertEqual([RootTreeNode, BoldTextTreeNode, TextTreeNode, ItalicTextTreeNode],
+                         flat_document.node_classes)
+        self.assertEqual([0, 1, 2, 3, 2, 2], list(flat_document.type_ids))
+        self.assertEqual([1, 3, 5], list(flat_document.iter_children_indexes(0)))
+        self.assertEqual(3, flat_document.get_subtree_end(1))
+        self.assertEqual(6, flat_document.get_subtree_end(0))
+
+    def test_source_strings(self):
+        """ Test the source strings of the nodes, with and without source spans. """
+        for source_spans in (False, True):
+            document_tree = parse_skcode('[b]foo[/b] [url=http://example.com]bar[/url]', source_spans=source_spans)
+            flat_document = FlatDocumentTree(document_tree)
+            self.assertEqual('[b]', flat_document.get_source_string(1, 1))
+            self.assertEqual('[/b]', flat_document.get_source_string(1, 2))
+            self.assertEqual('foo', flat_document.get_source_string(2, 0))
+            self.assertEqual('[url=http://example.com]', flat_document.get_source_string(4, 1))
+
+    def test_views(self):
+        """ Test the node views of the flat document tree. """
+        document_tree = parse_skcode('[b]foo[/b][url=http://example.com]bar[/url]')
+        flat_document = FlatDocumentTree(document_tree)
+        root_tree_node = flat_document.get_root_node()
+        self.assertIs(root_tree_node, flat_document.get_root_node())
+        self.assertIsInstance(root_tree_node, RootTreeNode)
+        self.assertIsInstance(root_tree_node, FlatTreeNodeView)
+        self.assertTrue(root_tree_node.is_root)
+        self.assertIsNone(root_tree_node.parent)
+        bold_node, url_node = root_tree_node.children
+        self.assertIsInstance(bold_node, BoldTextTreeNode)
+        self.assertIs(get_flat_view_cls(BoldTextTreeNode), type(bold_node))
+        self.assertIs(root_tree_node, bold_node.parent)
+        self.assertIs(root_tree_node, bold_node.root_tree_node)
+        self.assertEqual('b', bold_node.name)
+        self.assertEqual('[b]', bold_node.source_open_tag)
+        self.assertEqual('foo', bold_node.children[0].content)
+        self.assertEqual({'url': 'http://example.com'}, url_node.attrs)
+        self.assertEqual('http://example.com', url_node.get_target_link())
+
+    def test_views_parent(self):
+        """ Test the parent view of a node view created without parent. """
+        flat_document = FlatDocumentTree(parse_skcode('[b][i]foo[/i][/b]'))
+        italic_node = flat_document.get_node(2)
+        self.assertIsInstance(italic_node.parent, BoldTextTreeNode)
+        self.assertIs(flat_document.get_root_node(), italic_node.parent.parent)
+
+    def test_render(self):
+        """ Test the rendering of the flat document tree. """
+        text = '[quote author="John"]Hello [b]world[/b]![/quote]\n\n[list][*]foo\n[*][i]bar[/i][/list]'
+        document_tree = parse_skcode(text)
+        flat_document = FlatDocumentTree(document_tree)
+        self.assertEqual(render_to_html(document_tree), flat_document.render_to_html())
+        self.assertEqual(render_to_text(document_tree), flat_document.render_to_text())
+
+    def test_search_in_tree(self):
+        """ Test the search of nodes in the flat document tree. """
+        document_tree = parse_skcode('[b]foo[/b][i][b]bar[/b][/i]')
+        flat_document = FlatDocumentTree(document_tree)
+        self.assertEqual([1, 4], list(flat_document.iter_matching_indexes(BoldTextTreeNode)))
+        self.assertEqual([4], list(flat_document.iter_matching_indexes(BoldTextTreeNode, 3)))
+        self.assertEqual([1, 3, 4], list(flat_document.iter_matching_indexes((BoldTextTreeNode, ItalicTextTreeNode))))
+        self.assertEqual([], list(flat_document.iter_matching_indexes(UrlLinkTreeNode)))
+        bold_nodes = list(flat_document.search_in_tree(BoldTextTreeNode))
+        self.assertEqual(['foo', 'bar'], [tree_node.get_raw_content() for tree_node in bold_nodes])
+        root_tree_node = flat_document.get_root_node()
+        self.assertFalse(root_tree_node.has_materialized_children())
+        self.assertEqual(2, len(list(root_tree_node.search_in_tree(BoldTextTreeNode))))
+        self.assertFalse(root_tree_node.has_materialized_children())
+        italic_node = root_tree_node.children[1]
+        self.assertTrue(root_tree_node.has_materialized_children())
+        self.assertEqual([italic_node.children[0]], list(italic_node.search_in_tree(BoldTextTreeNode)))
+
+    def test_get_raw_content(self):
+        """ Test the raw content of the flat document tree. """
+        document_tree = parse_skcode('[b]foo[/b] [i]bar[/i]')
+        flat_document = FlatDocumentTree(document_tree)
+        self.assertEqual(document_tree.get_raw_content(), flat_document.get_raw_content())
+        self.assertEqual('bar', flat_document.get_raw_content(4))
+        self.assertEqual('foo', flat_document.get_root_node().children[0].get_raw_content())
+
+    def test_get_raw_content_override(self):
+        """ Test if the raw content of the flat document tree use the overrides of the node classes. """
+
+        class UpperBoldTextTreeNode(BoldTextTreeNode):
+
+            def get_raw_content(self, recursive=True):
+                return super(UpperBoldTextTreeNode, self).get_raw_content(recursive).upper()
+
+        document_tree = parse_skcode('[b]foo [i]bar[/i][/b] [i]baz[/i]',
+                                     recognized_tags=(UpperBoldTextTreeNode, ItalicTextTreeNode))
+        self.assertEqual('FOO BAR baz', document_tree.get_raw_content())
+        flat_document = FlatDocumentTree(document_tree)
+        self.assertEqual('FOO BAR baz', flat_document.get_raw_content())
+        self.assertEqual('FOO BAR', flat_document.get_raw_content(1))
+        root_tree_node = flat_document.get_root_node()
+        self.assertEqual('FOO BAR', root_tree_node.children[0].get_raw_content())
+        self.assertEqual('FOO BAR baz', root_tree_node.get_raw_content())
+
+    def test_has_errors(self):
+        """ Test the error detection in the flat document tree. """
+        flat_document = FlatDocumentTree(parse_skcode('[b]foo[/b]'))
+        self.assertFalse(flat_document.has_errors())
+        flat_document = FlatDocumentTree(parse_skcode('[b]foo[/b][/i]bar'))
+        self.assertTrue(flat_document.has_errors())
+        self.assertFalse(flat_document.has_errors(1))
+        self.assertTrue(flat_document.get_root_node().has_errors())
+
+    def test_attrs_persistence(self):
+        """ Test the attributes dictionaries are stored in the flat document tree. """
+        document_tree = parse_skcode('[b]foo[/b]')
+        flat_document = FlatDocumentTree(document_tree)
+        self.assertEqual(-1, flat_document.attrs_indexes[1])
+        self.assertIs(EMPTY_ATTRS, flat_document.get_node(2).attrs)
+        flat_document.get_node(1).attrs['foo'] = 'bar'
+        self.assertEqual({'foo': 'bar'}, flat_document.get_node(1).attrs)
+        flat_document.get_node(2).set_attribute_value('baz', 'qux')
+        self.assertEqual({'baz': 'qux'}, flat_document.get_node(2).attrs)
+        self.assertEqual({}, document_tree.children[0].attrs)
+        self.assertIs(EMPTY_ATTRS, document_tree.children[0].children[0].attrs)
+
+    def test_text_runs(self):
+        """ Test the flat document tree of a document with text runs. """
+        document_tree = parse_skcode('foo\nbar [b]baz[/b]', coalesce_text_runs=True)
+        flat_document = FlatDocumentTree(document_tree)
+        text_run_node = flat_document.get_root_node().children[0]
+        self.assertIsInstance(text_run_node, TextRunTreeNode)
+        self.assertEqual(document_tree.children[0].text_pieces, text_run_node.text_pieces)
+        self.assertEqual(render_to_html(document_tree), flat_document.render_to_html())
+
+    def test_pickle(self):
+        """ Test the pickling of the flat document tree. """
+        document_tree = parse_skcode('[b]foo[/b] [url=http://example.com]bar[/url][/i]baz', source_spans=True)
+        flat_document = FlatDocumentTree(document_tree)
+        flat_document.get_root_node()
+        flat_document_copy = pickle.loads(pickle.dumps(flat_document))
+        self.assertEqual(list(flat_document.type_ids), list(flat_document_copy.type_ids))
+        self.assertEqual(flat_document.text, flat_document_copy.text)
+        self.assertEqual(flat_document.render_to_html(), flat_document_copy.render_to_html())
+        self.assertTrue(flat_document_copy.has_errors())
@@ -0,0 +1,206 @@
+"""
+SkCode document overlay test code.
+"""
+
+import pickle
+import threading
+import unittest
+
+from skcode import parse_skcode, render_to_html, render_to_text, DocumentOverlay
+from skcode.etree import FrozenAttributesDict, FrozenRootReference, EMPTY_ATTRS
+from skcode.tags import BoldTextTreeNode
+from skcode.utility.cosmetics import setup_cosmetics_replacement
+from skcode.utility.footnotes import extract_footnotes, render_footnotes_html
+from skcode.utility.paragraphs import make_paragraphs
+from skcode.utility.relative_urls import setup_relative_urls_conversion
+from skcode.utility.smileys import setup_smileys_replacement
+
+
+# Sample document for tests
+SAMPLE_TEXT = 'Hello :) -- world [url]/foo[/url]\n[footnote]First note[/footnote] [footnote]Second[/footnote]\n\n' \
+              'Another [b]paragraph[/b]...'
+
+
+def setup_document(document_tree, request_id):
+    """ Setup the given document (or overlay) with per-request settings. """
+    setup_smileys_replacement(document_tree, '/smileys-{}/'.format(request_id))
+    setup_cosmetics_replacement(document_tree)
+    setup_relative_urls_conversion(document_tree, 'http://example-{}.com/'.format(request_id))
+
+
+def get_frozen_document():
+    """ Parse, make paragraphs and freeze the sample document. """
+    document_tree = parse_skcode(SAMPLE_TEXT)
+    make_paragraphs(document_tree)
+    document_tree.freeze()
+    return document_tree
+
+
+def render_fresh_document(request_id):
+    """ Parse, make paragraphs, setup and render the sample document (reference output). """
+    document_tree = parse_skcode(SAMPLE_TEXT)
+    make_paragraphs(document_tree)
+    setup_document(document_tree, request_id)
+    return (render_to_html(document_tree), render_to_text(document_tree),
+            render_footnotes_html(extract_footnotes(document_tree)))
+
+
+class FrozenDocumentTreeTestCase(unittest.TestCase):
+    """ Tests suite for the frozen document trees. """
+
+    def test_freeze(self):
+        """ Test the ``freeze`` method of the root tree node. """
+        document_tree = parse_skcode('[b]foo[/b] [url=http://example.com/]bar[/url]')
+        self.assertFalse(document_tree.frozen)
+        html_output = render_to_html(document_tree)
+        document_tree.freeze()
+        self.assertTrue(document_tree.frozen)
+        self.assertIsInstance(document_tree.frozen_root_reference, FrozenRootReference)
+        self.assertIsInstance(document_tree.children, tuple)
+        self.assertIsInstance(document_tree.attrs, FrozenAttributesDict)
+        self.assertIsInstance(document_tree.children[2].attrs, FrozenAttributesDict)
+        self.assertEqual({'url': 'http://example.com/'}, document_tree.children[2].attrs)
+        self.assertIs(EMPTY_ATTRS, document_tree.children[0].attrs)
+        self.assertIsInstance(document_tree.known_ids, frozenset)
+        self.assertIs(document_tree, document_tree.children[0].children[0].root_tree_node)
+        self.assertIs(document_tree.children[0], document_tree.children[0].children[0].parent)
+        self.assertEqual(html_output, render_to_html(document_tree))
+        self.assertEqual([document_tree.children[0]], list(document_tree.search_in_tree(BoldTextTreeNode)))
+
+    def test_freeze_twice(self):
+        """ Test if freezing a frozen document tree does nothing. """
+        document_tree = parse_skcode('[b]foo[/b]')
+        document_tree.freeze()
+        frozen_root_reference = document_tree.frozen_root_reference
+        document_tree.freeze()
+        self.assertIs(frozen_root_reference, document_tree.frozen_root_reference)
+
+    def test_frozen_document_immutable(self):
+        """ Test if frozen document trees cannot be modified. """
+        document_tree = parse_skcode('[b]foo[/b] [url=http://example.com/]bar[/url]')
+        document_tree.freeze()
+        with self.assertRaises(TypeError):
+            setup_smileys_replacement(document_tree, '/smileys/')
+        with self.assertRaises(TypeError):
+            document_tree.children[0].set_attribute_value('foo', 'bar')
+        with self.assertRaises(TypeError):
+            document_tree.children[2].set_attribute_value('foo', 'bar')
+        with self.assertRaises(AttributeError):
+            document_tree.new_child('b', BoldTextTreeNode)
+        with self.assertRaises(AssertionError):
+            make_paragraphs(document_tree)
+
+    def test_frozen_document_render_time_attributes(self):
+        """ Test if the node attributes set while rendering a frozen document are the same for all renders. """
+        document_tree = parse_skcode('[table][tr][td colspan=foo]bar[/td][/tr][/table] [footnote]note[/footnote]')
+        document_tree.freeze()
+        html_outputs = [DocumentOverlay(document_tree).render_to_html() for _ in range(2)]
+        self.assertEqual(html_outputs[0], html_outputs[1])
+        self.assertEqual('foo is not a number', document_tree.children[0].children[0].children[0].error_message)
+
+    def test_frozen_document_pickle(self):
+        """ Test if frozen document trees can be pickled. """
+        document_tree = get_frozen_document()
+        new_document_tree = pickle.loads(pickle.dumps(document_tree))
+        self.assertTrue(new_document_tree.frozen)
+        self.assertIsInstance(new_document_tree.attrs, FrozenAttributesDict)
+        self.assertIs(new_document_tree, new_document_tree.children[0].root_tree_node)
+        self.assertEqual(render_to_html(document_tree), render_to_html(new_document_tree))
+
+    def test_frozen_cycle_free_document(self):
+        """ Test if frozen cycle-free document trees keep only weak references to the root tree node. """
+        document_tree = parse_skcode('[b]foo[/b]', cycle_free=True)
+        document_tree.freeze()
+        self.assertIs(document_tree, document_tree.children[0].root_tree_node)
+        frozen_root_reference = document_tree.frozen_root_reference
+        del document_tree
+        self.assertIsNone(frozen_root_reference())
+
+
+class DocumentOverlayTestCase(unittest.TestCase):
+    """ Tests suite for the document overlay module. """
+
+    def test_overlay_requires_frozen_document(self):
+        """ Test if overlays are only allowed on frozen documents. """
+        with self.assertRaises(AssertionError):
+            DocumentOverlay(parse_skcode('foo'))
+
+    def test_overlay_attrs(self):
+        """ Test the attributes dictionary of the overlay. """
+        document_tree = parse_skcode('foo')
+        document_tree.attrs['foo'] = 'bar'
+        document_tree.freeze()
+        overlay = DocumentOverlay(document_tree, attrs={'baz': 'qux'})
+        self.assertEqual('bar', overlay.attrs['foo'])
+        self.assertEqual('qux', overlay.attrs['baz'])
+        overlay.attrs['foo'] = 'foobar'
+        self.assertEqual('foobar', overlay.attrs['foo'])
+        self.assertEqual('bar', document_tree.attrs['foo'])
+
+    def test_overlay_forward_attributes(self):
+        """ Test if the overlay reads other root-level attributes from the frozen root tree node. """
+        document_tree = get_frozen_document()
+        overlay = DocumentOverlay(document_tree)
+        self.assertTrue(overlay.is_root)
+        self.assertTrue(overlay.frozen)
+        self.assertIs(document_tree.children, overlay.children)
+        self.assertIs(document_tree.source_text, overlay.source_text)
+
+    def test_overlay_activation(self):
+        """ Test if the nodes see the active overlay as root tree node. """
+        document_tree = get_frozen_document()
+        tree_node = document_tree.children[0].children[0]
+        overlay = DocumentOverlay(document_tree)
+        other_overlay = DocumentOverlay(document_tree)
+        self.assertIs(document_tree, tree_node.root_tree_node)
+        with overlay:
+            self.assertIs(overlay, tree_node.root_tree_node)
+            self.assertIs(overlay, document_tree.root_tree_node)
+            with other_overlay:
+                self.assertIs(other_overlay, tree_node.root_tree_node)
+            self.assertIs(overlay, tree_node.root_tree_node)
+        self.assertIs(document_tree, tree_node.root_tree_node)
+
+    def test_overlay_rendering(self):
+        """ Test if rendering with overlays give the same result as rendering fresh documents. """
+        document_tree = get_frozen_document()
+        frozen_html = render_to_html(document_tree)
+        for request_id in range(3):
+            overlay = DocumentOverlay(document_tree)
+            setup_document(overlay, request_id)
+            with overlay:
+                output = (overlay.render_to_html(), overlay.render_to_text(),
+                          render_footnotes_html(extract_footnotes(document_tree)))
+            self.assertEqual(render_fresh_document(request_id), output)
+        self.assertEqual(frozen_html, render_to_html(document_tree))
+
+    def test_overlay_root_level_state(self):
+        """ Test if the root-level state set by the tags is stored in the overlay. """
+        document_tree = get_frozen_document()
+        overlay = DocumentOverlay(document_tree)
+        with overlay:
+            overlay.known_ids.add('foobar')
+            setattr(document_tree.children[0].root_tree_node, '_custom_counter', 1)
+        self.assertIn('foobar', overlay.known_ids)
+        self.assertNotIn('foobar', document_tree.known_ids)
+        self.assertEqual(1, overlay._custom_counter)
+        self.assertFalse(hasattr(document_tree, '_custom_counter'))
+
+    def test_overlay_concurrent_rendering(self):
+        """ Test if a frozen document can be rendered concurrently with different overlays. """
+        document_tree = get_frozen_document()
+        expected_outputs = [render_fresh_document(request_id)[0] for request_id in range(2)]
+        results = {}
+
+        def _render(thread_id):
+            overlay = DocumentOverlay(document_tree)
+            setup_document(overlay, thread_id % 2)
+            results[thread_id] = all(overlay.render_to_html() == expected_outputs[thread_id % 2]
+                                     for _ in range(50))
+
+        threads = [threading.Thread(target=_render, args=(thread_id, )) for thread_id in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({thread_id: True for thread_id in range(8)}, results)
@@ -2,7 +2,9 @@
 SkCode tag parser test code.
 """
 
+import random
 import string
+import sys
 import unittest
 
 from skcode.parser import (
@@ -10,7 +12,9 @@ from skcode.parser import (
     IDENTIFIER_CHARSET,
     skip_whitespaces,
     get_identifier,
-    parse_tag
+    parse_tag,
+    scan_tag,
+    parse_tag_attributes
 )
 
 
@@ -69,6 +73,13 @@ class TagParserTestCase(unittest.TestCase):
         self.assertEqual('_abcdefghijklmnopqrstuvwxyz', identifier)
         self.assertEqual(offset, 27)
 
+    def test_get_identifier_interned(self):
+        """
+        Test if the ``get_identifier`` method return interned identifiers.
+        """
+        identifier, offset = get_identifier(''.join(['Te', 'St ']), 0)
+        self.assertIs(sys.intern('test'), identifier)
+
     def test_get_identifier_no_ending_whitespace(self):
         """
         Test if the ``get_identifier`` method with no ending whitespaces.
@@ -364,3 +375,134 @@ class TagParserTestCase(unittest.TestCase):
         """ Test if the HTML retro-compatibility mode work as expected (without allowing XHTML-like tags). """
         with self.assertRaises(ValueError):
             parse_tag('[tagname/]', 0, opening_tag_ch='[', closing_tag_ch=']', allow_self_closing_tags=False)
+
+
+class TagScannerTestCase(unittest.TestCase):
+    """ Tests case for the exception-free tag scanner (must match ``parse_tag``). """
+
+    def _parse_tag_or_none(self, text, **kwargs):
+        """ Call ``parse_tag`` and return ``None`` on error, like ``scan_tag``. """
+        try:
+            return parse_tag(text, 0, **kwargs)
+        except (IndexError, ValueError):
+            return None
+
+    def test_functional(self):
+        """ Functional tests. """
+        for text, excepted_result in TagParserTestCase.PASS_TESTS:
+            result = scan_tag(text, 0, opening_tag_ch='[', closing_tag_ch=']')
+            self.assertEqual(result, excepted_result, msg=text)
+
+    def test_error(self):
+        """ Error handling tests. """
+        for text, _ in TagParserTestCase.FAIL_TESTS:
+            self.assertIsNone(scan_tag(text, 0, opening_tag_ch='[', closing_tag_ch=']'), msg=text)
+
+    def test_functional_lazy_attrs(self):
+        """ Functional tests of the lazy attributes mode. """
+        for text, excepted_result in TagParserTestCase.PASS_TESTS:
+            result = scan_tag(text, 0, lazy_attrs=True)
+            self.assertIsNotNone(result, msg=text)
+            tag_name, is_closing_tag, is_self_closing_tag, attrs_offset, offset = result
+            self.assertEqual((tag_name, is_closing_tag, is_self_closing_tag, offset),
+                             excepted_result[:3] + excepted_result[4:], msg=text)
+            tag_attrs = parse_tag_attributes(text[:offset], attrs_offset, tag_name)
+            self.assertEqual(tag_attrs, excepted_result[3], msg=text)
+
+    def test_error_lazy_attrs(self):
+        """ Error handling tests of the lazy attributes mode. """
+        for text, _ in TagParserTestCase.FAIL_TESTS:
+            self.assertIsNone(scan_tag(text, 0, lazy_attrs=True), msg=text)
+
+    def test_lazy_attrs_offset(self):
+        """ Test if the offset of the attributes section is relative to the start of the tag. """
+        self.assertEqual(scan_tag('abc[test]def', 3, lazy_attrs=True), ('test', False, False, None, 9))
+        self.assertEqual(scan_tag('abc[test=a b=c]def', 3, lazy_attrs=True), ('test', False, False, 5, 15))
+        self.assertEqual(scan_tag('abc[ test  b=c /]def', 3, lazy_attrs=True), ('test', False, True, 8, 17))
+        self.assertEqual(parse_tag_attributes('<test=a b="c">', 5, 'test', '<', '>'), {'test': 'a', 'b': 'c'})
+
+    def test_interned_names(self):
+        """ Test if the tag names and attribute names are interned. """
+        text = ''.join(['[Te', 'St ke', 'y=value]'])
+        tag_name, _, _, tag_attrs, _ = scan_tag(text, 0)
+        self.assertIs(sys.intern('test'), tag_name)
+        self.assertIs(sys.intern('key'), next(iter(tag_attrs)))
+        tag_name, _, _, tag_attrs, _ = scan_tag(text, 0, recognized_tag_names={'test'})
+        self.assertIs(sys.intern('test'), tag_name)
+        tag_name, _, _, attrs_offset, _ = scan_tag(text, 0, lazy_attrs=True)
+        tag_attrs = parse_tag_attributes(text, attrs_offset, tag_name)
+        self.assertIs(sys.intern('key'), next(iter(tag_attrs)))
+
+    def test_start_offset(self):
+        """ Test if the ``start_offset`` argument is handled like in ``parse_tag``. """
+        self.assertEqual(scan_tag('abc[test key=value]def', 3),
+                         ('test', False, False, {'key': 'value'}, 19))
+
+    def test_custom_tag_chars(self):
+        """ Test the scanner with custom opening and closing chars. """
+        self.assertEqual(scan_tag('<test key="[value]">', 0, opening_tag_ch='<', closing_tag_ch='>'),
+                         ('test', False, False, {'key': '[value]'}, 20))
+        self.assertIsNone(scan_tag('<test key=value<', 0, opening_tag_ch='<', closing_tag_ch='>'))
+
+    def test_html_compatibility_mode(self):
+        """ Test if the HTML retro-compatibility mode work as expected. """
+        self.assertIsNone(scan_tag('[tagname=tagvalue]', 0, allow_tagvalue_attr=False))
+        self.assertEqual(scan_tag('[tagname key=value]', 0, allow_tagvalue_attr=False),
+                         ('tagname', False, False, {'key': 'value'}, 19))
+
+    def test_html_compatibility_mode_no_xhtml(self):
+        """ Test if the HTML retro-compatibility mode work as expected (without allowing XHTML-like tags). """
+        self.assertIsNone(scan_tag('[tagname/]', 0, allow_self_closing_tags=False))
+
+    def test_recognized_tag_names(self):
+        """ Test if unknown tag names are rejected when a set of recognized tag names is given. """
+        recognized_tag_names = {'test', 'url'}
+        self.assertEqual(scan_tag('[TEST key=value]', 0, recognized_tag_names=recognized_tag_names),
+                         ('test', False, False, {'key': 'value'}, 16))
+        self.assertEqual(scan_tag('[url=http://example.com/]', 0, recognized_tag_names=recognized_tag_names),
+                         ('url', False, False, {'url': 'http://example.com/'}, 25))
+        self.assertEqual(scan_tag('[/ url ]', 0, recognized_tag_names=recognized_tag_names),
+                         ('url', True, False, {}, 8))
+        self.assertIsNone(scan_tag('[foo]', 0, recognized_tag_names=recognized_tag_names))
+        self.assertIsNone(scan_tag('[/foo]', 0, recognized_tag_names=recognized_tag_names))
+        self.assertIsNone(scan_tag('[foo key="unterminated', 0, recognized_tag_names=recognized_tag_names))
+        self.assertIsNone(scan_tag('[test key="unterminated', 0, recognized_tag_names=recognized_tag_names))
+
+    def test_max_tag_length(self):
+        """ Test if tags longer than the maximum tag length are rejected. """
+        self.assertEqual(scan_tag('[test key=value]', 0, max_tag_length=16),
+                         ('test', False, False, {'key': 'value'}, 16))
+        self.assertIsNone(scan_tag('[test key=value]', 0, max_tag_length=15))
+        self.assertIsNone(scan_tag('[test key="value', 0, max_tag_length=8))
+        self.assertEqual(scan_tag('xx[test]', 2, max_tag_length=6), ('test', False, False, {}, 8))
+        self.assertIsNone(scan_tag('xx[test]', 2, max_tag_length=5))
+
+    def test_max_tag_length_disabled(self):
+        """ Test if the maximum tag length can be disabled. """
+        text = '[test key="{}"]'.format('a' * 5000)
+        self.assertIsNone(scan_tag(text, 0))
+        self.assertEqual(scan_tag(text, 0, max_tag_length=0),
+                         ('test', False, False, {'key': 'a' * 5000}, 5013))
+
+    def test_max_attrs_count(self):
+        """ Test if tags with more attributes than the maximum attributes count are rejected. """
+        self.assertEqual(scan_tag('[test=a b c=d]', 0, max_attrs_count=3),
+                         ('test', False, False, {'test': 'a', 'b': '', 'c': 'd'}, 14))
+        self.assertIsNone(scan_tag('[test=a b c=d]', 0, max_attrs_count=2))
+        self.assertIsNone(scan_tag('[test a b c]', 0, max_attrs_count=2))
+        self.assertEqual(scan_tag('[test a b c]', 0, max_attrs_count=0),
+                         ('test', False, False, {'a': '', 'b': '', 'c': ''}, 12))
+
+    def test_random_inputs_match_parse_tag(self):
+        """ Test if the scanner give the same results as ``parse_tag`` on random inputs. """
+        rnd = random.Random(42)
+        charset = '[]/="\' \\ \t\xa0aB1_*=key'
+        for _ in range(20000):
+            text = '[' + ''.join(rnd.choice(charset) for _ in range(rnd.randint(0, 16)))
+            for kwargs in ({}, {'allow_tagvalue_attr': False}, {'allow_self_closing_tags': False}):
+                self.assertEqual(scan_tag(text, 0, **kwargs), self._parse_tag_or_none(text, **kwargs),
+                                 msg=repr(text))
+            expected_result = self._parse_tag_or_none(text)
+            if expected_result is not None and expected_result[0] != 'key':
+                expected_result = None
+            self.assertEqual(scan_tag(text, 0, recognized_tag_names={'key'}), expected_result, msg=repr(text))
@@ -269,3 +269,26 @@ class RenderingTestCase(unittest.TestCase):
                           '[TEXT+level1-2][/TEXT]' \
                           '[TEXT+level1-3][/TEXT]'
         self.assertEqual(expected_output, output)
+
+    def test_render_leaf_nodes(self):
+        """ Test the rendering of leaf nodes (rendered without recursion) """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('level1', get_test_node('level1-1'))
+        root_tree_node.new_child('level1', get_test_node('level1-2'),
+                                 source_open_tag='[test]', error_message='Error')
+        output = render_to_html(root_tree_node, some_custom_kwarg='foobar')
+        self.assertEqual('[HTML+level1-1][/HTML]<span style="font-weight: bold; color: red;" '
+                         'title="Error">[test]</span>', output)
+        output = render_to_text(root_tree_node, some_custom_kwarg='foobar')
+        self.assertEqual('[TEXT+level1-1][/TEXT][test]', output)
+
+    def test_render_deeply_nested_tree(self):
+        """ Test the rendering of trees deeper than the Python recursion limit """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node
+        for _ in range(5000):
+            tree_node = tree_node.new_child('level', get_test_node('level'))
+        output = render_to_html(root_tree_node, some_custom_kwarg='foobar')
+        self.assertEqual('[HTML+level]' * 5000 + '[/HTML]' * 5000, output)
+        output = render_to_text(root_tree_node, some_custom_kwarg='foobar')
+        self.assertEqual('[TEXT+level]' * 5000 + '[/TEXT]' * 5000, output)
@@ -0,0 +1,203 @@
+"""
+SkCode binary serialization test code.
+"""
+
+import unittest
+
+from skcode import parse_skcode, render_to_html, render_to_text, SkCodeDialect
+from skcode.etree import RootTreeNode, EMPTY_ATTRS
+from skcode.serializer import (
+    dumps,
+    loads,
+    build_classes_registry,
+    pack_column,
+    unpack_column,
+    DEFAULT_CLASSES_REGISTRY,
+    INTERNAL_NODE_CLASSES,
+    SERIALIZATION_MAGIC,
+    SERIALIZATION_VERSION
+)
+from skcode.tags import (
+    DEFAULT_RECOGNIZED_TAGS_LIST,
+    BoldTextTreeNode,
+    ItalicTextTreeNode,
+    TextRunTreeNode
+)
+from skcode.utility.footnotes import extract_footnotes, render_footnotes_html
+from skcode.utility.paragraphs import make_paragraphs
+from skcode.utility.smileys import setup_smileys_replacement
+
+
+# Sample document for tests
+SAMPLE_TEXT = 'Hello :) [b]world[/b] [url=http://example.com/]link[/url]\n[footnote]Note[/footnote]\n\n' \
+              '[quote author="John"]Another [i]paragraph[/i][/quote] [u]unclosed'
+
+
+class SerializerTestCase(unittest.TestCase):
+    """ Tests suite for the binary serialization module. """
+
+    def assertSameDocument(self, document_tree, new_document_tree):
+        """ Check if both documents render the same way. """
+        self.assertEqual(render_to_html(document_tree), render_to_html(new_document_tree))
+        self.assertEqual(render_to_text(document_tree), render_to_text(new_document_tree))
+        self.assertEqual(document_tree.get_raw_content(), new_document_tree.get_raw_content())
+        self.assertEqual(document_tree.has_errors(), new_document_tree.has_errors())
+
+    def test_build_classes_registry(self):
+        """ Test the ``build_classes_registry`` function. """
+        classes_registry = build_classes_registry((BoldTextTreeNode, ItalicTextTreeNode, BoldTextTreeNode),
+                                                  (RootTreeNode, ))
+        self.assertEqual(INTERNAL_NODE_CLASSES + (BoldTextTreeNode, ItalicTextTreeNode), classes_registry)
+
+    def test_default_classes_registry(self):
+        """ Test the default classes registry. """
+        self.assertEqual(build_classes_registry(DEFAULT_RECOGNIZED_TAGS_LIST), DEFAULT_CLASSES_REGISTRY)
+
+    def test_pack_column(self):
+        """ Test if integers columns are packed into the smallest arrays. """
+        self.assertEqual('b', pack_column([0, -1, 127])[0])
+        self.assertEqual('h', pack_column([0, -1, 128])[0])
+        self.assertEqual('i', pack_column([0, 1 << 20])[0])
+        self.assertEqual('b', pack_column([])[0])
+        self.assertEqual([0, -1, 1 << 20], list(unpack_column(pack_column([0, -1, 1 << 20]))))
+
+    def test_header(self):
+        """ Test the header of the binary format. """
+        output = dumps(parse_skcode('[b]foo[/b]'))
+        self.assertIsInstance(output, bytes)
+        self.assertTrue(output.startswith(SERIALIZATION_MAGIC))
+        self.assertEqual(SERIALIZATION_VERSION, output[len(SERIALIZATION_MAGIC)])
+
+    def test_round_trip(self):
+        """ Test if loaded documents are the same as the serialized documents. """
+        document_tree = parse_skcode(SAMPLE_TEXT)
+        new_document_tree = loads(dumps(document_tree))
+        self.assertIsInstance(new_document_tree, RootTreeNode)
+        self.assertSameDocument(document_tree, new_document_tree)
+        self.assertIs(new_document_tree, new_document_tree.children[1].root_tree_node)
+        self.assertIs(new_document_tree.children[1], new_document_tree.children[1].children[0].parent)
+        self.assertIs(BoldTextTreeNode, new_document_tree.children[1].__class__)
+        self.assertEqual('b', new_document_tree.children[1].name)
+        self.assertEqual('[b]', new_document_tree.children[1].source_open_tag)
+        self.assertIs(EMPTY_ATTRS, new_document_tree.children[0].attrs)
+        self.assertEqual({}, new_document_tree.children[1].attrs)
+        new_document_tree.children[1].attrs['foo'] = 'bar'
+        self.assertEqual({'foo': 'bar'}, new_document_tree.children[1].attrs)
+        self.assertEqual({'url': 'http://example.com/'}, new_document_tree.children[3].attrs)
+
+    def test_round_trip_empty_document(self):
+        """ Test the serialization of empty documents. """
+        new_document_tree = loads(dumps(parse_skcode('')))
+        self.assertEqual([], new_document_tree.children)
+        self.assertEqual('', render_to_html(new_document_tree))
+
+    def test_round_trip_parsing_options(self):
+        """ Test the serialization of documents parsed with all parsing options. """
+        for options in ({'source_spans': True}, {'lazy_attrs': False}, {'coalesce_text_runs': True},
+                        {'mark_unclosed_tags_as_erroneous': True}, {'cycle_free': True}):
+            with self.subTest(options=options):
+                document_tree = parse_skcode(SAMPLE_TEXT, **options)
+                self.assertSameDocument(document_tree, loads(dumps(document_tree)))
+
+    def test_round_trip_keep_lazy_strings(self):
+        """ Test if the lazy source strings and attributes are not materialized by the serialization. """
+        document_tree = parse_skcode(SAMPLE_TEXT, source_spans=True)
+        quote_tree_node = document_tree.children[8]
+        new_document_tree = loads(dumps(document_tree))
+        with self.assertRaises(AttributeError):
+            RootTreeNode.attrs.__get__(quote_tree_node)
+        with self.assertRaises(AttributeError):
+            RootTreeNode.source_open_tag.__get__(quote_tree_node)
+        self.assertEqual('[quote author="John"]', new_document_tree.children[8].source_open_tag)
+        self.assertEqual({'author': 'John'}, new_document_tree.children[8].attrs)
+
+    def test_round_trip_text_runs(self):
+        """ Test the serialization of text runs. """
+        document_tree = parse_skcode('foo\nbar\n[b]baz[/b]', coalesce_text_runs=True)
+        new_document_tree = loads(dumps(document_tree))
+        self.assertIsInstance(new_document_tree.children[0], TextRunTreeNode)
+        self.assertEqual(document_tree.children[0].text_pieces, new_document_tree.children[0].text_pieces)
+        self.assertSameDocument(document_tree, new_document_tree)
+
+    def test_round_trip_errors(self):
+        """ Test the serialization of erroneous nodes. """
+        document_tree = parse_skcode('[b]foo[/i]', mark_unclosed_tags_as_erroneous=True)
+        new_document_tree = loads(dumps(document_tree))
+        self.assertTrue(new_document_tree.has_errors())
+        self.assertEqual([tree_node.error_message for tree_node in document_tree.children],
+                         [tree_node.error_message for tree_node in new_document_tree.children])
+
+    def test_round_trip_structural_hashes(self):
+        """ Test the serialization of the structural hashes. """
+        document_tree = parse_skcode(SAMPLE_TEXT, structural_hashes=True)
+        new_document_tree = loads(dumps(document_tree))
+        self.assertEqual(document_tree.structural_hash, new_document_tree.structural_hash)
+        self.assertEqual(document_tree.children[1].structural_hash, new_document_tree.children[1].structural_hash)
+
+    def test_round_trip_post_processed_document(self):
+        """ Test the serialization of post-processed documents. """
+        document_tree = parse_skcode(SAMPLE_TEXT)
+        make_paragraphs(document_tree)
+        document_tree.attrs['foo'] = 'bar'
+        document_tree.known_ids.add('foobar')
+        new_document_tree = loads(dumps(document_tree))
+        self.assertEqual({'foo': 'bar'}, new_document_tree.attrs)
+        self.assertEqual(document_tree.known_ids, new_document_tree.known_ids)
+        self.assertSameDocument(document_tree, new_document_tree)
+        self.assertEqual(render_footnotes_html(extract_footnotes(document_tree)),
+                         render_footnotes_html(extract_footnotes(new_document_tree)))
+
+    def test_loaded_document_setup(self):
+        """ Test if loaded documents can be setup with per-request settings. """
+        document_tree = parse_skcode(SAMPLE_TEXT)
+        new_document_tree = loads(dumps(document_tree))
+        setup_smileys_replacement(document_tree, '/smileys/')
+        setup_smileys_replacement(new_document_tree, '/smileys/')
+        self.assertSameDocument(document_tree, new_document_tree)
+
+    def test_round_trip_frozen_document(self):
+        """ Test if frozen documents are loaded as regular documents. """
+        document_tree = parse_skcode(SAMPLE_TEXT)
+        html_output = render_to_html(document_tree)
+        document_tree.freeze()
+        new_document_tree = loads(dumps(document_tree))
+        self.assertFalse(new_document_tree.frozen)
+        self.assertIsInstance(new_document_tree.children, list)
+        self.assertEqual(html_output, render_to_html(new_document_tree))
+
+    def test_loads_cycle_free(self):
+        """ Test the ``cycle_free`` argument of the ``loads`` function. """
+        new_document_tree = loads(dumps(parse_skcode('[b]foo[/b]')), cycle_free=True)
+        self.assertTrue(new_document_tree.cycle_free)
+        self.assertIs(new_document_tree, new_document_tree.children[0].children[0].root_tree_node)
+        self.assertIs(new_document_tree.children[0], new_document_tree.children[0].children[0].parent)
+
+    def test_unknown_class(self):
+        """ Test the serialization of nodes not in the classes registry. """
+        document_tree = parse_skcode('[b]foo[/b]')
+        with self.assertRaises(ValueError):
+            dumps(document_tree, build_classes_registry((ItalicTextTreeNode, )))
+
+    def test_loads_bad_data(self):
+        """ Test the ``loads`` function with bad data. """
+        output = dumps(parse_skcode('[b]foo[/b]'))
+        with self.assertRaises(ValueError):
+            loads(b'foobar' + output)
+        with self.assertRaises(ValueError):
+            loads(output[:len(SERIALIZATION_MAGIC)] + b'\xff' + output[len(SERIALIZATION_MAGIC) + 1:])
+
+    def test_loads_registry_mismatch(self):
+        """ Test the ``loads`` function with another classes registry. """
+        output = dumps(parse_skcode('[b]foo[/b]'))
+        with self.assertRaises(ValueError):
+            loads(output, build_classes_registry((ItalicTextTreeNode, BoldTextTreeNode)))
+
+    def test_dialect(self):
+        """ Test the ``dumps`` and ``loads`` methods of the dialect. """
+        dialect = SkCodeDialect(cls_options_overload={
+            BoldTextTreeNode: {'html_render_template': '<strong>{inner_html}</strong>'}
+        })
+        document_tree = dialect.parse('[b]foo[/b] [i]bar[/i]')
+        new_document_tree = dialect.loads(dialect.dumps(document_tree))
+        self.assertIs(document_tree.children[0].__class__, new_document_tree.children[0].__class__)
+        self.assertEqual('<strong>foo</strong> <em>bar</em>', dialect.render(new_document_tree))
@@ -2,6 +2,8 @@
 SkCode alert box tag definitions test code.
 """
 
+import pickle
+import sys
 import unittest
 
 from skcode.etree import RootTreeNode
@@ -373,3 +375,11 @@ class FixedAlertBoxTreeNodeTestCase(unittest.TestCase):
         tree_node = root_tree_node.new_child('alert', cls, attrs={})
         alert_type = tree_node.get_alert_type()
         self.assertEqual('customtype', alert_type)
+
+    def test_generated_cls_registered(self):
+        """ Test if the generated classes are registered under stable, importable names. """
+        cls = generate_fixed_alert_type_cls('customtype')
+        self.assertIs(cls, generate_fixed_alert_type_cls('customtype'))
+        self.assertIsNot(cls, generate_fixed_alert_type_cls('customtype', canonical_tag_name='foobar'))
+        self.assertIs(cls, getattr(sys.modules[cls.__module__], cls.__qualname__))
+        self.assertIs(cls, pickle.loads(pickle.dumps(cls)))
@@ -2,6 +2,8 @@
 SkCode code block tag definitions test code.
 """
 
+import pickle
+import sys
 import unittest
 from unittest import mock
 
@@ -647,3 +649,11 @@ class FixedCodeBlocksTagTestCase(unittest.TestCase):
                                              attrs={}, content='# Hello World!')
         language_name = tree_node.get_language_name()
         self.assertEqual('foobar', language_name)
+
+    def test_generated_cls_registered(self):
+        """ Test if the generated classes are registered under stable, importable names. """
+        cls = generate_fixed_code_block_type_cls('customtype')
+        self.assertIs(cls, generate_fixed_code_block_type_cls('customtype'))
+        self.assertIsNot(cls, generate_fixed_code_block_type_cls('customtype', canonical_tag_name='foobar'))
+        self.assertIs(cls, getattr(sys.modules[cls.__module__], cls.__qualname__))
+        self.assertIs(cls, pickle.loads(pickle.dumps(cls)))
@@ -8,7 +8,8 @@ from skcode.etree import RootTreeNode
 from skcode.tags import (
     TextTreeNode,
     NewlineTreeNode,
-    HardNewlineTreeNode
+    HardNewlineTreeNode,
+    TextRunTreeNode
 )
 
 
@@ -127,3 +128,50 @@ class HardNewlineTagTestCase(unittest.TestCase):
         root_tree_node = RootTreeNode()
         tree_node = root_tree_node.new_child('test', HardNewlineTreeNode)
         self.assertEqual('\n', tree_node.render_text(''))
+
+
+class TextRunTagTestCase(unittest.TestCase):
+    """ Tests suite for the text run tag module. """
+
+    def test_tag_constant_values(self):
+        """ Test tag constants. """
+        self.assertFalse(TextRunTreeNode.newline_closes)
+        self.assertFalse(TextRunTreeNode.same_tag_closes)
+        self.assertFalse(TextRunTreeNode.weak_parent_close)
+        self.assertFalse(TextRunTreeNode.standalone)
+        self.assertTrue(TextRunTreeNode.parse_embedded)
+        self.assertTrue(TextRunTreeNode.inline)
+        self.assertFalse(TextRunTreeNode.close_inlines)
+        self.assertIsNone(TextRunTreeNode.canonical_tag_name)
+        self.assertEqual((), TextRunTreeNode.alias_tag_names)
+        self.assertFalse(TextRunTreeNode.make_paragraphs_here)
+
+    def test_content(self):
+        """ Test the ``content`` property. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['Hello', '\n', 'world'])
+        self.assertEqual('Helloworld', tree_node.content)
+        tree_node.content = 'foobar'
+        self.assertEqual(['foobar'], tree_node.text_pieces)
+        tree_node.content = ''
+        self.assertEqual([], tree_node.text_pieces)
+
+    def test_get_structural_hash_data(self):
+        """ Test the ``get_structural_hash_data`` method (newline pieces included). """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['Hello', '\n', 'world'])
+        other_tree_node = root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['Helloworld'])
+        self.assertEqual((None, (), 'Helloworld', ('Hello', '\n', 'world')), tree_node.get_structural_hash_data())
+        self.assertNotEqual(tree_node.get_structural_hash_data(), other_tree_node.get_structural_hash_data())
+
+    def test_render_html(self):
+        """ Test the ``render_html`` method. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['<test>', '\n', '&lt;test&gt;'])
+        self.assertEqual('&lt;test&gt;\n&lt;test&gt;', tree_node.render_html(''))
+
+    def test_render_text(self):
+        """ Test the ``render_text`` method. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['<test>', '\n', '&lt;test&gt;'])
+        self.assertEqual('<test> <test>', tree_node.render_text(''))
@@ -4,8 +4,19 @@ SkCode tag dictionary builder test code.
 
 import unittest
 
-from skcode.etree import TreeNode
-from skcode.tags import build_recognized_tags_dict
+from skcode.etree import (
+    TreeNode,
+    NODE_FLAG_INLINE,
+    NODE_FLAG_CLOSE_INLINES,
+    NODE_FLAG_PARSE_EMBEDDED,
+    NODE_FLAG_STANDALONE
+)
+from skcode.tags import (
+    build_recognized_tags_dict,
+    build_tag_dispatch_table,
+    TagDispatchTable,
+    DEFAULT_RECOGNIZED_TAGS_LIST
+)
 
 
 class UnamedTreeNode(TreeNode):
@@ -86,3 +97,48 @@ class TagsDictionaryBuilderTestCase(unittest.TestCase):
         with self.assertRaises(KeyError) as e:
             build_recognized_tags_dict(known_tags)
         self.assertEqual('\'Alias name "debug" is already registered\'', str(e.exception))
+
+    def test_build_tag_dispatch_table(self):
+        """ Test if the ``build_tag_dispatch_table`` helper do it's job """
+        other_tag_cls = type('OtherTreeNode', (TreeNode, ), {'canonical_tag_name': 'test2', 'inline': True})
+        known_tags = build_recognized_tags_dict((DummyTreeNode, other_tag_cls))
+        dispatch_table = build_tag_dispatch_table(known_tags)
+        self.assertEqual({
+            'test': (DummyTreeNode, 0, NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_CLOSE_INLINES),
+            'debug': (DummyTreeNode, 0, NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_CLOSE_INLINES),
+            'test2': (other_tag_cls, 1, NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_INLINE | NODE_FLAG_CLOSE_INLINES),
+        }, dispatch_table)
+
+    def test_build_tag_dispatch_table_options_overload(self):
+        """ Test if the ``build_tag_dispatch_table`` helper handle class options overload """
+        known_tags = build_recognized_tags_dict((DummyTreeNode, ))
+        dispatch_table = build_tag_dispatch_table(known_tags, {
+            DummyTreeNode: {
+                'inline': True,
+                'close_inlines': False,
+                'standalone': True,
+            },
+        })
+        self.assertEqual((DummyTreeNode, 0, NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_INLINE | NODE_FLAG_STANDALONE),
+                         dispatch_table['test'])
+
+    def test_tag_dispatch_table_on_demand(self):
+        """ Test if the ``TagDispatchTable`` build entries on demand, with one type ID per tag class """
+        other_tag_cls = type('OtherTreeNode', (TreeNode, ), {'canonical_tag_name': 'test2', 'inline': True})
+        known_tags = build_recognized_tags_dict((DummyTreeNode, other_tag_cls))
+        dispatch_table = TagDispatchTable(known_tags)
+        self.assertEqual({}, dispatch_table)
+        self.assertEqual((other_tag_cls, 0, NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_INLINE | NODE_FLAG_CLOSE_INLINES),
+                         dispatch_table['test2'])
+        self.assertEqual((DummyTreeNode, 1, NODE_FLAG_PARSE_EMBEDDED | NODE_FLAG_CLOSE_INLINES),
+                         dispatch_table['debug'])
+        self.assertIs(dispatch_table['debug'], dispatch_table['test'])
+        self.assertEqual({'test2', 'debug', 'test'}, set(dispatch_table))
+        with self.assertRaises(KeyError):
+            dispatch_table['unknown']
+
+    def test_default_tags_slots(self):
+        """ Test if all default tag classes use slots (no per-instance dictionary for the node data) """
+        for tag_class in DEFAULT_RECOGNIZED_TAGS_LIST:
+            for cls in tag_class.__mro__[:tag_class.__mro__.index(TreeNode)]:
+                self.assertIn('__slots__', vars(cls), cls.__name__)
@@ -2,6 +2,8 @@
 SkCode coloured text tag definitions test code.
 """
 
+import pickle
+import sys
 import unittest
 
 from skcode.etree import RootTreeNode
@@ -157,3 +159,11 @@ class FixedTextColorTagTestCase(unittest.TestCase):
         tree_node = root_tree_node.new_child('alert', cls, attrs={})
         color_value = tree_node.get_color_value()
         self.assertEqual('customtype', color_value)
+
+    def test_generated_cls_registered(self):
+        """ Test if the generated classes are registered under stable, importable names. """
+        cls = generate_fixed_color_text_cls('customtype')
+        self.assertIs(cls, generate_fixed_color_text_cls('customtype'))
+        self.assertIsNot(cls, generate_fixed_color_text_cls('customtype', canonical_tag_name='foobar'))
+        self.assertIs(cls, getattr(sys.modules[cls.__module__], cls.__qualname__))
+        self.assertIs(cls, pickle.loads(pickle.dumps(cls)))
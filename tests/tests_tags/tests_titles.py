@@ -2,6 +2,8 @@
 SkCode title tag definitions test code.
 """
 
+import pickle
+import sys
 import unittest
 from unittest import mock
 
@@ -114,3 +116,19 @@ class TitleTreeNodeTestCase(unittest.TestCase):
         self.assertEqual('h1', cls.html_tagname)
         self.assertEqual('h1', cls.canonical_tag_name)
         self.assertEqual((), cls.alias_tag_names)
+
+    def test_generated_cls_registered(self):
+        """ Test if the generated classes are registered under stable, importable names. """
+        cls = generate_title_cls(1)
+        self.assertIs(cls, generate_title_cls(1))
+        self.assertIsNot(cls, generate_title_cls(2))
+        self.assertIs(cls, getattr(sys.modules[cls.__module__], cls.__qualname__))
+        self.assertIs(cls, pickle.loads(pickle.dumps(cls)))
+
+    def test_generated_cls_tree_node_pickle(self):
+        """ Test if the tree nodes of generated classes can be pickled. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child('h2', generate_title_cls(2), attrs={'id': 'test'}, content='Hello')
+        new_root_tree_node = pickle.loads(pickle.dumps(root_tree_node))
+        self.assertIs(generate_title_cls(2), new_root_tree_node.children[0].__class__)
+        self.assertEqual({'id': 'test'}, new_root_tree_node.children[0].attrs)
@@ -2,10 +2,18 @@
 SkCode tag tokenizer test code.
 """
 
+import io
+import mmap
+import tempfile
 import unittest
 
 from skcode.tokenizer import (
+    normalize_newlines,
     tokenize_tag,
+    tokenize_tag_cached,
+    tokenize_tag_spans,
+    tokenize_tag_stream,
+    iter_text_chunks,
     TOKEN_DATA,
     TOKEN_NEWLINE,
     TOKEN_OPEN_TAG,
@@ -116,3 +124,195 @@ class TokenizerTestCase(unittest.TestCase):
         for text, excepted_result in self.PASS_TESTS:
             result = tuple(tokenize_tag(text, opening_tag_ch='[', closing_tag_ch=']'))
             self.assertEqual(result, excepted_result, msg=text)
+
+    def test_functional_spans(self):
+        """ Functional tests of span tokens. """
+        for text, excepted_result in self.PASS_TESTS:
+            text = normalize_newlines(text)
+            result = tuple((token_type, tag_name, tag_attrs, text[start:end])
+                           for token_type, tag_name, tag_attrs, start, end in tokenize_tag_spans(text))
+            self.assertEqual(result, excepted_result, msg=text)
+
+    def test_spans_offsets(self):
+        """ Test if span tokens give the offsets of each token in the text. """
+        result = tuple(tokenize_tag_spans('a\n\n[b]bold[/b]\nc'))
+        self.assertEqual(result, (
+            (TOKEN_DATA, None, None, 0, 1),
+            (TOKEN_NEWLINE, None, None, 1, 2),
+            (TOKEN_NEWLINE, None, None, 2, 3),
+            (TOKEN_OPEN_TAG, 'b', {}, 3, 6),
+            (TOKEN_DATA, None, None, 6, 10),
+            (TOKEN_CLOSE_TAG, 'b', {}, 10, 14),
+            (TOKEN_NEWLINE, None, None, 14, 15),
+            (TOKEN_DATA, None, None, 15, 16),
+        ))
+
+    def test_raw_block(self):
+        """ Test if the raw block content is yielded at once up to the matching closing tag. """
+        tokens = tokenize_tag('[code]a[b]\nc[/b][x="[/code]"][/CODE ][/code]d\n')
+        self.assertEqual(next(tokens), (TOKEN_OPEN_TAG, 'code', {}, '[code]'))
+        self.assertIsNone(tokens.send('code'))
+        self.assertEqual(tuple(tokens), (
+            (TOKEN_DATA, None, None, 'a[b]\nc[/b][x="[/code]"]'),
+            (TOKEN_CLOSE_TAG, 'code', {}, '[/CODE ]'),
+            (TOKEN_CLOSE_TAG, 'code', {}, '[/code]'),
+            (TOKEN_DATA, None, None, 'd'),
+            (TOKEN_NEWLINE, None, None, '\n'),
+        ))
+
+    def test_raw_block_unclosed(self):
+        """ Test if an unclosed raw block content is yielded at once up to the end of the text. """
+        tokens = tokenize_tag_spans('[code]a[b]\nc')
+        self.assertEqual(next(tokens), (TOKEN_OPEN_TAG, 'code', {}, 0, 6))
+        self.assertIsNone(tokens.send('code'))
+        self.assertEqual(tuple(tokens), (
+            (TOKEN_DATA, None, None, 6, 12),
+        ))
+
+    def test_raw_block_stream(self):
+        """ Test if the raw block protocol work across chunks with the streaming tokenizer. """
+        text = '[code]a[b]\nc[/b]\n[x="[/code]"]\n[/code]d'
+        for chunk_size in range(1, len(text) + 1):
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            tokens = tokenize_tag_stream(chunks, max_tag_length=16)
+            self.assertEqual(next(tokens), (TOKEN_OPEN_TAG, 'code', {}, '[code]'))
+            self.assertIsNone(tokens.send('code'))
+            tokens = tuple(tokens)
+            self.assertEqual(''.join(token[3] for token in tokens[:-2]), 'a[b]\nc[/b]\n[x="[/code]"]\n')
+            self.assertEqual(tokens[-2:], (
+                (TOKEN_CLOSE_TAG, 'code', {}, '[/code]'),
+                (TOKEN_DATA, None, None, 'd'),
+            ))
+
+    def test_lazy_attrs(self):
+        """ Test if tag attributes are only checked in lazy attributes mode. """
+        result = tuple(tokenize_tag('[url=http://example.com/ a=b]link[/url][b]', lazy_attrs=True))
+        self.assertEqual(result, (
+            (TOKEN_OPEN_TAG, 'url', 4, '[url=http://example.com/ a=b]'),
+            (TOKEN_DATA, None, None, 'link'),
+            (TOKEN_CLOSE_TAG, 'url', None, '[/url]'),
+            (TOKEN_OPEN_TAG, 'b', None, '[b]'),
+        ))
+
+    def test_recognized_tag_names(self):
+        """ Test if unknown tags are kept as raw data when a set of recognized tag names is given. """
+        result = tuple(tokenize_tag('[b]array[i] and [foo]bar[/foo][/b]', recognized_tag_names={'b', 'i'}))
+        self.assertEqual(result, (
+            (TOKEN_OPEN_TAG, 'b', {}, '[b]'),
+            (TOKEN_DATA, None, None, 'array'),
+            (TOKEN_OPEN_TAG, 'i', {}, '[i]'),
+            (TOKEN_DATA, None, None, ' and [foo]bar[/foo]'),
+            (TOKEN_CLOSE_TAG, 'b', {}, '[/b]'),
+        ))
+
+    def test_max_tag_length(self):
+        """ Test if tags longer than the maximum tag length are kept as raw data. """
+        result = tuple(tokenize_tag('[url="http://example.com/"]link[/url]', max_tag_length=16))
+        self.assertEqual(result, (
+            (TOKEN_DATA, None, None, '[url="http://example.com/"]link'),
+            (TOKEN_CLOSE_TAG, 'url', {}, '[/url]'),
+        ))
+
+    def test_max_attrs_count(self):
+        """ Test if tags with too many attributes are kept as raw data. """
+        result = tuple(tokenize_tag('[test a b c][test a b]', max_attrs_count=2))
+        self.assertEqual(result, (
+            (TOKEN_DATA, None, None, '[test a b c]'),
+            (TOKEN_OPEN_TAG, 'test', {'a': '', 'b': ''}, '[test a b]'),
+        ))
+
+    def test_adversarial_input(self):
+        """ Test if adversarial input (unterminated tags, tags over the limits) is kept as a single raw data token. """
+        for adversarial_text in ('[a="', "[a='x ", '[a b c d ', '[a=b c=d e', '[/a', '[ ' + ' ' * 20):
+            text = adversarial_text * 100
+            result = tuple(tokenize_tag(text, max_tag_length=256))
+            self.assertEqual(result, ((TOKEN_DATA, None, None, text), ), msg=adversarial_text)
+
+    def test_adversarial_input_over_limits(self):
+        """ Test if valid tags after tags over the length and attributes limits are still found. """
+        text = '[test ' + 'a ' * 40 + ']' + '[url="' + 'x' * 300 + '"]' + '[b]'
+        result = tuple(tokenize_tag(text, max_tag_length=256, max_attrs_count=32))
+        self.assertEqual(result, (
+            (TOKEN_DATA, None, None, text[:-3]),
+            (TOKEN_OPEN_TAG, 'b', {}, '[b]'),
+        ))
+
+    def test_adversarial_unterminated_tag(self):
+        """ Test if a huge unterminated tag followed by many opening chars does not hide the next valid tag. """
+        text = '[a="' + '[b x=y ' * 100
+        result = tuple(tokenize_tag(text + '[b]x', max_tag_length=256))
+        self.assertEqual(result, (
+            (TOKEN_DATA, None, None, text),
+            (TOKEN_OPEN_TAG, 'b', {}, '[b]'),
+            (TOKEN_DATA, None, None, 'x'),
+        ))
+
+    def test_tokenize_stream(self):
+        """ Test if the streaming tokenizer yield the same tokens as the whole text tokenizer. """
+        text = '[b]Hello\r\nworld[/b]\r[url="http://example.com/"]link[/url] [test a b c]\n[/a'
+        expected = tuple(tokenize_tag(text))
+        for chunk_size in range(1, len(text) + 1):
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            self.assertEqual(tuple(tokenize_tag_stream(chunks)), expected, msg=chunk_size)
+
+    def test_tokenize_stream_with_limit(self):
+        """ Test if the streaming tokenizer handle tags longer than the maximum tag length. """
+        text = '[url="http://example.com/"]link[/url]\n[b]bold[/b]'
+        expected = tuple(tokenize_tag(text, max_tag_length=16))
+        for chunk_size in range(1, len(text) + 1):
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            result = tuple(tokenize_tag_stream(chunks, max_tag_length=16))
+            self.assertEqual(result, expected, msg=chunk_size)
+
+    def test_tokenize_stream_long_line(self):
+        """ Test if the streaming tokenizer handle long lines split across many chunks. """
+        text = 'x' * 300 + '\r' + 'y' * 300 + '\r\n[b]' + 'z' * 300 + '[/b]' + 'w' * 300 + '\r'
+        expected = tuple(tokenize_tag(text, max_tag_length=16))
+        for chunk_size in (1, 2, 3, 7, 64):
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            result = tuple(tokenize_tag_stream(chunks, max_tag_length=16))
+            self.assertEqual(result, expected, msg=chunk_size)
+
+    def test_tokenize_stream_file_object(self):
+        """ Test if the streaming tokenizer accept file-like objects. """
+        text = '[b]Hello\nworld[/b]\n' * 100
+        result = tuple(tokenize_tag_stream(io.StringIO(text)))
+        self.assertEqual(result, tuple(tokenize_tag(text)))
+
+    def test_tokenize_bytes(self):
+        """ Test if bytes-like objects give the same tokens as the decoded text. """
+        text = '[url="h\u00e9llo"]\u20ac\r\n[b]\U0001f600[/b]\r' * 100
+        expected = tuple(tokenize_tag(text))
+        data = text.encode('utf-8')
+        for source in (data, bytearray(data), memoryview(data)):
+            self.assertEqual(tuple(tokenize_tag(source)), expected)
+            self.assertEqual(tuple(tokenize_tag(source, max_tag_length=0)), expected)
+
+    def test_tokenize_mmap(self):
+        """ Test if a mmap of a file give the same tokens as the decoded text. """
+        text = '[b]h\u00e9llo[/b]\r\nworld\n' * 10000
+        with tempfile.TemporaryFile() as source_file:
+            source_file.write(text.encode('utf-8'))
+            source_file.flush()
+            with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source_map:
+                self.assertEqual(tuple(tokenize_tag(source_map)), tuple(tokenize_tag(text)))
+
+    def test_iter_text_chunks_split_chars(self):
+        """ Test if multi-bytes chars split across chunks are decoded. """
+        data = 'h\u00e9llo \u20ac \U0001f600'.encode('utf-8')
+        chunks = [data[i:i + 1] for i in range(len(data))]
+        self.assertEqual(''.join(iter_text_chunks(chunks)), 'h\u00e9llo \u20ac \U0001f600')
+        self.assertEqual(''.join(iter_text_chunks(data, chunk_size=3)), 'h\u00e9llo \u20ac \U0001f600')
+        self.assertEqual(''.join(iter_text_chunks(io.BytesIO(data), chunk_size=3)), 'h\u00e9llo \u20ac \U0001f600')
+
+    def test_tokenize_cached(self):
+        """ Test if the tokens are cached by text and tokenizer options. """
+        tokenize_tag_cached.cache_clear()
+        text = '[url=http://example.com/]link[/url] [foo=bar]'
+        tokens = tokenize_tag_cached(text)
+        self.assertEqual(tokens, tuple(tokenize_tag(text, lazy_attrs=True)))
+        self.assertIs(tokens, tokenize_tag_cached(text))
+        self.assertEqual(1, tokenize_tag_cached.cache_info().hits)
+        other_tokens = tokenize_tag_cached(text, recognized_tag_names=frozenset(('url', )))
+        self.assertIsNot(tokens, other_tokens)
+        self.assertEqual(other_tokens[-1], (TOKEN_DATA, None, None, ' [foo=bar]'))
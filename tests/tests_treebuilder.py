@@ -4,8 +4,18 @@ SkCode tree builder test code.
 
 import unittest
 
-from skcode import parse_skcode
-from skcode.tags import TextTreeNode, NewlineTreeNode
+from skcode import parse_skcode, parse_skcode_stream, parse_skcode_tokens
+from skcode.treebuilder import (
+    get_processing_hooks,
+    process_tree,
+    sanitize_tree,
+    PROCESSING_HOOK_PRE_PROCESS,
+    PROCESSING_HOOK_SANITIZE,
+    PROCESSING_HOOK_POST_PROCESS
+)
+from skcode.tokenizer import tokenize_tag, tokenize_tag_cached, TOKEN_DATA, TOKEN_OPEN_TAG, TOKEN_CLOSE_TAG
+from skcode.tags import TextTreeNode, NewlineTreeNode, TextRunTreeNode
+from skcode.render import render_to_html, render_to_text
 from skcode.etree import TreeNode, RootTreeNode
 
 
@@ -127,6 +137,49 @@ class ParserTestCase(unittest.TestCase):
         self.assertEqual('', close_error.source_close_tag)
         self.assertEqual('Unknown tag name', close_error.error_message)
 
+    def test_unknown_tag_as_data(self):
+        """ Test the tree builder with an unknown tag name and the ``unknown_tags_as_data`` option set """
+        known_tags = (
+            DummyTreeNode,
+        )
+        document_tree = parse_skcode('[test]x = [foo]a[1][/foo][/test]', recognized_tags=known_tags,
+                                     unknown_tags_as_data=True)
+        self.assertIsInstance(document_tree, RootTreeNode)
+        self.assertEqual(1, len(document_tree.children))
+        tree_node = document_tree.children[0]
+        self.assertIsInstance(tree_node, DummyTreeNode)
+        self.assertEqual(1, len(tree_node.children))
+        child_node = tree_node.children[0]
+        self.assertIsInstance(child_node, TextTreeNode)
+        self.assertEqual('x = [foo]a[1][/foo]', child_node.content)
+        self.assertEqual('', child_node.source_open_tag)
+        self.assertEqual('', child_node.error_message)
+        self.assertEqual('[/test]', tree_node.source_close_tag)
+
+    def test_max_tag_length(self):
+        """ Test the tree builder with the ``max_tag_length`` option set """
+        known_tags = (
+            DummyTreeNode,
+        )
+        document_tree = parse_skcode('[test key="value"]', recognized_tags=known_tags, max_tag_length=10)
+        self.assertIsInstance(document_tree, RootTreeNode)
+        self.assertEqual(1, len(document_tree.children))
+        child_node = document_tree.children[0]
+        self.assertIsInstance(child_node, TextTreeNode)
+        self.assertEqual('[test key="value"]', child_node.content)
+
+    def test_max_attrs_count(self):
+        """ Test the tree builder with the ``max_attrs_count`` option set """
+        known_tags = (
+            DummyTreeNode,
+        )
+        document_tree = parse_skcode('[test a b c]', recognized_tags=known_tags, max_attrs_count=2)
+        self.assertIsInstance(document_tree, RootTreeNode)
+        self.assertEqual(1, len(document_tree.children))
+        child_node = document_tree.children[0]
+        self.assertIsInstance(child_node, TextTreeNode)
+        self.assertEqual('[test a b c]', child_node.content)
+
     def test_data(self):
         """ Test the tree builder with some raw text data """
         document_tree = parse_skcode('Foobar')
@@ -330,6 +383,32 @@ class ParserTestCase(unittest.TestCase):
         self.assertEqual(0, len(child_node.children))
         self.assertEqual('', child_node.error_message)
 
+    def test_same_tag_close_alias(self):
+        """ Test if ``same_tag_closes=True`` closes the current node on an alias of the same tag """
+        known_tags = (
+            get_dummy_node(same_tag_closes=True, alias_tag_names=('alias', )),
+            get_dummy_node(canonical_tag_name='other', same_tag_closes=True),
+        )
+        document_tree = parse_skcode('[test][alias][other][other]', recognized_tags=known_tags)
+        self.assertEqual(2, len(document_tree.children))
+        self.assertEqual('test', document_tree.children[0].name)
+        self.assertEqual(0, len(document_tree.children[0].children))
+        child_node = document_tree.children[1]
+        self.assertEqual('alias', child_node.name)
+        self.assertEqual(['other', 'other'], [tree_node.name for tree_node in child_node.children])
+        self.assertEqual(0, len(child_node.children[0].children))
+
+    def test_same_tag_close_subclass(self):
+        """ Test if ``same_tag_closes=True`` closes the current node on a tag of a base class of the node class """
+        base_tag_cls = get_dummy_node(canonical_tag_name='base', same_tag_closes=True)
+        sub_tag_cls = type('SubDummyTreeNode', (base_tag_cls, ), {'canonical_tag_name': 'sub', 'alias_tag_names': ()})
+        known_tags = (base_tag_cls, sub_tag_cls)
+        document_tree = parse_skcode('[sub][base][base][sub]', recognized_tags=known_tags)
+        self.assertEqual(['sub', 'base', 'base'], [tree_node.name for tree_node in document_tree.children])
+        self.assertEqual(0, len(document_tree.children[0].children))
+        self.assertEqual(0, len(document_tree.children[1].children))
+        self.assertEqual(['sub'], [tree_node.name for tree_node in document_tree.children[2].children])
+
     def test_close_inline(self):
         """ Test the tree builder handle ``close_inlines=True`` when handling a tag """
         known_tags = (
@@ -614,3 +693,429 @@ class ParserTestCase(unittest.TestCase):
         self.assertTrue(sub_test_node.sanitized)
         self.assertEqual([test_node], sub_test_node.breadcrumb)
         self.assertTrue(sub_test_node.post_processed)
+
+    def test_parse_stream(self):
+        """ Test if the streaming parser yield the top-level nodes of the document. """
+        known_tags = (
+            DummyTreeNode,
+        )
+        text = '  [test]Hello\n[test]world[/test][/test] raw\n[/test]  '
+        document_tree = parse_skcode(text, recognized_tags=known_tags)
+        for chunk_size in range(1, len(text) + 1):
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            top_level_nodes = list(parse_skcode_stream(chunks, recognized_tags=known_tags))
+            self.assertEqual(len(document_tree.children), len(top_level_nodes))
+            for expected_node, node in zip(document_tree.children, top_level_nodes):
+                self.assertEqual(expected_node.__class__, node.__class__)
+                self.assertEqual(expected_node.name, node.name)
+                self.assertEqual(expected_node.get_raw_content(), node.get_raw_content())
+                self.assertEqual(expected_node.source_open_tag, node.source_open_tag)
+                self.assertEqual(expected_node.source_close_tag, node.source_close_tag)
+                self.assertEqual(expected_node.error_message, node.error_message)
+                self.assertEqual(len(expected_node.children), len(node.children))
+                self.assertIsInstance(node.root_tree_node, RootTreeNode)
+                self.assertEqual([], node.root_tree_node.children)
+                self.assertEqual([], node.root_tree_node.indexed_nodes)
+
+    def test_parse_stream_yield_closed_nodes(self):
+        """ Test if the streaming parser yield each top-level node as soon as it is closed. """
+        known_tags = (
+            DummyTreeNode,
+        )
+
+        def get_chunks():
+            yield '[test]first[/test]\n'
+            yield '[test]second'
+            raise AssertionError('Too many chunks read')
+
+        nodes = parse_skcode_stream(get_chunks(), recognized_tags=known_tags)
+        first_node = next(nodes)
+        self.assertEqual('test', first_node.name)
+        self.assertEqual('first', first_node.get_raw_content())
+
+    def test_cycle_free(self):
+        """ Test if the cycle-free document trees are rendered like the default document trees. """
+        text = '[quote author="John"]Hello [b]world[/b]![/quote]\n\n[list][*]foo\n[*][i]bar[/i][/list][u]baz'
+        document_tree = parse_skcode(text)
+        cycle_free_document_tree = parse_skcode(text, cycle_free=True)
+        self.assertTrue(cycle_free_document_tree.cycle_free)
+        self.assertEqual(render_to_html(document_tree), render_to_html(cycle_free_document_tree))
+        self.assertEqual(render_to_text(document_tree), render_to_text(cycle_free_document_tree))
+        tree_node = cycle_free_document_tree.children[0].children[0]
+        self.assertIs(cycle_free_document_tree, tree_node.root_tree_node)
+        self.assertIs(cycle_free_document_tree.children[0], tree_node.parent)
+
+    def test_structural_hashes(self):
+        """ Test if the structural hashes are computed by the tree builder when requested. """
+        quote = '[quote author="John"]Hello [b]world[/b]![/quote]'
+        text = quote + '\nfoo\n' + quote + '\n[quote author="Jane"]Hello [b]world[/b]![/quote]'
+        self.assertIsNone(parse_skcode(text).structural_hash)
+        for kwargs in ({}, {'source_spans': True}, {'use_tokens_cache': True}, {'lazy_attrs': False}):
+            document_tree = parse_skcode(text, structural_hashes=True, **kwargs)
+            self.assertEqual(16, len(document_tree.structural_hash))
+            for tree_node in TreeNode.search_in_tree(document_tree, TreeNode):
+                self.assertIsNotNone(tree_node.structural_hash)
+            first_quote, second_quote, other_quote = (document_tree.children[i] for i in (0, 4, 6))
+            self.assertEqual(first_quote.structural_hash, second_quote.structural_hash)
+            self.assertNotEqual(first_quote.structural_hash, other_quote.structural_hash)
+            self.assertEqual(first_quote.children[1].structural_hash, other_quote.children[1].structural_hash)
+            self.assertEqual(parse_skcode(quote, structural_hashes=True).children[0].structural_hash,
+                             first_quote.structural_hash)
+
+    def test_structural_hashes_fast_paths(self):
+        """ Test if the structural hashes are computed for tag-free and empty texts. """
+        document_tree = parse_skcode('Hello\nworld', structural_hashes=True)
+        self.assertIsNotNone(document_tree.structural_hash)
+        self.assertEqual(document_tree.children[1].structural_hash, parse_skcode('a\nb', structural_hashes=True)
+                         .children[1].structural_hash)
+        self.assertIsNotNone(parse_skcode('  ', structural_hashes=True).structural_hash)
+        document_tree = parse_skcode_tokens(tokenize_tag_cached('[b]foo[/b]'), structural_hashes=True)
+        self.assertIsNotNone(document_tree.children[0].structural_hash)
+
+    def test_nodes_index(self):
+        """ Test if the nodes index of the document is filled by the tree builder. """
+        known_tags = (
+            DummyTreeNode,
+        )
+        document_tree = parse_skcode('[test]Hello\n[test]world[/test][/test]foo\n[test]bar',
+                                     recognized_tags=known_tags)
+        self.assertIsNotNone(document_tree.indexed_nodes)
+        self.assertEqual(list(TreeNode.search_in_tree(document_tree, TreeNode))[1:], document_tree.indexed_nodes)
+        self.assertEqual(list(TreeNode.search_in_tree(document_tree, DummyTreeNode)),
+                         list(document_tree.search_in_tree(DummyTreeNode, use_index=True)))
+
+    def test_source_spans(self):
+        """ Test if nodes keep the source spans of their content and tags when requested. """
+        known_tags = (
+            DummyTreeNode,
+            get_dummy_node(canonical_tag_name='code', parse_embedded=False),
+        )
+        text = '  [test]Hello\r\n[code]a [test] b[/code][/test][/test]  '
+        document_tree = parse_skcode(text, recognized_tags=known_tags, source_spans=True)
+        self.assertEqual('[test]Hello\n[code]a [test] b[/code][/test][/test]', document_tree.source_text)
+        self.assertEqual(2, len(document_tree.children))
+        test_node = document_tree.children[0]
+        self.assertEqual((0, 6), test_node.source_open_tag_span)
+        self.assertEqual((35, 42), test_node.source_close_tag_span)
+        self.assertEqual('[test]', test_node.source_open_tag)
+        self.assertEqual('[/test]', test_node.source_close_tag)
+        text_node, newline_node, code_node = test_node.children
+        self.assertEqual((6, 11), text_node.content_span)
+        self.assertEqual('Hello', text_node.content)
+        self.assertEqual('', newline_node.content)
+        self.assertEqual((18, 28), code_node.content_span)
+        self.assertEqual('a [test] b', code_node.content)
+        self.assertEqual('[/code]', code_node.source_close_tag)
+        error_node = document_tree.children[1]
+        self.assertEqual('[/test]', error_node.source_close_tag)
+        self.assertEqual('Unexpected closing tag', error_node.error_message)
+
+    def test_source_spans_same_result(self):
+        """ Test if the document tree is the same with or without source spans. """
+        known_tags = (
+            DummyTreeNode,
+            get_dummy_node(canonical_tag_name='code', parse_embedded=False),
+        )
+        text = '[test]Hello\n[code]a [test] b[/code][/test][/test] [foo]\n[test/] end'
+        expected = parse_skcode(text, recognized_tags=known_tags)
+        result = parse_skcode(text, recognized_tags=known_tags, source_spans=True)
+        expected_nodes = [expected]
+        result_nodes = [result]
+        while expected_nodes:
+            expected_node = expected_nodes.pop()
+            result_node = result_nodes.pop()
+            self.assertEqual(expected_node.__class__, result_node.__class__)
+            self.assertEqual(expected_node.content, result_node.content)
+            self.assertEqual(expected_node.source_open_tag, result_node.source_open_tag)
+            self.assertEqual(expected_node.source_close_tag, result_node.source_close_tag)
+            self.assertEqual(expected_node.error_message, result_node.error_message)
+            self.assertEqual(len(expected_node.children), len(result_node.children))
+            expected_nodes.extend(expected_node.children)
+            result_nodes.extend(result_node.children)
+
+    def test_raw_block(self):
+        """ Test if the content of a node with ``parse_embedded=False`` is kept as raw content. """
+        known_tags = (
+            DummyTreeNode,
+            get_dummy_node(canonical_tag_name='code', parse_embedded=False),
+        )
+        text = '[code]a [test]b\n[/test][x="[/code]"][/CODE ][test]c[/test]'
+        document_tree = parse_skcode(text, recognized_tags=known_tags)
+        self.assertEqual(2, len(document_tree.children))
+        code_node = document_tree.children[0]
+        self.assertEqual('a [test]b\n[/test][x="[/code]"]', code_node.content)
+        self.assertEqual([], code_node.children)
+        self.assertEqual('[/CODE ]', code_node.source_close_tag)
+        self.assertEqual('test', document_tree.children[1].name)
+
+    def test_raw_block_single_data_token(self):
+        """ Test if the content of a big raw block is tokenized as a single data token. """
+        known_tags = (
+            get_dummy_node(canonical_tag_name='code', parse_embedded=False),
+        )
+        code_lines = 'int v = arr[i] * m[j][k]; // [b]text[/b]\n' * 1000
+        text = '[code]' + code_lines + '[/code]'
+        tokens = tokenize_tag(text)
+        self.assertEqual((TOKEN_OPEN_TAG, 'code', {}, '[code]'), next(tokens))
+        self.assertIsNone(tokens.send('code'))
+        self.assertEqual([
+            (TOKEN_DATA, None, None, code_lines),
+            (TOKEN_CLOSE_TAG, 'code', {}, '[/code]'),
+        ], list(tokens))
+        document_tree = parse_skcode(text, recognized_tags=known_tags)
+        self.assertEqual(code_lines, document_tree.children[0].content)
+
+    def test_lazy_attrs(self):
+        """ Test if the attributes of nodes are the same with or without lazy attributes. """
+        known_tags = (
+            DummyTreeNode,
+        )
+        text = '[test=value key="a \\" b"]Hello[/test] [test a b=c][/test] [test]'
+        for source_spans in (False, True):
+            document_tree = parse_skcode(text, recognized_tags=known_tags, source_spans=source_spans)
+            self.assertEqual({'test': 'value', 'key': 'a " b'}, document_tree.children[0].attrs)
+            self.assertEqual({'a': '', 'b': 'c'}, document_tree.children[2].attrs)
+            self.assertEqual({}, document_tree.children[4].attrs)
+            eager_document_tree = parse_skcode(text, recognized_tags=known_tags, lazy_attrs=False)
+            self.assertEqual(eager_document_tree.children[0].attrs, document_tree.children[0].attrs)
+
+    def test_parse_bytes(self):
+        """ Test if parsing bytes-like objects give the same document tree as parsing the decoded text. """
+        known_tags = (
+            DummyTreeNode,
+            get_dummy_node(canonical_tag_name='code', parse_embedded=False),
+        )
+        text = '  \r\n[test=h\u00e9llo]\u20ac\r\n[code]a [test] \U0001f600\r\n[/code][/test][/test]  \n'
+        expected = parse_skcode(text, recognized_tags=known_tags)
+        for source in (text.encode('utf-8'), memoryview(text.encode('utf-8'))):
+            for source_spans in (False, True):
+                result = parse_skcode(source, recognized_tags=known_tags, source_spans=source_spans)
+                expected_nodes = [expected]
+                result_nodes = [result]
+                while expected_nodes:
+                    expected_node = expected_nodes.pop()
+                    result_node = result_nodes.pop()
+                    self.assertEqual(expected_node.__class__, result_node.__class__)
+                    self.assertEqual(expected_node.attrs, result_node.attrs)
+                    self.assertEqual(expected_node.content, result_node.content)
+                    self.assertEqual(expected_node.source_open_tag, result_node.source_open_tag)
+                    self.assertEqual(expected_node.source_close_tag, result_node.source_close_tag)
+                    self.assertEqual(expected_node.error_message, result_node.error_message)
+                    self.assertEqual(len(expected_node.children), len(result_node.children))
+                    expected_nodes.extend(expected_node.children)
+                    result_nodes.extend(result_node.children)
+
+    def test_parse_empty_bytes(self):
+        """ Test if parsing blank bytes give an empty document tree. """
+        document_tree = parse_skcode(b'  \r\n ')
+        self.assertIsInstance(document_tree, RootTreeNode)
+        self.assertEqual([], document_tree.children)
+
+    def test_parse_tokens(self):
+        """ Test if the same tokens can be used to build several document trees with different options. """
+        known_tags = (
+            DummyTreeNode,
+            get_dummy_node(canonical_tag_name='code', parse_embedded=False),
+        )
+        text = '[test=value]Hello [code]a [test] b[/code] [test]'
+        tokens = tokenize_tag_cached(text)
+        for options in ({}, {'mark_unclosed_tags_as_erroneous': True}, {'recognized_tags': known_tags[:1]}):
+            options.setdefault('recognized_tags', known_tags)
+            expected = parse_skcode(text, **options)
+            result = parse_skcode_tokens(tokens, **options)
+            expected_nodes = [expected]
+            result_nodes = [result]
+            while expected_nodes:
+                expected_node = expected_nodes.pop()
+                result_node = result_nodes.pop()
+                self.assertEqual(expected_node.__class__, result_node.__class__)
+                self.assertEqual(expected_node.attrs, result_node.attrs)
+                self.assertEqual(expected_node.content, result_node.content)
+                self.assertEqual(expected_node.source_open_tag, result_node.source_open_tag)
+                self.assertEqual(expected_node.error_message, result_node.error_message)
+                self.assertEqual(len(expected_node.children), len(result_node.children))
+                expected_nodes.extend(expected_node.children)
+                result_nodes.extend(result_node.children)
+
+    def test_parse_tokens_attrs_not_shared(self):
+        """ Test if document trees built from the same tokens do not share attributes dictionaries. """
+        known_tags = (
+            DummyTreeNode,
+        )
+        tokens = tokenize_tag_cached('[test=value]Hello[/test]')
+        document_tree = parse_skcode_tokens(tokens, recognized_tags=known_tags)
+        document_tree.children[0].attrs['test'] = 'modified'
+        other_document_tree = parse_skcode_tokens(tokens, recognized_tags=known_tags)
+        self.assertEqual({'test': 'value'}, other_document_tree.children[0].attrs)
+
+    def test_parse_with_tokens_cache(self):
+        """ Test if the tokens cache give the same document tree. """
+        known_tags = (
+            DummyTreeNode,
+        )
+        text = '[test=value]Hello[/test] [foo] [test]'
+        for unknown_tags_as_data in (False, True):
+            expected = parse_skcode(text, recognized_tags=known_tags, unknown_tags_as_data=unknown_tags_as_data)
+            result = parse_skcode(text, recognized_tags=known_tags, unknown_tags_as_data=unknown_tags_as_data,
+                                  use_tokens_cache=True)
+            self.assertEqual(len(expected.children), len(result.children))
+            for expected_node, result_node in zip(expected.children, result.children):
+                self.assertEqual(expected_node.__class__, result_node.__class__)
+                self.assertEqual(expected_node.attrs, result_node.attrs)
+                self.assertEqual(expected_node.get_raw_content(), result_node.get_raw_content())
+                self.assertEqual(expected_node.error_message, result_node.error_message)
+
+    def test_parse_tag_free(self):
+        """ Test if the tag-free fast path give the same document tree as the tokens. """
+        for text in ('Hello world', 'Hello\nworld\n', 'Hello\r\n\r\n  \nworld ] =', ' \n Hello\rworld\n\n'):
+            expected = parse_skcode_tokens(tokenize_tag(text.strip(), lazy_attrs=True))
+            result = parse_skcode(text)
+            self.assertEqual(len(expected.children), len(result.children))
+            for expected_node, result_node in zip(expected.children, result.children):
+                self.assertEqual(expected_node.__class__, result_node.__class__)
+                self.assertEqual(expected_node.content, result_node.content)
+                self.assertIs(result, result_node.root_tree_node)
+                self.assertIs(result, result_node.parent)
+
+    def test_parse_tag_free_custom_chars(self):
+        """ Test if the tag-free fast path is only used for text without opening tag char. """
+        document_tree = parse_skcode('[test]Hello', opening_tag_ch='<', closing_tag_ch='>')
+        self.assertEqual(1, len(document_tree.children))
+        self.assertIsInstance(document_tree.children[0], TextTreeNode)
+        self.assertEqual('[test]Hello', document_tree.children[0].content)
+        document_tree = parse_skcode('<test>Hello', recognized_tags=(DummyTreeNode, ),
+                                     opening_tag_ch='<', closing_tag_ch='>')
+        self.assertEqual(1, len(document_tree.children))
+        self.assertIsInstance(document_tree.children[0], DummyTreeNode)
+
+    def test_parse_tag_free_processing_hooks(self):
+        """ Test if the processing callbacks of custom text nodes are called for tag-free text. """
+        visited_nodes = []
+
+        class CustomTextTreeNode(TextTreeNode):
+
+            def sanitize_node(self, breadcrumb):
+                visited_nodes.append(self.content)
+
+        parse_skcode('Hello\nworld', text_node_cls=CustomTextTreeNode)
+        self.assertEqual(['Hello', 'world'], visited_nodes)
+
+    def test_coalesce_text_runs(self):
+        """ Test if adjacent text and newlines are merged into text runs. """
+        text = 'Hello\nworld [b]foo\nbar[/b]\n\nbaz'
+        document_tree = parse_skcode(text, coalesce_text_runs=True)
+        self.assertEqual(3, len(document_tree.children))
+        self.assertIsInstance(document_tree.children[0], TextRunTreeNode)
+        self.assertEqual(['Hello', '\n', 'world '], document_tree.children[0].text_pieces)
+        self.assertEqual('b', document_tree.children[1].name)
+        self.assertEqual(['foo', '\n', 'bar'], document_tree.children[1].children[0].text_pieces)
+        self.assertEqual(['\n', '\n', 'baz'], document_tree.children[2].text_pieces)
+        expected = parse_skcode(text)
+        self.assertEqual(expected.get_raw_content(), document_tree.get_raw_content())
+        self.assertEqual(render_to_html(expected), render_to_html(document_tree))
+        self.assertEqual(render_to_text(expected), render_to_text(document_tree))
+
+    def test_coalesce_text_runs_tag_free(self):
+        """ Test if tag-free text is merged into a single text run. """
+        document_tree = parse_skcode('Hello\n\nworld', coalesce_text_runs=True)
+        self.assertEqual(1, len(document_tree.children))
+        self.assertEqual(['Hello', '\n', '\n', 'world'], document_tree.children[0].text_pieces)
+
+    def test_coalesce_text_runs_parse_tokens(self):
+        """ Test if text runs are supported when building from tokens. """
+        tokens = tokenize_tag('Hello\nworld', lazy_attrs=True)
+        document_tree = parse_skcode_tokens(tokens, coalesce_text_runs=True)
+        self.assertEqual(1, len(document_tree.children))
+        self.assertEqual(['Hello', '\n', 'world'], document_tree.children[0].text_pieces)
+
+    def test_coalesce_text_runs_source_spans(self):
+        """ Test if text runs are rejected with source spans. """
+        with self.assertRaises(AssertionError):
+            parse_skcode('Hello', source_spans=True, coalesce_text_runs=True)
+
+    def test_get_processing_hooks(self):
+        """ Test the ``get_processing_hooks`` function. """
+        self.assertEqual(0, get_processing_hooks(TreeNode))
+        self.assertEqual(0, get_processing_hooks(TextTreeNode))
+
+        class PreProcessTreeNode(TreeNode):
+
+            def pre_process_node(self):
+                pass
+
+        class SanitizeTreeNode(PreProcessTreeNode):
+
+            def sanitize_node(self, breadcrumb):
+                pass
+
+            def post_process_node(self):
+                pass
+
+        self.assertEqual(PROCESSING_HOOK_PRE_PROCESS, get_processing_hooks(PreProcessTreeNode))
+        self.assertEqual(PROCESSING_HOOK_PRE_PROCESS | PROCESSING_HOOK_SANITIZE | PROCESSING_HOOK_POST_PROCESS,
+                         get_processing_hooks(SanitizeTreeNode))
+
+    def test_process_tree_ordering(self):
+        """ Test if the whole tree is pre-processed, then sanitized, then post-processed. """
+        visited_nodes = []
+
+        class TestTreeNode(TreeNode):
+
+            def pre_process_node(self):
+                visited_nodes.append(('pre', self.name))
+
+            def sanitize_node(self, breadcrumb):
+                visited_nodes.append(('sanitize', self.name, [node.name for node in breadcrumb]))
+
+            def post_process_node(self):
+                visited_nodes.append(('post', self.name))
+
+        root_tree_node = RootTreeNode()
+        a = root_tree_node.new_child('a', TestTreeNode)
+        b = a.new_child('b', TestTreeNode)
+        b.new_child(None, TextTreeNode, content='test')
+        a.new_child('c', TestTreeNode)
+        root_tree_node.new_child('d', TestTreeNode)
+        process_tree(root_tree_node)
+        self.assertEqual([
+            ('pre', 'a'), ('pre', 'b'), ('pre', 'c'), ('pre', 'd'),
+            ('sanitize', 'b', ['a']), ('sanitize', 'c', ['a']), ('sanitize', 'a', []), ('sanitize', 'd', []),
+            ('post', 'a'), ('post', 'b'), ('post', 'c'), ('post', 'd'),
+        ], visited_nodes)
+
+    def test_process_tree_deep_nesting(self):
+        """ Test if deeply nested trees are processed without recursion. """
+        sanitized_nodes = []
+
+        class TestTreeNode(TreeNode):
+
+            def sanitize_node(self, breadcrumb):
+                sanitized_nodes.append(len(breadcrumb))
+
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node
+        for _ in range(5000):
+            tree_node = tree_node.new_child('test', TestTreeNode)
+        process_tree(root_tree_node)
+        self.assertEqual(list(range(4999, -1, -1)), sanitized_nodes)
+
+    def test_sanitize_tree_breadcrumb_copy(self):
+        """ Test if each sanitizing callback get its own copy of the breadcrumb. """
+        breadcrumbs = []
+
+        class TestTreeNode(TreeNode):
+
+            def sanitize_node(self, breadcrumb):
+                breadcrumbs.append((self, breadcrumb))
+
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node.new_child('test', TestTreeNode)
+        child_node = tree_node.new_child('test', TestTreeNode)
+        other_child_node = tree_node.new_child('test', TestTreeNode)
+        sanitize_tree(root_tree_node)
+        self.assertEqual([
+            (child_node, [tree_node]),
+            (other_child_node, [tree_node]),
+            (tree_node, []),
+        ], breadcrumbs)
+        self.assertIsNot(breadcrumbs[0][1], breadcrumbs[1][1])
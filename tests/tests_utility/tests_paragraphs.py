@@ -4,10 +4,11 @@ SkCode auto paragraphs utility test code.
 
 import unittest
 
-from skcode.etree import RootTreeNode, TreeNode
+from skcode.etree import RootTreeNode, TreeNode, compute_structural_hashes
 from skcode.tags import (
     NewlineTreeNode,
-    TextTreeNode
+    TextTreeNode,
+    TextRunTreeNode
 )
 from skcode.utility.paragraphs import (
     ParagraphTreeNode,
@@ -76,6 +77,35 @@ class ParagraphsUtilityTagTestCase(unittest.TestCase):
         self.assertIsInstance(root_tree_node.children[0], ParagraphTreeNode)
         self.assertEqual([a, b, c, d], root_tree_node.children[0].children)
 
+    def test_make_paragraphs_nodes_index(self):
+        """ Test if the ``make_paragraphs`` paragraph utility keep the nodes index in sync. """
+        root_tree_node = RootTreeNode()
+        a = root_tree_node.new_child(None, TextTreeNode, content='Text 1')
+        root_tree_node.new_child(None, NewlineTreeNode)
+        root_tree_node.new_child(None, NewlineTreeNode)
+        b = root_tree_node.new_child(None, TextTreeNode, content='Text 2')
+        self.assertEqual([a, b], list(root_tree_node.search_in_tree(TextTreeNode, use_index=True)))
+        make_paragraphs(root_tree_node)
+        paragraphs = list(root_tree_node.search_in_tree(ParagraphTreeNode, use_index=True))
+        self.assertEqual(2, len(paragraphs))
+        self.assertEqual(root_tree_node.children, paragraphs)
+        self.assertEqual([a, b], list(root_tree_node.search_in_tree(TextTreeNode, use_index=True)))
+        self.assertEqual([paragraphs[0], a, paragraphs[1], b],
+                         list(root_tree_node.search_in_tree((ParagraphTreeNode, TextTreeNode), use_index=True)))
+
+    def test_make_paragraphs_structural_hashes(self):
+        """ Test if the ``make_paragraphs`` paragraph utility computes the structural hashes again, if any. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child(None, TextTreeNode, content='Text 1')
+        make_paragraphs(root_tree_node)
+        self.assertIsNone(root_tree_node.children[0].structural_hash)
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child(None, TextTreeNode, content='Text 1')
+        structural_hash = compute_structural_hashes(root_tree_node)
+        make_paragraphs(root_tree_node)
+        self.assertNotEqual(structural_hash, root_tree_node.structural_hash)
+        self.assertIsNotNone(root_tree_node.children[0].structural_hash)
+
     def test_make_paragraphs_custom_class(self):
         """ Test the ``make_paragraphs`` paragraph utility. """
         root_tree_node = RootTreeNode()
@@ -155,3 +185,36 @@ class ParagraphsUtilityTagTestCase(unittest.TestCase):
         self.assertEqual(len(root_tree_node.children), 1)
         self.assertIsInstance(root_tree_node.children[0], ParagraphTreeNode)
         self.assertEqual([a, b, c], root_tree_node.children[0].children)
+
+    def test_make_paragraphs_text_runs(self):
+        """ Test the ``make_paragraphs`` paragraph utility with text runs. """
+        root_tree_node = RootTreeNode()
+        root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['\n', 'Text 1', '\n', '  ', '\n',
+                                                                     'Text 2', '\n'])
+        z = root_tree_node.new_child('block', CustomBlockTreeNode)
+        root_tree_node.new_child(None, TextRunTreeNode, text_pieces=['Text 3'])
+        make_paragraphs(root_tree_node)
+        self.assertEqual(len(root_tree_node.children), 5)
+        self.assertIsInstance(root_tree_node.children[0], TextRunTreeNode)
+        self.assertEqual(['\n'], root_tree_node.children[0].text_pieces)
+        self.assertIsInstance(root_tree_node.children[1], ParagraphTreeNode)
+        self.assertEqual(1, len(root_tree_node.children[1].children))
+        self.assertEqual(['Text 1', '\n'], root_tree_node.children[1].children[0].text_pieces)
+        self.assertIs(root_tree_node.children[1], root_tree_node.children[1].children[0].parent)
+        self.assertIsInstance(root_tree_node.children[2], ParagraphTreeNode)
+        self.assertEqual(['Text 2', '\n'], root_tree_node.children[2].children[0].text_pieces)
+        self.assertEqual(root_tree_node.children[3], z)
+        self.assertIsInstance(root_tree_node.children[4], ParagraphTreeNode)
+        self.assertEqual(['Text 3'], root_tree_node.children[4].children[0].text_pieces)
+
+    def test_make_paragraphs_deeply_nested_tree(self):
+        """ Test the ``make_paragraphs`` paragraph utility with a tree deeper than the Python recursion limit. """
+        root_tree_node = RootTreeNode()
+        tree_node = root_tree_node
+        for _ in range(5000):
+            tree_node = tree_node.new_child('block', CustomBlockTreeNode, make_paragraphs_here=True)
+        a = tree_node.new_child(None, TextTreeNode, content='Text 1')
+        make_paragraphs(root_tree_node)
+        self.assertEqual(1, len(tree_node.children))
+        self.assertIsInstance(tree_node.children[0], ParagraphTreeNode)
+        self.assertEqual([a], tree_node.children[0].children)
@@ -31,3 +31,8 @@ class AcronymsUtilityTagTestCase(unittest.TestCase):
             Nunc auctor sapien vitae neque sodales congue. Suspendisse.""")
         words_count = count_words(document)
         self.assertEqual(100, words_count)
+
+    def test_count_words_text_runs(self):
+        """ Test the ``count_words`` with text runs """
+        document = parse_skcode('Lorem ipsum\ndolor sit[b]amet[/b]\n\nconsectetur', coalesce_text_runs=True)
+        self.assertEqual(6, count_words(document))